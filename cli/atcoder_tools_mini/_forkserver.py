@@ -0,0 +1,164 @@
+"""
+Fork server for `atm test --warm`. Runs as a standalone script under the
+solution's own interpreter:
+
+    python3 _forkserver.py <src>
+
+It imports the usual contest modules and compiles <src> once, then forks a
+fresh child per request so each case skips interpreter startup. Requests and
+replies are JSON lines on the server's stdin/stdout:
+
+    -> {"in": path, "out": path, "err": path, "timeout": seconds, "max_output": bytes or null}
+    <- {"returncode", "timed_out", "run_ms", "user_ms", "sys_ms", "max_rss_kb"}
+
+This file must not import atcoder_tools_mini: PyPy and other interpreters run
+it without the package on their path.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import traceback
+
+# Preloaded so that a solution's imports are dictionary lookups after fork
+import io, math, re, random, string, heapq, bisect, itertools, functools, operator, collections, decimal, fractions, copy, types, typing  # noqa: E401,F401
+
+def _rss_kb(ru_maxrss):
+    if sys.platform == "darwin":
+        return ru_maxrss // 1024
+    return ru_maxrss
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+def run_child(code, src, request, ctrl_fds):
+    """
+    Runs in the forked child: swaps in the case's stdin/stdout/stderr and
+    executes the precompiled solution as __main__. Never returns.
+    """
+    status = 0
+    try:
+        for fd in ctrl_fds:
+            os.close(fd)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        if request.get("max_output") is not None:
+            # Writing past the output limit kills the child instead of filling the disk
+            import resource
+            signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+            limit = request["max_output"] + 1
+            resource.setrlimit(resource.RLIMIT_FSIZE, (limit, limit))
+
+        fd_in = os.open(request["in"], os.O_RDONLY)
+        fd_out = os.open(request["out"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        fd_err = os.open(request["err"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        for fd, target in ((fd_in, 0), (fd_out, 1), (fd_err, 2)):
+            os.dup2(fd, target)
+            os.close(fd)
+
+        sys.stdin = sys.__stdin__ = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, "w", encoding="utf-8", closefd=False)
+        sys.argv = [src]
+        sys.path[0] = os.path.dirname(os.path.abspath(src))
+
+        main = types.ModuleType("__main__")
+        main.__file__ = src
+        main.__builtins__ = __builtins__
+        sys.modules["__main__"] = main
+        try:
+            exec(code, main.__dict__)
+        except SystemExit as e:
+            if e.code is None:
+                status = 0
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                status = 1
+        except BaseException as e:
+            # Drop this file's frame so the traceback looks like a plain `python main.py` run
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            status = 1
+    except BaseException:
+        status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(status & 0xFF)
+
+def serve(src):
+    with open(src, "r", encoding="utf-8") as f:
+        code = compile(f.read(), src, "exec")
+
+    # Move the control channel off fds 0/1, which every child replaces
+    ctrl_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    ctrl_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    ctrl_fds = (ctrl_in.fileno(), ctrl_out.fileno())
+
+    state = {"pid": None, "timed_out": False}
+
+    def on_alarm(signum, frame):
+        pid = state["pid"]
+        if pid is None:
+            return
+        try:
+            # Only kill a child that is still ours and not yet reaped
+            if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+                state["timed_out"] = True
+                os.kill(pid, signal.SIGKILL)
+        except (ChildProcessError, OSError):
+            pass
+
+    signal.signal(signal.SIGALRM, on_alarm)
+
+    # A child that does nothing shows the RSS every child inherits from this server
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    _, _, rusage = os.wait4(pid, 0)
+    ctrl_out.write(json.dumps({"ready": True, "rss_floor_kb": _rss_kb(rusage.ru_maxrss)}) + "\n")
+    ctrl_out.flush()
+
+    for line in ctrl_in:
+        request = json.loads(line)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        state["timed_out"] = False
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            run_child(code, src, request, ctrl_fds)
+
+        state["pid"] = pid
+        signal.setitimer(signal.ITIMER_REAL, request["timeout"])
+        try:
+            while True:
+                try:
+                    _, status, rusage = os.wait4(pid, 0)
+                    break
+                except InterruptedError:
+                    continue
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            state["pid"] = None
+        run_ms = (time.perf_counter() - start) * 1000
+
+        ctrl_out.write(json.dumps({
+            "returncode": _exit_code(status),
+            "timed_out": state["timed_out"],
+            "run_ms": run_ms,
+            "user_ms": rusage.ru_utime * 1000,
+            "sys_ms": rusage.ru_stime * 1000,
+            "max_rss_kb": _rss_kb(rusage.ru_maxrss)
+        }) + "\n")
+        ctrl_out.flush()
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
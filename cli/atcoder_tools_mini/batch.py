@@ -0,0 +1,253 @@
+import os
+import sys
+import glob
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from . import calibrate
+from . import warm
+from . import interactive
+from . import config
+from . import pch
+from . import compile_cache
+from .test import (
+    DEFAULT_TIME_LIMIT_MS, DEFAULT_MEMORY_LIMIT_MB,
+    get_test_commands, resolve_language, prepare_program, prepare_judge, prepare_helper, expand_command,
+    run_case, run_interactive_case, resolve_jobs, use_calibration,
+    max_output_bytes,
+)
+from .runner import run_process
+
+CELL_WIDTH = 12
+
+def load_metadata(task_dir):
+    try:
+        with open(os.path.join(task_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def find_tasks(root):
+    """
+    Task directories (those with a metadata.json) directly under `root`, in
+    problem order. Run from inside a task directory, its siblings are used.
+    """
+    dirs = sorted(glob.glob(os.path.join(root, "*", "metadata.json")))
+    if not dirs and os.path.isfile(os.path.join(root, "metadata.json")):
+        return find_tasks(os.path.dirname(root))
+
+    tasks = []
+    for metadata_path in dirs:
+        task_dir = os.path.dirname(metadata_path)
+        metadata = load_metadata(task_dir)
+        if metadata is None:
+            continue
+        label = (metadata.get("problem") or {}).get("alphabet") or os.path.basename(task_dir)
+        tasks.append({"label": label, "dir": task_dir, "metadata": metadata})
+    return tasks
+
+def find_cases(task_dir):
+    """
+    (in_file, out_file) pairs of a task. out_file is None when the expected
+    output is missing (only usable by interactive tasks).
+    """
+    cases = []
+    for in_file in sorted(glob.glob(os.path.join(task_dir, "in", "*.txt"))):
+        out_file = os.path.join(task_dir, "out", os.path.basename(in_file).replace("in", "out"))
+        cases.append((in_file, out_file if os.path.isfile(out_file) else None))
+    return cases
+
+EXEC_FILENAME = "a.out" if os.name != "nt" else "a.exe"
+
+def resolve_program(task, args):
+    """
+    Sets task["src"], task["lang"] and task["templates"] (compile, run), or
+    marks the task "no source".
+    """
+    metadata = task["metadata"]
+    src_path = os.path.join(task["dir"], metadata.get("code_filename") or args.src)
+    if not os.path.isfile(src_path):
+        task["status"] = "no source"
+        return
+    task_args = argparse.Namespace(lang=getattr(args, "lang", None))
+    task["src"] = src_path
+    task["lang"] = resolve_language(task_args, src_path, metadata)
+    task["templates"] = get_test_commands(task_args, src_path, metadata)
+
+def build_pch(tasks, args):
+    """
+    Builds the precompiled headers the C++ tasks need before they are compiled
+    in parallel, so that the workers find them ready instead of queueing on the
+    build lock, and the build is reported once, outside the task logs.
+    Tasks that the compile cache will serve are skipped. Both settings come
+    from the task's own config.
+    """
+    for task in tasks:
+        if task.get("status") == "no source" or not task["templates"][0] or not pch.load_settings(task["dir"]):
+            continue
+        compile_cmd = expand_command(task["templates"][0], task["src"], EXEC_FILENAME)
+        use_cache = not getattr(args, "no_cache", False) and compile_cache.load_settings(task["dir"])[0]
+        if use_cache and compile_cache.contains(compile_cache.cache_key(task["src"], compile_cmd)):
+            continue
+        pch.ensure_pch(compile_cmd, task["src"])
+
+def build_task(task, args):
+    """
+    Compiles one task's solution. Runs in a worker thread, so messages are collected in task["log"] and
+    printed by the caller in task order.
+    """
+    if task.get("status") == "no source":
+        return task
+    compile_template, run_template = task["templates"]
+    run_cmd = prepare_program(compile_template, run_template, task["src"], EXEC_FILENAME,
+                              use_cache=not getattr(args, "no_cache", False), cwd=task["dir"], log=task["log"].append)
+    if run_cmd is None:
+        task["status"] = "CE"
+        return task
+    task["run_cmd"] = run_cmd
+    task["status"] = "ready"
+    return task
+
+def prepare_task_judge(task, args):
+    """
+    Sets up the judge or interactor of a built task. Helpers may need
+    compiling too, but are rare enough to be built one after another.
+    """
+    metadata = task["metadata"]
+    task_args = argparse.Namespace(no_cache=getattr(args, "no_cache", False))
+    if (metadata.get("judge") or {}).get("judge_type") == "interactive":
+        if not interactive.supported():
+            task["status"] = "unsupported"
+            return
+        task["interactor_cmd"] = prepare_helper("interactor", metadata["judge"].get("interactor"), task_args, task["dir"])
+        if task["interactor_cmd"] is None:
+            task["status"] = "no interactor"
+    else:
+        task["judge"] = prepare_judge(task_args, metadata, task["dir"])
+        if task["judge"] is None:
+            task["status"] = "bad judge"
+
+def format_cell(case, time_limit_ms):
+    verdict = case["verdict"]
+    text = f"{verdict} {case['elapsed_ms']}ms".ljust(CELL_WIDTH)
+    if verdict == "AC":
+        color = "93" if case["elapsed_ms"] >= time_limit_ms * 0.8 else "92"
+    else:
+        color = "91" if verdict == "WA" else "93"
+    return f"\033[{color}m{text}\033[0m"
+
+def print_row(task, case_results):
+    label = task["label"].ljust(task["label_width"])
+    if task["status"] == "CE":
+        print(f"{label}\033[91mCE\033[0m")
+        return
+    if task["status"] != "ready":
+        print(f"{label}\033[90m-    ({task['status']})\033[0m")
+        return
+    passed = all(case["verdict"] == "AC" for case in case_results)
+    summary = f"\033[92m{'AC'.ljust(5)}\033[0m" if passed else f"\033[91m{'NG'.ljust(5)}\033[0m"
+    cells = "".join(format_cell(case, task["time_limit_ms"]) for case in case_results)
+    print(f"{label}{summary}{cells}".rstrip())
+
+def test_all(args):
+    """
+    Tests every task of the contest at once: all solutions are compiled in
+    parallel, then the samples of all tasks go through one shared worker pool.
+    Prints a task x case matrix of verdicts and times.
+    """
+    tasks = find_tasks(os.path.abspath(os.getcwd()))
+    if not tasks:
+        print("[CLI] \033[93mNo task directories (with metadata.json) found here or in the parent directory.\033[0m")
+        return False
+
+    jobs = resolve_jobs(getattr(args, "jobs", None), len(tasks))
+    for task in tasks:
+        task["log"] = []
+        resolve_program(task, args)
+    build_pch(tasks, args)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(lambda task: build_task(task, args), tasks))
+    for task in tasks:
+        for line in task["log"]:
+            print(f"[{task['label']}] {line}" if line.startswith("[CLI]") else line)
+        if task["status"] == "ready":
+            prepare_task_judge(task, args)
+
+    # Calibration factors of the languages of the tasks that use it; None
+    # where there is none. Whether a task is calibrated comes from its config.
+    for task in tasks:
+        task["calibrated"] = task["status"] == "ready" and use_calibration(args, task["dir"])
+    factors = {}
+    for lang in sorted({task["lang"] for task in tasks if task["calibrated"]}):
+        factors[lang] = calibrate.load_factor(lang)
+        if factors[lang] is None:
+            print(f"[CLI] \033[93mWarning: No calibration for {lang}. {calibrate.missing_hint(lang)}; using the unscaled limits.\033[0m")
+    scaled = [f"{lang} x {factor:.2f}" for lang, factor in factors.items() if factor]
+    if scaled:
+        print(f"[CLI] \033[90mCalibrated time limits: {', '.join(scaled)}\033[0m")
+
+    label_width = max([len(task["label"]) for task in tasks] + [4]) + 2
+    work = []
+    for task in tasks:
+        task["label_width"] = label_width
+        if task["status"] != "ready":
+            continue
+        metadata = task["metadata"]
+        time_limit_ms = int(metadata.get("timeout_ms", DEFAULT_TIME_LIMIT_MS))
+        factor = factors.get(task["lang"]) if task["calibrated"] else None
+        task["time_limit_ms"] = calibrate.scale_limit(time_limit_ms, factor) if factor else time_limit_ms
+        task["memory_limit_kb"] = int(metadata.get("memory_limit_mb", DEFAULT_MEMORY_LIMIT_MB)) * 1024
+        task["cases"] = [(i, o) for i, o in find_cases(task["dir"]) if o or task.get("interactor_cmd")]
+        task["max_output"] = max_output_bytes(task["dir"])
+        task["pool"] = None
+        use_warm = getattr(args, "warm", False) or config.load(task["dir"]).section("test").get("warm", False)
+        if use_warm and not task.get("interactor_cmd") and warm.supports(task["run_cmd"]) and task["cases"]:
+            task["pool"] = warm.WarmPool(task["run_cmd"], resolve_jobs(getattr(args, "jobs", None), len(task["cases"])), cwd=task["dir"])
+        work.extend((task, in_file, out_file) for in_file, out_file in task["cases"])
+
+    def run_one(task, in_file, out_file):
+        timeout = task["time_limit_ms"] / 1000
+        if task.get("interactor_cmd"):
+            return run_interactive_case(task["run_cmd"], task["interactor_cmd"], in_file, out_file,
+                                        timeout, task["memory_limit_kb"], cwd=task["dir"])
+        run = task["pool"].run if task["pool"] else run_process
+        return run_case(task["run_cmd"], in_file, out_file, timeout, task["memory_limit_kb"],
+                        task["judge"], run, task["max_output"], cwd=task["dir"])
+
+    max_cases = max([len(task.get("cases", [])) for task in tasks] + [1])
+    header = "Task".ljust(label_width) + "All".ljust(5) + "".join(f"#{i + 1}".ljust(CELL_WIDTH) for i in range(max_cases))
+    print(header.rstrip())
+
+    # One pool for every case of every task; rows are printed in task order as
+    # soon as all of their cases are done
+    passed_tasks = 0
+    tested_tasks = 0
+    case_jobs = resolve_jobs(getattr(args, "jobs", None), max(1, len(work)))
+    try:
+        with ThreadPoolExecutor(max_workers=case_jobs) as executor:
+            futures = {(id(task), in_file): executor.submit(run_one, task, in_file, out_file) for task, in_file, out_file in work}
+            for task in tasks:
+                if task["status"] != "ready":
+                    print_row(task, [])
+                    # A task without a solution yet is not counted as failing
+                    if task["status"] not in ("no source", "unsupported"):
+                        tested_tasks += 1
+                    continue
+                case_results = [futures[(id(task), in_file)].result() for in_file, _ in task["cases"]]
+                print_row(task, case_results)
+                sys.stdout.flush()
+                tested_tasks += 1
+                if case_results and all(case["verdict"] == "AC" for case in case_results):
+                    passed_tasks += 1
+    finally:
+        for task in tasks:
+            if task.get("pool"):
+                task["pool"].close()
+
+    print("\033[90mRun `atm test` inside a task directory for the details of a failing case.\033[0m")
+    if tested_tasks and passed_tasks == tested_tasks:
+        print(f"\033[92mAll {tested_tasks} tasks passed!!!\033[0m")
+        return True
+    print(f"\033[91mPassed {passed_tasks} of {tested_tasks} tasks\033[0m")
+    return False
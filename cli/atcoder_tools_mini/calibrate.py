@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from .paths import cache_dir
+from .runner import run_process
+
+# A deterministic CPU-bound Python program: integer arithmetic, list indexing,
+# dict updates and a sort, i.e. the usual mix of a contest solution.
+PYTHON_WORKLOAD = """\
+def main():
+    n = 1000000
+    a = [(i * 7919) % 100003 for i in range(n)]
+    s = 0
+    d = {}
+    for i in range(n):
+        x = a[i]
+        s = (s + x * x) % 1000000007
+        d[x & 1023] = d.get(x & 1023, 0) + 1
+    a.sort()
+    print(s, len(d), a[n // 2])
+main()
+"""
+
+# The same program in C++, with a larger n so that it runs long enough to time
+CPP_WORKLOAD = """\
+#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    const int n = 10000000;
+    vector<int> a(n);
+    for (int i = 0; i < n; i++) a[i] = (long long)i * 7919 % 100003;
+    long long s = 0;
+    unordered_map<int, int> d;
+    for (int i = 0; i < n; i++) {
+        long long x = a[i];
+        s = (s + x * x) % 1000000007;
+        d[x & 1023]++;
+    }
+    sort(a.begin(), a.end());
+    printf("%lld %zu %d\\n", s, d.size(), a[n / 2]);
+    return 0;
+}
+"""
+
+# Each language is measured with its own toolchain (the run and compile
+# commands `atm test` uses), against its own judge time: a factor measured
+# with CPython says nothing about how fast g++ or PyPy is here.
+WORKLOADS = {
+    "python": {"source": PYTHON_WORKLOAD, "filename": "workload.py", "judge": "Python (CPython 3.11)"},
+    "pypy": {"source": PYTHON_WORKLOAD.replace("n = 1000000", "n = 10000000"), "filename": "workload.py", "judge": "Python (PyPy 3.10)"},
+    "cpp": {"source": CPP_WORKLOAD, "filename": "workload.cpp", "judge": "C++ 20 (gcc 12.2)"},
+}
+
+RUNS = 5
+
+def _calibration_path():
+    return os.path.join(cache_dir(), "calibration.json")
+
+def _load():
+    """
+    The stored calibrations, {language: {"factor", "reference_ms", ...}}.
+    """
+    try:
+        with open(_calibration_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    languages = data.get("languages") if isinstance(data, dict) else None
+    return languages if isinstance(languages, dict) else {}
+
+def measure(lang, runs=RUNS):
+    """
+    Builds the workload of `lang` and runs it `runs` times. Returns the median
+    CPU time (user + sys) in milliseconds and the command that ran it. Wall
+    time is used where rusage isn't available.
+    """
+    from .test import get_test_commands, prepare_program
+    workload = WORKLOADS[lang]
+    with tempfile.TemporaryDirectory(prefix="atm_calibrate_") as work:
+        src_path = os.path.join(work, workload["filename"])
+        with open(src_path, "w", encoding="utf-8") as f:
+            f.write(workload["source"])
+        compile_template, run_template = get_test_commands(argparse.Namespace(lang=lang), src_path, None)
+        exec_filename = "a.out" if os.name != "nt" else "a.exe"
+        run_cmd = prepare_program(compile_template, run_template, src_path, exec_filename, use_cache=False, cwd=work)
+        if run_cmd is None:
+            raise RuntimeError("the workload did not compile")
+
+        samples = []
+        for _ in range(runs):
+            result = run_process(run_cmd, b"", 60.0, cwd=work)
+            if result["timed_out"] or result["returncode"] != 0:
+                raise RuntimeError(f"the workload failed ({' '.join(run_cmd)})")
+            if result["user_ms"] is None:
+                samples.append(result["wall_ms"])
+            else:
+                samples.append(result["user_ms"] + result["sys_ms"])
+    import statistics
+    return statistics.median(samples), run_cmd
+
+def load_factor(lang):
+    """
+    Returns the stored speed factor (local time / judge time) of `lang`, or
+    None if `atm calibrate --lang <lang>` has not been run yet.
+    """
+    try:
+        return float(_load()[lang]["factor"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def missing_hint(lang):
+    if lang in WORKLOADS:
+        return f"Run `atm calibrate --lang {lang}` first"
+    return f"`atm calibrate` supports {', '.join(sorted(WORKLOADS))}, not {lang}"
+
+def scale_limit(time_limit_ms, factor):
+    return int(round(time_limit_ms * factor))
+
+def calibrate(args):
+    lang = getattr(args, "lang", None) or "python"
+    workload = WORKLOADS[lang]
+    if getattr(args, "print_workload", False):
+        print(workload["source"], end="")
+        return
+
+    languages = _load()
+    reference_ms = args.reference_ms or languages.get(lang, {}).get("reference_ms")
+    if not reference_ms:
+        print(f"[CLI] \033[91mError: The judge time of the {lang} workload is not known yet.\033[0m")
+        print(f"Run `atm calibrate --lang {lang} --print-workload`, run the program in AtCoder's Custom Test as {workload['judge']}")
+        print(f"and pass the reported time: `atm calibrate --lang {lang} --reference-ms <ms>`.")
+        sys.exit(1)
+
+    print(f"[CLI] Running the {lang} calibration workload {RUNS} times...")
+    sys.stdout.flush()
+    try:
+        local_ms, run_cmd = measure(lang)
+    except (OSError, RuntimeError) as e:
+        print(f"[CLI] \033[91mError: Calibration failed -> {e}\033[0m")
+        sys.exit(1)
+
+    factor = local_ms / reference_ms
+    languages[lang] = {
+        "factor": factor,
+        "local_ms": round(local_ms, 1),
+        "reference_ms": reference_ms,
+        "command": run_cmd,
+        "measured_at": time.time()
+    }
+    with open(_calibration_path(), "w", encoding="utf-8") as f:
+        json.dump({"languages": languages}, f, indent=1)
+        f.write("\n")
+
+    print(f"[CLI] Local: {local_ms:.0f} ms, judge: {reference_ms} ms -> {lang} factor \033[96m{factor:.2f}\033[0m")
+    print(f"[CLI] \033[90mA 2000 ms limit becomes {scale_limit(2000, factor)} ms for {lang} with `atm test --calibrated`.\033[0m")
@@ -0,0 +1,113 @@
+import os
+import time
+import select
+import socket
+
+from .framing import FrameReader, encode_frame, decode_frame
+
+HOST = "127.0.0.1"
+PORT = 49153
+
+class HostConnection:
+    """
+    A single connection to the native host, shared by every request made during
+    one CLI invocation.
+
+    Each request is tagged with a unique `id` which the extension echoes back on
+    every reply, and the native host only routes a reply to the connection that
+    sent the request. Several requests (and several CLI processes) can therefore
+    share the host at the same time without seeing each other's messages.
+    """
+    def __init__(self):
+        self.sock = socket.create_connection((HOST, PORT))
+        # Every frame is sent with a single sendall; don't hold small ones back
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = FrameReader(self.sock)
+        self.pending = {}
+        self.counter = 0
+
+    def request(self, payload):
+        """
+        Sends a request and returns its id.
+        """
+        self.counter += 1
+        req_id = f"{os.getpid()}-{self.counter}-{os.urandom(4).hex()}"
+        self.pending[req_id] = []
+
+        message = {"id": req_id}
+        message.update(payload)
+        self.sock.sendall(encode_frame(message))
+        return req_id
+
+    def messages(self, req_id, timeout=None):
+        """
+        Yields the replies to the given request until the connection is closed.
+        Replies to other in-flight requests are queued for their own reader.
+        With a timeout (in seconds), raises TimeoutError once it has elapsed
+        while waiting for the next message.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        queue = self.pending.setdefault(req_id, [])
+        while True:
+            while queue:
+                yield queue.pop(0)
+
+            if deadline is not None and not self._wait_readable(deadline):
+                raise TimeoutError(f"No reply within {timeout:g} seconds")
+            msg = self._read_message()
+            if msg is None:
+                return
+
+            msg_id = msg.get("id")
+            # Messages without an id come from an extension that predates request ids
+            if msg_id is None or msg_id == req_id:
+                yield msg
+            elif msg_id in self.pending:
+                self.pending[msg_id].append(msg)
+
+    def finish(self, req_id):
+        """
+        Stops listening for replies to the request; the host forgets its route.
+        """
+        self.pending.pop(req_id, None)
+        try:
+            self.sock.sendall(encode_frame({"id": req_id, "action": "release"}))
+        except OSError:
+            pass
+
+    def _wait_readable(self, deadline):
+        # Only ever waits between frames, so a timeout never leaves one half read
+        if self.reader.end > self.reader.start:
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        readable, _, _ = select.select([self.sock], [], [], remaining)
+        return bool(readable)
+
+    def _read_message(self):
+        while True:
+            body = self.reader.read_frame()
+            if body is None:
+                return None
+            msg = decode_frame(body)
+            if msg is not None:
+                return msg
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+_connection = None
+
+def get_connection():
+    """
+    Returns the process-wide connection to the native host, connecting on first use.
+    Raises ConnectionRefusedError if the host is not running.
+    """
+    global _connection
+    if _connection is None:
+        _connection = HostConnection()
+    return _connection
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import subprocess
+
+from .paths import cache_dir
+from . import config
+
+DEFAULT_MAX_SIZE_MB = 256
+
+LOCAL_INCLUDE_RE = re.compile(rb'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+_version_memo = {}
+
+def load_settings(start_dir=None):
+    """
+    Reads the `compile_cache` section of the config that applies to
+    `start_dir` (see config.load). Returns (enabled, max_size_bytes).
+    """
+    settings = config.load(start_dir).section("compile_cache")
+    return settings.get("enabled", True), int(settings.get("max_size_mb", DEFAULT_MAX_SIZE_MB) * 1024 * 1024)
+
+def compiler_version(executable):
+    """
+    Returns a string identifying the compiler binary: its resolved path, mtime
+    and `--version` output. The `--version` call is memoized on disk per
+    (path, mtime), so an unchanged toolchain costs a single stat.
+    """
+    resolved = shutil.which(executable) or executable
+    try:
+        st = os.stat(resolved)
+        identity = f"{os.path.realpath(resolved)}:{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        identity = resolved
+
+    if identity in _version_memo:
+        return _version_memo[identity]
+
+    memo_path = os.path.join(cache_dir(), "compiler_versions.json")
+    memo = {}
+    try:
+        with open(memo_path, "r", encoding="utf-8") as f:
+            memo = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if identity not in memo:
+        try:
+            result = subprocess.run([resolved, "--version"], capture_output=True, text=True, timeout=10)
+            version = (result.stdout or result.stderr).strip()
+        except (OSError, subprocess.SubprocessError):
+            version = ""
+        memo[identity] = version
+        tmp_path = memo_path + f".{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(memo, f)
+            os.replace(tmp_path, memo_path)
+        except OSError:
+            pass
+
+    _version_memo[identity] = f"{identity}\n{memo[identity]}"
+    return _version_memo[identity]
+
+def _hash_sources(hasher, path, seen):
+    """
+    Feeds the source file and, recursively, every `#include "..."` file that
+    resolves next to it into the hasher, so editing a local header also
+    invalidates the cache entry.
+    """
+    real = os.path.realpath(path)
+    if real in seen:
+        return
+    seen.add(real)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    hasher.update(path.encode("utf-8") + b"\0" + data + b"\0")
+
+    base_dir = os.path.dirname(path)
+    for name in LOCAL_INCLUDE_RE.findall(data):
+        inc_path = os.path.join(base_dir, name.decode("utf-8", "replace"))
+        if os.path.isfile(inc_path):
+            _hash_sources(hasher, inc_path, seen)
+
+def cache_key(src_path, compile_cmd):
+    """
+    Content hash of the source bytes (plus local headers), the fully resolved
+    compile command and the compiler version.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(compile_cmd).encode("utf-8") + b"\0")
+    hasher.update(compiler_version(compile_cmd[0]).encode("utf-8") + b"\0")
+    _hash_sources(hasher, src_path, set())
+    return hasher.hexdigest()
+
+def artifact_path(run_template, exec_filename, src_path, file_base):
+    """
+    The single file produced by the compiler that the run command executes,
+    e.g. `a.out` for `./{exec}`. Returns None for toolchains whose output can't
+    be pinned to one file (e.g. Java class files), which are never cached.
+    """
+    candidates = [
+        cmd.format(src=src_path, exec=exec_filename, basename=file_base)
+        for cmd in run_template if "{exec}" in cmd
+    ]
+    if len(candidates) != 1:
+        return None
+    path = candidates[0]
+    if path.startswith("./") or path.startswith(".\\"):
+        path = path[2:]
+    return path
+
+def contains(key):
+    return os.path.isfile(os.path.join(cache_dir("compile"), key, "artifact"))
+
+def lookup(key, artifact):
+    """
+    Copies a cached artifact into place. Returns True on a cache hit.
+    """
+    entry_dir = os.path.join(cache_dir("compile"), key)
+    cached = os.path.join(entry_dir, "artifact")
+    if not os.path.isfile(cached):
+        return False
+
+    try:
+        tmp_path = f"{artifact}.{os.getpid()}.tmp"
+        shutil.copy2(cached, tmp_path)
+        os.replace(tmp_path, artifact)
+        # Bump the entry for LRU eviction
+        os.utime(entry_dir)
+    except OSError:
+        return False
+    return True
+
+def store(key, artifact, max_size_bytes):
+    """
+    Saves a freshly compiled artifact and evicts the least recently used
+    entries until the cache fits in max_size_bytes.
+    """
+    if not os.path.isfile(artifact):
+        return
+
+    root = cache_dir("compile")
+    entry_dir = os.path.join(root, key)
+    tmp_dir = os.path.join(root, f".{key}.{os.getpid()}.tmp")
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        shutil.copy2(artifact, os.path.join(tmp_dir, "artifact"))
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    evict(root, max_size_bytes)
+
+def evict(root, max_size_bytes):
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        except OSError:
+            continue
+        total += size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_size_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
@@ -0,0 +1,205 @@
+import os
+import json
+
+CONFIG_PATH = "~/.atm_config.json"
+
+# Placed in a contest or task directory (or any parent), overrides the global
+# config for everything below it
+LOCAL_CONFIG_NAME = ".atm_config.json"
+
+NUMBER = (int, float)
+COMMAND = (str, list)
+
+# Known keys and their types. Sections are nested dicts; `test_commands` maps a
+# language symbol to {"compile": ..., "run": ...}.
+SCHEMA = {
+    "lang": str,
+    "template_path": str,
+    "pch": bool,
+    "gen": {
+        "default_open": str,
+    },
+    "test": {
+        "calibrated": bool,
+        "warm": bool,
+        "max_output_mb": NUMBER,
+    },
+    "sample_cache": {
+        "enabled": bool,
+        "ttl_hours": NUMBER,
+    },
+    "compile_cache": {
+        "enabled": bool,
+        "max_size_mb": NUMBER,
+    },
+    "test_commands": dict,
+}
+
+TYPE_NAMES = {str: "a string", bool: "true or false", NUMBER: "a number", COMMAND: "a string or a list", dict: "an object"}
+
+# Parsed configs keyed by the path of the directory they apply to, with the
+# (path, mtime, size) of every file they were built from
+_cache = {}
+
+# Files that were already reported as broken, so each warning is shown once
+_reported = set()
+
+def _warn(path, message):
+    if (path, message) in _reported:
+        return
+    _reported.add((path, message))
+    print(f"[CLI] \033[93mWarning: {path}: {message}\033[0m")
+
+def _type_ok(value, expected):
+    # JSON true/false are ints in Python, but never valid numbers here
+    if expected is NUMBER and isinstance(value, bool):
+        return False
+    if expected is COMMAND and isinstance(value, list):
+        return all(isinstance(v, str) for v in value)
+    return isinstance(value, expected)
+
+def _validate_commands(path, commands):
+    from .lang_map import LANGUAGE_TABLE
+    valid = {}
+    for symbol, cmds in commands.items():
+        if symbol not in LANGUAGE_TABLE:
+            _warn(path, f"test_commands.{symbol}: unknown language (known: {', '.join(LANGUAGE_TABLE)}). Ignored.")
+            continue
+        if not isinstance(cmds, dict):
+            _warn(path, f"test_commands.{symbol} must be an object with \"compile\" and/or \"run\". Ignored.")
+            continue
+        entry = {}
+        for key, value in cmds.items():
+            if key not in ("compile", "run"):
+                _warn(path, f"test_commands.{symbol}.{key}: unknown key. Ignored.")
+            elif key == "compile" and value is None:
+                entry[key] = None
+            elif not _type_ok(value, COMMAND) or not value:
+                _warn(path, f"test_commands.{symbol}.{key} must be a non-empty command string or list. Ignored.")
+            else:
+                entry[key] = value.split() if isinstance(value, str) else list(value)
+        valid[symbol] = entry
+    return valid
+
+def validate(path, data):
+    """
+    Returns the part of `data` that matches SCHEMA. Everything else is
+    reported once and dropped, so callers only ever see well-typed values.
+    """
+    if not isinstance(data, dict):
+        _warn(path, "The config must be a JSON object. Ignored.")
+        return {}
+    valid = {}
+    for key, value in data.items():
+        expected = SCHEMA.get(key)
+        if expected is None:
+            _warn(path, f"{key}: unknown key. Ignored.")
+        elif key == "test_commands":
+            if isinstance(value, dict):
+                valid[key] = _validate_commands(path, value)
+            else:
+                _warn(path, f"{key} must be {TYPE_NAMES[dict]}. Ignored.")
+        elif isinstance(expected, dict):
+            if not isinstance(value, dict):
+                _warn(path, f"{key} must be {TYPE_NAMES[dict]}. Ignored.")
+                continue
+            section = {}
+            for sub_key, sub_value in value.items():
+                sub_expected = expected.get(sub_key)
+                if sub_expected is None:
+                    _warn(path, f"{key}.{sub_key}: unknown key. Ignored.")
+                elif not _type_ok(sub_value, sub_expected):
+                    _warn(path, f"{key}.{sub_key} must be {TYPE_NAMES[sub_expected]} (got {json.dumps(sub_value)}). Using the default.")
+                else:
+                    section[sub_key] = sub_value
+            valid[key] = section
+        elif not _type_ok(value, expected):
+            _warn(path, f"{key} must be {TYPE_NAMES[expected]} (got {json.dumps(value)}). Using the default.")
+        else:
+            valid[key] = value
+    return valid
+
+def _merge(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def config_files(start_dir):
+    """
+    The config files that apply to `start_dir`, lowest priority first: the
+    global one, then every .atm_config.json from the root down to start_dir.
+    """
+    global_path = os.path.expanduser(CONFIG_PATH)
+    local = []
+    d = os.path.abspath(start_dir)
+    while True:
+        candidate = os.path.join(d, LOCAL_CONFIG_NAME)
+        if candidate != global_path:
+            local.append(candidate)
+        parent = os.path.dirname(d)
+        if parent == d:
+            break
+        d = parent
+    return [global_path] + local[::-1]
+
+def _signature(paths):
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        sig.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+class Config:
+    """
+    The merged, validated configuration for one directory. Values are only
+    the ones the user set; each module applies its own defaults.
+    """
+    def __init__(self, data, files):
+        self.data = data
+        self.files = files
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def section(self, name):
+        return self.data.get(name, {})
+
+    def test_commands(self, symbol):
+        """
+        {"compile": [...] or None, "run": [...]} overrides for a language,
+        with only the keys the user set.
+        """
+        return self.data.get("test_commands", {}).get(symbol, {})
+
+def load(start_dir=None):
+    """
+    Returns the Config for `start_dir` (default: the current directory).
+    Files are parsed once per process and again only when one of them changes,
+    so long-running modes (`atm test --watch`) pick up edits.
+    """
+    start_dir = os.path.abspath(start_dir or os.getcwd())
+    signature = _signature(config_files(start_dir))
+    cached = _cache.get(start_dir)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    data = {}
+    for path, _, _ in signature:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            _warn(path, f"Failed to parse -> {e}. Ignored.")
+            continue
+        data = _merge(data, validate(path, raw))
+
+    config = Config(data, [path for path, _, _ in signature])
+    _cache[start_dir] = (signature, config)
+    return config
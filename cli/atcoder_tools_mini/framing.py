@@ -0,0 +1,78 @@
+import json
+import struct
+
+# Every message is framed as a 4-byte big-endian length followed by UTF-8 JSON
+HEADER = struct.Struct("!I")
+
+CHUNK_SIZE = 64 * 1024
+
+def encode_frame(payload):
+    body = json.dumps(payload).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+def decode_frame(body):
+    """
+    Parses a complete frame body. The body is only decoded once it has been read
+    in full, so multi-byte UTF-8 characters split across `recv` calls are never
+    an issue. Returns None for malformed frames.
+    """
+    try:
+        msg = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return msg if isinstance(msg, dict) else None
+
+class FrameReader:
+    """
+    Incremental reader for length-prefixed frames on a socket.
+
+    Small frames are served from a fixed read-ahead chunk; once a frame's length
+    is known, its body is allocated once and the rest of it is received straight
+    into that buffer with `recv_into`. Every byte is copied at most once, so
+    reading a frame is linear in its size no matter how many `recv` calls it
+    spans.
+    """
+    def __init__(self, sock, chunk_size=CHUNK_SIZE):
+        self.sock = sock
+        self.chunk = bytearray(chunk_size)
+        self.view = memoryview(self.chunk)
+        self.start = 0
+        self.end = 0
+
+    def read_frame(self):
+        """
+        Returns the next frame body as a bytearray, or None on EOF.
+        """
+        header = self._read_exact(HEADER.size)
+        if header is None:
+            return None
+        (length,) = HEADER.unpack(header)
+        return self._read_exact(length)
+
+    def _read_exact(self, size):
+        out = bytearray(size)
+        dest = memoryview(out)
+
+        pos = min(self.end - self.start, size)
+        dest[:pos] = self.view[self.start:self.start + pos]
+        self.start += pos
+
+        while pos < size:
+            remaining = size - pos
+            if remaining >= len(self.chunk):
+                received = self.sock.recv_into(dest[pos:])
+                if received == 0:
+                    return None
+                pos += received
+                continue
+
+            self.start = 0
+            self.end = self.sock.recv_into(self.view)
+            if self.end == 0:
+                return None
+            take = min(self.end, remaining)
+            dest[pos:pos + take] = self.view[:take]
+            self.start = take
+            pos += take
+
+        return out
@@ -1,8 +1,36 @@
-import socket
+import re
+import glob
 import json
 import os
 import sys
 
+from .client import get_connection
+from . import sample_cache
+from . import config
+
+DEFAULT_TIME_LIMIT_MS = 2000
+DEFAULT_MEMORY_LIMIT_MB = 1024
+
+# Sample files written by `gen`; other files in in/ and out/ are the user's
+SAMPLE_FILE = re.compile(r"(in|out)_\d+\.txt")
+
+# Task directories are built under ".<label>.staging-*" next to their final place
+STAGING_SUFFIX = ".staging-"
+
+# Compact encodings of task payloads this CLI understands (see `unpack_task`)
+ACCEPTED_ENCODINGS = ["deflate"]
+
+def unpack_task(msg):
+    """
+    The task carried by a `gen_task` or `task_samples` reply. Large tasks
+    arrive as base64 of their zlib-compressed JSON in `task_deflated`.
+    """
+    if "task_deflated" in msg:
+        import base64
+        import zlib
+        return json.loads(zlib.decompress(base64.b64decode(msg["task_deflated"])))
+    return msg["task"]
+
 def colorize_msg(msg):
     import re
     msg = re.sub(r'\b(Successfully|Success)\b', r'\033[92m\1\033[0m', msg)
@@ -28,22 +56,12 @@ def gen_contest(args):
     open_target = None
     if getattr(args, "open", None) is not None:
         if args.open == "default":
-            # Attempt to read from config
-            config_path = os.path.expanduser("~/.atm_config.json")
-            config_open = "A" # Fallback default
-            if os.path.isfile(config_path):
-                try:
-                    with open(config_path, "r", encoding="utf-8") as f:
-                        config_data = json.load(f)
-                        if "gen" in config_data and "default_open" in config_data["gen"]:
-                            config_open = config_data["gen"]["default_open"]
-                except Exception:
-                    pass
-            open_target = config_open
+            open_target = config.load().section("gen").get("default_open", "A")
         else:
             open_target = args.open
 
-    if os.path.exists(contest_dir):
+    update = getattr(args, "update", False)
+    if os.path.exists(contest_dir) and not update:
         if open_target:
             print(colorize_msg(f"[CLI] \033[93mWarning: Directory '{contest_dir}' already exists. Skipping download, but opening '{open_target}' in browser...\033[0m"))
             payload = {
@@ -55,117 +73,214 @@ def gen_contest(args):
             sys.exit(0)
         else:
             print(colorize_msg(f"[CLI] Error: Directory '{contest_dir}' already exists."))
-            print(colorize_msg("[CLI] Aborting to prevent overwriting existing files."))
+            print(colorize_msg("[CLI] Aborting to prevent overwriting existing files. Use --update to fill in missing tasks and rewrite changed samples (your code is kept)."))
             sys.exit(1)
 
+    refresh = getattr(args, "refresh", False)
+    cache_enabled, cache_ttl = sample_cache.load_settings()
+    
+    if cache_enabled and not refresh:
+        cached_tasks = sample_cache.load_contest(contest_id, cache_ttl)
+        if cached_tasks:
+            print(f"[CLI] Found all {len(cached_tasks)} tasks of {contest_id} in the local sample cache. Skipping download.")
+            build_workspace({"contest_id": contest_id, "tasks": cached_tasks}, cwd, args.template)
+            if open_target:
+                payload = {
+                    "action": "open_only",
+                    "contest_id": contest_id,
+                    "open_target": open_target,
+                    "tasks": [{"label": t["label"], "screen_name": t["screen_name"]} for t in cached_tasks]
+                }
+                send_gen_request(payload, cwd=cwd, template_path=None)
+            return
+    
     payload = {
         "action": "gen",
         "contest_id": contest_id,
-        "open_target": open_target
+        "open_target": open_target,
+        "stream": True,
+        "refresh": refresh,
+        "encodings": ACCEPTED_ENCODINGS
     }
     
     send_gen_request(payload, cwd=cwd, template_path=args.template)
 
-def request_current_context():
+def request_current_context(with_samples=True):
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect(('127.0.0.1', 49153))
+        conn = get_connection()
+        req_id = conn.request({"action": "get_current_context", "samples": with_samples})
         
-        payload = {"action": "get_current_context"}
-        s.sendall((json.dumps(payload) + "\n").encode('utf-8'))
+        for msg in conn.messages(req_id):
+            if msg.get("action") == "current_context":
+                contest_id = msg.get("contest_id")
+                task = msg.get("task_screen_name")
+                print(f"[CLI] Inferred context from browser: {task or contest_id}")
+                conn.finish(req_id)
+                return msg
+            elif msg.get("action") == "current_context_error":
+                print(f"[CLI] \033[91mError: {msg.get('error')}\033[0m")
+                conn.finish(req_id)
+                return None
+    except ConnectionRefusedError:
+        print("[CLI] \033[91mError: Could not connect to background Native Host.\033[0m")
+        return None
+
+def request_task_samples(contest_id, task_screen_name):
+    """
+    Returns the task ({screen_name, samples, time_limit_ms, memory_limit_mb}),
+    from the local sample cache if possible and otherwise through the browser.
+    Returns None on failure.
+    """
+    cache_enabled, cache_ttl = sample_cache.load_settings()
+    if cache_enabled:
+        cached = sample_cache.load_task(task_screen_name, cache_ttl)
+        if cached:
+            print(f"[CLI] Using cached samples for {task_screen_name}.")
+            return cached
+    
+    try:
+        conn = get_connection()
+        req_id = conn.request({"action": "get_task_samples", "contest_id": contest_id, "task_screen_name": task_screen_name,
+                               "encodings": ACCEPTED_ENCODINGS})
         
-        buffer = ""
-        while True:
-            data = s.recv(4096)
-            if not data:
-                break
-            
-            buffer += data.decode('utf-8')
-            while '\n' in buffer:
-                line, buffer = buffer.split('\n', 1)
-                if not line.strip():
-                    continue
-                try:
-                    msg = json.loads(line)
-                    if msg.get("action") == "current_context":
-                        contest_id = msg.get("contest_id")
-                        contest_id = msg.get("contest_id")
-                        task = msg.get("task_screen_name")
-                        print(f"[CLI] Inferred context from browser: {task or contest_id}")
-                        s.close()
-                        return msg
-                    elif msg.get("action") == "current_context_error":
-                        print(f"[CLI] \033[91mError: {msg.get('error')}\033[0m")
-                        s.close()
-                        return None
-                except json.JSONDecodeError:
-                    pass
+        for msg in conn.messages(req_id):
+            if msg.get("action") == "task_samples":
+                conn.finish(req_id)
+                task = unpack_task(msg)
+                if cache_enabled and task.get("samples"):
+                    sample_cache.store_task(contest_id, task)
+                return task
+            elif msg.get("action") == "task_samples_error":
+                print(f"[CLI] \033[91mError: {msg.get('error')}\033[0m")
+                conn.finish(req_id)
+                return None
     except ConnectionRefusedError:
         print("[CLI] \033[91mError: Could not connect to background Native Host.\033[0m")
         return None
 
 def send_gen_request(payload, cwd, template_path):
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect(('127.0.0.1', 49153))
-        
-        s.sendall((json.dumps(payload) + "\n").encode('utf-8'))
+        conn = get_connection()
+        req_id = conn.request(payload)
         
         print(f"[CLI] Requested generation for contest: {payload['contest_id']}")
         
-        buffer = ""
-        while True:
-            data = s.recv(4096)
-            if not data:
-                break
-            
-            buffer += data.decode('utf-8')
-            while '\n' in buffer:
-                line, buffer = buffer.split('\n', 1)
-                if not line.strip():
-                    continue
-                try:
-                    msg = json.loads(line)
-                    if msg.get("action") == "gen_log":
-                        print(colorize_msg(f"[CLI] {msg.get('message')}"))
-                    elif msg.get("action") == "gen_error":
-                        print(colorize_msg(f"[CLI] Error: {msg.get('error')}"))
-                        return
-                    elif msg.get("action") == "gen_result":
-                        print(colorize_msg("\n[CLI] Download complete! Building workspace..."))
-                        build_workspace(msg, cwd, template_path)
-                        return
-                    elif msg.get("action") == "open_result":
-                        # Handled open_only successfully
-                        return
-                except json.JSONDecodeError:
-                    pass
+        # With streaming, each task arrives as its own `gen_task` message and is written
+        # right away, so the first task is usable while the rest are still downloading.
+        workspace = None
+        cache_enabled, _ = sample_cache.load_settings()
+        cached_names = set()
+        
+        for msg in conn.messages(req_id):
+            if msg.get("action") == "gen_log":
+                print(colorize_msg(f"[CLI] {msg.get('message')}"))
+            elif msg.get("action") == "gen_error":
+                print(colorize_msg(f"[CLI] Error: {msg.get('error')}"))
+                return
+            elif msg.get("action") == "gen_task":
+                if workspace is None:
+                    workspace = prepare_workspace(msg["contest_id"], cwd, template_path)
+                task = unpack_task(msg)
+                task_dir, written = write_task(workspace, task)
+                if written:
+                    print(colorize_msg(f"[CLI]   => Task {task['label']} is ready: {task_dir}"))
+                else:
+                    print(colorize_msg(f"[CLI]   => Task {task['label']} is unchanged: {task_dir}"))
+                if cache_enabled:
+                    sample_cache.store_task(msg["contest_id"], task)
+                    cached_names.add(task["screen_name"])
+            elif msg.get("action") == "gen_result":
+                if cache_enabled:
+                    for task in msg.get("tasks", []):
+                        sample_cache.store_task(msg["contest_id"], task)
+                        cached_names.add(task["screen_name"])
+                    # The task list is only cached once every task's samples are, so that a
+                    # later cache hit never yields a partial workspace.
+                    task_list = msg.get("task_list") or msg.get("tasks", [])
+                    if task_list and all(t["screen_name"] in cached_names for t in task_list):
+                        sample_cache.store_contest(msg["contest_id"], task_list)
+                
+                if workspace is None or msg.get("tasks"):
+                    # Extension without streaming support: everything arrives at once
+                    print(colorize_msg("\n[CLI] Download complete! Building workspace..."))
+                    build_workspace(msg, cwd, template_path)
+                else:
+                    print(colorize_msg(f"\n[CLI] Download complete! Successfully generated workspace at {workspace['contest_dir']}"))
+                return
+            elif msg.get("action") == "open_result":
+                # Handled open_only successfully
+                return
     except ConnectionRefusedError:
         print(colorize_msg("[CLI] Error: Could not connect to background Native Host."))
         print(colorize_msg("[CLI] Please ensure you have run 'python install_native.py', closed your browser and re-opened it."))
 
-def build_workspace(data, cwd, template_path):
-    contest_id = data.get("contest_id")
-    tasks = data.get("tasks", [])
+def prefetch_contest(args):
+    """
+    `atm prefetch`: has the extension download a contest the moment its tasks
+    become visible and stores everything in the local sample cache, so that
+    `atm gen` afterwards needs neither the browser nor the network.
+    """
+    contest_id = args.contest_id
+    cache_enabled, cache_ttl = sample_cache.load_settings()
+    if not cache_enabled:
+        print(colorize_msg("[CLI] Error: Prefetching fills the sample cache, which is disabled (\"sample_cache\": {\"enabled\": false})."))
+        sys.exit(1)
+    if not getattr(args, "refresh", False) and sample_cache.load_contest(contest_id, cache_ttl):
+        print(f"[CLI] {contest_id} is already in the local sample cache. `atm gen {contest_id}` will run offline.")
+        return
     
+    try:
+        conn = get_connection()
+        req_id = conn.request({"action": "prefetch", "contest_id": contest_id, "encodings": ACCEPTED_ENCODINGS})
+        print(f"[CLI] Prefetch armed for {contest_id}. Keep this running until it finishes (Ctrl+C to cancel).")
+        
+        cached_names = set()
+        for msg in conn.messages(req_id):
+            if msg.get("action") == "gen_log":
+                print(colorize_msg(f"[CLI] {msg.get('message')}"))
+            elif msg.get("action") == "gen_error":
+                print(colorize_msg(f"[CLI] Error: {msg.get('error')}"))
+                sys.exit(1)
+            elif msg.get("action") == "gen_task":
+                task = unpack_task(msg)
+                sample_cache.store_task(msg["contest_id"], task)
+                cached_names.add(task["screen_name"])
+            elif msg.get("action") == "gen_result":
+                task_list = msg.get("task_list", [])
+                missing = [t["label"] for t in task_list if t["screen_name"] not in cached_names]
+                if not task_list or missing:
+                    print(colorize_msg(f"[CLI] Error: Failed to download {', '.join(missing) or 'the task list'}. Run `atm prefetch {contest_id}` again or use `atm gen`."))
+                    sys.exit(1)
+                sample_cache.store_contest(msg["contest_id"], task_list)
+                print(colorize_msg(f"[CLI] Successfully prefetched {len(task_list)} tasks. `atm gen {contest_id}` will now run offline."))
+                return
+        print(colorize_msg("[CLI] Error: The native host closed the connection."))
+        sys.exit(1)
+    except ConnectionRefusedError:
+        print(colorize_msg("[CLI] Error: Could not connect to background Native Host."))
+        print(colorize_msg("[CLI] Please ensure you have run 'python install_native.py', closed your browser and re-opened it."))
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n[CLI] \033[90mPrefetch cancelled.\033[0m")
+
+def prepare_workspace(contest_id, cwd, template_path):
+    """
+    Creates the contest directory and resolves the language and template
+    shared by every task. Returns a dict consumed by `write_task`.
+    """
     contest_dir = os.path.join(cwd, contest_id)
     os.makedirs(contest_dir, exist_ok=True)
+    # Left over by an interrupted gen
+    import shutil
+    for staging in glob.glob(os.path.join(glob.escape(contest_dir), f".*{STAGING_SUFFIX}*")):
+        shutil.rmtree(staging, ignore_errors=True)
     
     # Read config for language and template preferences
     template_content = ""
-    lang = "cpp"
-    
-    config_path = os.path.expanduser("~/.atm_config.json")
-    if os.path.isfile(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                if not template_path and "template_path" in config:
-                    template_path = os.path.expanduser(config["template_path"])
-                if "lang" in config:
-                    lang = config["lang"].lower()
-        except Exception as e:
-            print(f"[CLI] Warning: Failed to parse {config_path} -> {e}")
+    settings = config.load(cwd)
+    lang = settings.get("lang", "cpp").lower()
+    if not template_path and settings.get("template_path"):
+        template_path = os.path.expanduser(settings.get("template_path"))
 
     from .lang_map import LANGUAGE_TABLE
     ext = LANGUAGE_TABLE.get(lang, {}).get("extensions", [".cpp"])[0]
@@ -185,55 +300,139 @@ def build_workspace(data, cwd, template_path):
         else:
             template_content = ""
 
-    for task in tasks:
-        label = task["label"]
-        samples = task["samples"]
-        
-        # A, B, C...
-        task_dir = os.path.join(contest_dir, label)
-        in_dir = os.path.join(task_dir, "in")
-        out_dir = os.path.join(task_dir, "out")
+    return {
+        "contest_id": contest_id,
+        "contest_dir": contest_dir,
+        "code_filename": code_filename,
+        "template_content": template_content,
+        "lang": lang
+    }
+
+def judge_spec(task):
+    """
+    The `judge` section of metadata.json for a task fetched by the extension.
+    """
+    if task.get("interactive"):
+        return {"judge_type": "interactive"}
+    if task.get("error_tolerance"):
+        return {"judge_type": "decimal", **task["error_tolerance"]}
+    return {"judge_type": "normal"}
+
+def task_files(workspace, task):
+    """
+    The files `gen` owns in a task directory, as {relative path: content}:
+    the samples and metadata.json. The code file is not one of them, since it
+    belongs to the user once created.
+    """
+    files = {}
+    for idx, sample in enumerate(task["samples"], 1):
+        files[os.path.join("in", f"in_{idx}.txt")] = sample["input"]
+        files[os.path.join("out", f"out_{idx}.txt")] = sample["output"]
+    
+    # Limits come from the task page; older extensions don't send them
+    time_limit_ms = task.get("time_limit_ms") or DEFAULT_TIME_LIMIT_MS
+    memory_limit_mb = task.get("memory_limit_mb") or DEFAULT_MEMORY_LIMIT_MB
+    
+    # metadata.json for atcoder-tools compatibility
+    metadata = {
+        "code_filename": workspace["code_filename"],
+        "judge": judge_spec(task),
+        "lang": workspace["lang"],
+        "memory_limit_mb": memory_limit_mb,
+        "problem": {
+            "alphabet": task["label"],
+            "contest": {
+                "contest_id": workspace["contest_id"]
+            },
+            "problem_id": task["screen_name"]
+        },
+        "sample_in_pattern": "in_*.txt",
+        "sample_out_pattern": "out_*.txt",
+        "timeout_ms": time_limit_ms
+    }
+    files["metadata.json"] = json.dumps(metadata, indent=1, sort_keys=True) + "\n"
+    return files
+
+def existing_task_files(task_dir):
+    """
+    The files of an existing task directory that `gen` would own, in the
+    shape of `task_files`. Cases the user added under other names are left out.
+    """
+    files = {}
+    for sub in ("in", "out"):
+        sub_dir = os.path.join(task_dir, sub)
+        if not os.path.isdir(sub_dir):
+            continue
+        for name in os.listdir(sub_dir):
+            if SAMPLE_FILE.fullmatch(name):
+                with open(os.path.join(sub_dir, name), "r", encoding="utf-8") as f:
+                    files[os.path.join(sub, name)] = f.read()
+    metadata_file = os.path.join(task_dir, "metadata.json")
+    if os.path.isfile(metadata_file):
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            files["metadata.json"] = f.read()
+    return files
+
+def write_task(workspace, task):
+    """
+    Writes one task directory: code template, samples and metadata.json.
+    
+    Everything is written to a staging directory first. A new task directory
+    then appears with a single rename, so an interrupted gen never leaves a
+    half-written task behind. An existing one (`gen --update`) is left alone
+    if its samples and metadata are unchanged; otherwise each file is swapped
+    in atomically, metadata.json last.
+    
+    Returns (task_dir, written).
+    """
+    import shutil
+    import tempfile
+    
+    # A, B, C...
+    label = task["label"]
+    task_dir = os.path.join(workspace["contest_dir"], label)
+    files = task_files(workspace, task)
+    existing = existing_task_files(task_dir) if os.path.isdir(task_dir) else None
+    if existing == files:
+        return task_dir, False
+    
+    staging = tempfile.mkdtemp(prefix=f".{label}{STAGING_SUFFIX}", dir=workspace["contest_dir"])
+    try:
+        os.makedirs(os.path.join(staging, "in"))
+        os.makedirs(os.path.join(staging, "out"))
+        for rel_path, content in files.items():
+            with open(os.path.join(staging, rel_path), "w", encoding="utf-8") as f:
+                f.write(content)
         
-        os.makedirs(in_dir, exist_ok=True)
-        os.makedirs(out_dir, exist_ok=True)
+        main_file = os.path.join(task_dir, workspace["code_filename"])
+        if existing is None:
+            with open(os.path.join(staging, workspace["code_filename"]), "w", encoding="utf-8") as f:
+                f.write(workspace["template_content"])
+            os.rename(staging, task_dir)
+            return task_dir, True
         
-        # Write template
-        main_file = os.path.join(task_dir, code_filename)
+        for rel_path in sorted(files, key=lambda p: p == "metadata.json"):
+            os.makedirs(os.path.dirname(os.path.join(task_dir, rel_path)), exist_ok=True)
+            os.replace(os.path.join(staging, rel_path), os.path.join(task_dir, rel_path))
+        # Samples that no longer exist on the task page
+        for rel_path in existing.keys() - files.keys():
+            os.remove(os.path.join(task_dir, rel_path))
         if not os.path.exists(main_file):
             with open(main_file, "w", encoding="utf-8") as f:
-                f.write(template_content)
-        
-        for i, sample in enumerate(samples):
-            idx = i + 1
-            in_file = os.path.join(in_dir, f"in_{idx}.txt")
-            out_file = os.path.join(out_dir, f"out_{idx}.txt")
-            
-            with open(in_file, "w", encoding="utf-8") as f:
-                f.write(sample["input"])
-            with open(out_file, "w", encoding="utf-8") as f:
-                f.write(sample["output"])
+                f.write(workspace["template_content"])
+        return task_dir, True
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def build_workspace(data, cwd, template_path):
+    contest_id = data.get("contest_id")
+    tasks = data.get("tasks", [])
+    
+    workspace = prepare_workspace(contest_id, cwd, template_path)
+    written = 0
+    for task in tasks:
+        written += write_task(workspace, task)[1]
+    if written < len(tasks):
+        print(f"[CLI] {len(tasks) - written} of {len(tasks)} tasks were unchanged.")
         
-        # Write metadata.json for atcoder-tools compatibility
-        metadata = {
-            "code_filename": code_filename,
-            "judge": {
-                "judge_type": "normal"
-            },
-            "lang": lang,
-            "problem": {
-                "alphabet": label,
-                "contest": {
-                    "contest_id": contest_id
-                },
-                "problem_id": task["screen_name"]
-            },
-            "sample_in_pattern": "in_*.txt",
-            "sample_out_pattern": "out_*.txt",
-            "timeout_ms": 2000
-        }
-        metadata_file = os.path.join(task_dir, "metadata.json")
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=1, sort_keys=True)
-            f.write("\n")
-                
-    print(colorize_msg(f"[CLI] Successfully generated workspace at {contest_dir}"))
+    print(colorize_msg(f"[CLI] Successfully generated workspace at {workspace['contest_dir']}"))
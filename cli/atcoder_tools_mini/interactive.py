@@ -0,0 +1,244 @@
+import os
+import time
+import signal
+import selectors
+import subprocess
+from collections import deque
+
+from .runner import _exit_code, _rss_kb
+
+# The interaction is declared deadlocked once no byte has moved for this long
+# while neither side used any CPU, i.e. both are blocked reading from each other
+DEADLOCK_MS = 500
+
+# The interactor is not held to the task's limit, but it must not hang either
+INTERACTOR_GRACE = 5.0
+
+TRANSCRIPT_LINES = 20
+
+POLL_INTERVAL = 0.01
+
+def _cpu_seconds(pid):
+    """
+    CPU time used so far by a running process, from /proc on Linux.
+    Returns None elsewhere (deadlock detection then relies on traffic only).
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class _Side:
+    def __init__(self, proc):
+        self.proc = proc
+        self.start = time.perf_counter()
+        self.end = None
+        self.status = None
+        self.rusage = None
+        self.killed = False
+        self.stderr = []
+
+    def reap(self, block=False):
+        if self.status is not None:
+            return True
+        try:
+            pid, status, rusage = os.wait4(self.proc.pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return True
+        if pid == 0:
+            return False
+        self.status = status
+        self.rusage = rusage
+        self.end = time.perf_counter()
+        self.proc.returncode = _exit_code(status)
+        return True
+
+    def kill(self):
+        if self.status is None:
+            self.killed = True
+            try:
+                os.kill(self.proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+class _Relay:
+    """
+    Copies one process's stdout into the other's stdin through a non-blocking
+    buffer, counting lines and keeping the end of the transcript.
+    """
+    def __init__(self, src, dst, tag, transcript):
+        self.src = src
+        self.dst = dst
+        self.tag = tag
+        self.transcript = transcript
+        self.pending = bytearray()
+        self.partial = bytearray()
+        self.lines = 0
+        self.bytes = 0
+        self.eof = False
+
+    def feed(self, data):
+        self.bytes += len(data)
+        self.pending += data
+        self.partial += data
+        while True:
+            idx = self.partial.find(b"\n")
+            if idx < 0:
+                break
+            self.lines += 1
+            self.transcript.append((self.tag, bytes(self.partial[:idx])))
+            del self.partial[:idx + 1]
+
+    def flush(self):
+        """
+        Writes as much of the pending buffer as the pipe accepts.
+        Returns False once the destination is gone.
+        """
+        if self.dst is None:
+            self.pending.clear()
+            return False
+        try:
+            while self.pending:
+                written = os.write(self.dst.fileno(), self.pending)
+                del self.pending[:written]
+        except BlockingIOError:
+            pass
+        except (BrokenPipeError, OSError):
+            self.close_dst()
+            return False
+        if self.eof and not self.pending:
+            self.close_dst()
+        return True
+
+    def close_dst(self):
+        if self.dst is not None:
+            try:
+                self.dst.close()
+            except OSError:
+                pass
+            self.dst = None
+        self.pending.clear()
+
+def run_interactive(sol_cmd, interactor_cmd, in_file, out_file, timeout, cwd=None, on_spawn=None):
+    """
+    Runs the solution against an interactor. The interactor is started as
+    `<interactor_cmd> <in_file> [<out_file>]`, talks to the solution over
+    stdin/stdout and reports the verdict through its exit code (0 = AC).
+
+    Both sides are connected through this process over non-blocking pipes, so
+    the traffic can be counted and a deadlock (both sides waiting to read)
+    detected early instead of running into the time limit. `on_spawn`, if
+    given, receives a function that kills each side (as in runner.run_process).
+    """
+    inter_args = interactor_cmd + [in_file] + ([out_file] if out_file else [])
+    pipes = dict(stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+    sol = _Side(subprocess.Popen(sol_cmd, **pipes))
+    inter = _Side(subprocess.Popen(inter_args, **pipes))
+    if on_spawn:
+        on_spawn(sol.kill)
+        on_spawn(inter.kill)
+
+    for pipe in (sol.proc.stdin, sol.proc.stdout, sol.proc.stderr,
+                 inter.proc.stdin, inter.proc.stdout, inter.proc.stderr):
+        os.set_blocking(pipe.fileno(), False)
+
+    transcript = deque(maxlen=TRANSCRIPT_LINES)
+    queries = _Relay(sol.proc.stdout, inter.proc.stdin, ">", transcript)
+    answers = _Relay(inter.proc.stdout, sol.proc.stdin, "<", transcript)
+
+    selector = selectors.DefaultSelector()
+    selector.register(sol.proc.stdout, selectors.EVENT_READ, queries)
+    selector.register(inter.proc.stdout, selectors.EVENT_READ, answers)
+    selector.register(sol.proc.stderr, selectors.EVENT_READ, sol.stderr)
+    selector.register(inter.proc.stderr, selectors.EVENT_READ, inter.stderr)
+    open_reads = 4
+
+    deadline = sol.start + timeout
+    last_activity = time.perf_counter()
+    last_cpu = None
+    deadlocked = False
+
+    while True:
+        for key, _ in selector.select(POLL_INTERVAL if open_reads else 0):
+            try:
+                data = os.read(key.fileobj.fileno(), 65536)
+            except BlockingIOError:
+                continue
+            if not data:
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+                open_reads -= 1
+                if isinstance(key.data, _Relay):
+                    key.data.eof = True
+                    key.data.flush()
+                continue
+            if isinstance(key.data, _Relay):
+                key.data.feed(data)
+                key.data.flush()
+                last_activity = time.perf_counter()
+                last_cpu = None
+            else:
+                key.data.append(data)
+
+        for relay in (queries, answers):
+            if relay.pending:
+                relay.flush()
+
+        sol.reap()
+        inter.reap()
+        now = time.perf_counter()
+        if sol.status is not None and inter.status is not None:
+            # A grandchild may still hold a pipe open; don't wait on it for long
+            if open_reads == 0 or now - max(sol.end, inter.end) > 1.0:
+                break
+            continue
+
+        if sol.status is None and now >= deadline:
+            sol.kill()
+        if inter.status is None and now >= deadline + INTERACTOR_GRACE:
+            inter.kill()
+
+        if sol.status is None and inter.status is None and (now - last_activity) * 1000 >= DEADLOCK_MS:
+            cpu = (_cpu_seconds(sol.proc.pid), _cpu_seconds(inter.proc.pid))
+            if None not in cpu and cpu == last_cpu:
+                deadlocked = True
+                sol.kill()
+                inter.kill()
+            last_cpu = cpu
+            last_activity = now
+
+    selector.close()
+    for pipe in (sol.proc.stdout, sol.proc.stderr, inter.proc.stdout, inter.proc.stderr):
+        if not pipe.closed:
+            pipe.close()
+    for pipe in (sol.proc.stdin, inter.proc.stdin):
+        try:
+            pipe.close()
+        except OSError:
+            pass
+    sol.reap(block=True)
+    inter.reap(block=True)
+
+    return {
+        "sol_returncode": sol.proc.returncode,
+        "sol_timed_out": sol.killed and not deadlocked,
+        "deadlocked": deadlocked,
+        "sol_wall_ms": (sol.end - sol.start) * 1000,
+        "sol_user_ms": sol.rusage.ru_utime * 1000,
+        "sol_sys_ms": sol.rusage.ru_stime * 1000,
+        "sol_max_rss_kb": _rss_kb(sol.rusage.ru_maxrss),
+        "sol_stderr": b"".join(sol.stderr),
+        "interactor_returncode": inter.proc.returncode,
+        "interactor_killed": inter.killed,
+        "interactor_exited_first": inter.end < sol.end,
+        "interactor_cpu_ms": (inter.rusage.ru_utime + inter.rusage.ru_stime) * 1000,
+        "interactor_stderr": b"".join(inter.stderr),
+        "queries": queries.lines,
+        "answers": answers.lines,
+        "transcript": list(transcript),
+    }
+
+def supported():
+    return os.name != "nt" and hasattr(os, "wait4")
@@ -0,0 +1,446 @@
+import os
+import re
+import math
+import mmap
+import subprocess
+from collections import deque
+
+CHUNK_SIZE = 64 * 1024
+
+# The external checker is not held to the task's limit, but it must not hang
+CHECKER_TIMEOUT = 10.0
+
+WHITESPACE = b" \t\r\n\x0b\x0c"
+
+TOKEN_RE = re.compile(rb"\S+")
+
+# How much output is kept around the first mismatch for the diff window
+WINDOW_BYTES = 4096
+WINDOW_LINES = 2
+WINDOW_LINE_WIDTH = 200
+
+class _Lines:
+    """
+    Splits a byte stream into lines with the comparison rules `atm test` has
+    always used: leading and trailing whitespace of the whole output and
+    trailing whitespace of every line are ignored. Units are (offset, line).
+    """
+    unit = "line"
+
+    def __init__(self):
+        self.units = deque()
+        self.partial = bytearray()
+        self.consumed = 0
+        self.started = False
+        self.blanks = []
+
+    def _emit(self, offset, line):
+        line = line.rstrip(WHITESPACE)
+        if not line:
+            # Blank lines only count once something follows them
+            self.blanks.append(offset)
+            return
+        self.units.extend((blank, b"") for blank in self.blanks)
+        self.blanks.clear()
+        self.units.append((offset, line))
+
+    def push(self, chunk):
+        if not self.started:
+            stripped = chunk.lstrip(WHITESPACE)
+            self.consumed += len(chunk) - len(stripped)
+            chunk = stripped
+            if not chunk:
+                return
+            self.started = True
+        self.partial += chunk
+        start = 0
+        while True:
+            idx = self.partial.find(b"\n", start)
+            if idx < 0:
+                break
+            self._emit(self.consumed + start, bytes(self.partial[start:idx]))
+            start = idx + 1
+        del self.partial[:start]
+        self.consumed += start
+
+    def close(self):
+        if self.partial:
+            self._emit(self.consumed, bytes(self.partial))
+            self.consumed += len(self.partial)
+            self.partial.clear()
+
+class _Tokens:
+    """
+    Splits a byte stream into whitespace-separated tokens. A token cut by a
+    chunk boundary is carried over to the next push. Units are (offset, token).
+    """
+    unit = "token"
+
+    def __init__(self):
+        self.units = deque()
+        self.partial = b""
+        self.consumed = 0
+
+    def push(self, chunk):
+        data = self.partial + bytes(chunk)
+        base = self.consumed - len(self.partial)
+        self.consumed += len(chunk)
+        self.partial = b""
+        matches = list(TOKEN_RE.finditer(data))
+        if matches and matches[-1].end() == len(data):
+            self.partial = matches.pop().group()
+        self.units.extend((base + m.start(), m.group()) for m in matches)
+
+    def close(self):
+        if self.partial:
+            self.units.append((self.consumed - len(self.partial), self.partial))
+            self.partial = b""
+
+def _float_or_none(token):
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+def _window(data, data_start, offset, first_line_no):
+    """
+    The lines of `data` (which starts at stream offset `data_start` on line
+    `first_line_no`) around `offset`, as [(line_no, text, is_target)].
+    """
+    pos = max(0, min(offset - data_start, len(data)))
+    target = first_line_no + data.count(b"\n", 0, pos)
+    line_start = data.rfind(b"\n", 0, pos) + 1
+    start = line_start
+    for _ in range(WINDOW_LINES):
+        if start == 0:
+            break
+        start = data.rfind(b"\n", 0, start - 1) + 1
+
+    lines = []
+    line_no = target - data.count(b"\n", start, line_start)
+    for raw in bytes(data[start:]).split(b"\n")[:target - line_no + WINDOW_LINES + 1]:
+        text = raw.rstrip(b"\r").decode("utf-8", errors="replace")
+        if len(text) > WINDOW_LINE_WIDTH:
+            text = text[:WINDOW_LINE_WIDTH] + "..."
+        lines.append((line_no, text, line_no == target))
+        line_no += 1
+    return lines
+
+class StreamComparison:
+    """
+    One comparison of a program's output, pushed chunk by chunk with `feed`
+    (typically straight from the pipe while the program runs), against an
+    expected output that is memory-mapped. Only the units that are not yet
+    matched and a bounded window of recent output are held in memory, never
+    either output as a whole.
+    """
+    def __init__(self, expected_path, splitter, equal):
+        self.expected_file = open(expected_path, "rb")
+        size = os.fstat(self.expected_file.fileno()).st_size
+        self.expected_data = mmap.mmap(self.expected_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.expected_pos = 0
+        self.expected = splitter()
+        self.actual = splitter()
+        self.equal = equal
+        self.index = 0
+        self.mismatch = None
+
+        # Rolling window of the output, kept to show the lines around a mismatch
+        self.recent = bytearray()
+        self.recent_start = 0
+        self.recent_first_line = 1
+        self.actual_pos = 0
+        self.mismatch_offset = None
+
+        # As long as the output is byte-for-byte identical to the expected one,
+        # it is only compared with memcmp; see _leave_fast_path
+        self.identical = True
+
+    @property
+    def expected_eof(self):
+        return self.expected_pos >= len(self.expected_data) and not self.expected.partial
+
+    def _fill_expected(self):
+        if self.expected_pos < len(self.expected_data):
+            chunk = self.expected_data[self.expected_pos:self.expected_pos + CHUNK_SIZE]
+            self.expected_pos += len(chunk)
+            self.expected.push(chunk)
+        else:
+            self.expected.close()
+
+    def _match(self):
+        actual = self.actual.units
+        expected = self.expected.units
+        while actual and self.mismatch is None:
+            while not expected and not self.expected_eof:
+                self._fill_expected()
+            if not expected:
+                self.mismatch = (self.index, None, actual[0])
+                break
+            a = actual.popleft()
+            e = expected.popleft()
+            if not self.equal(a[1], e[1]):
+                self.mismatch = (self.index, e, a)
+                break
+            self.index += 1
+
+    def _trim_recent(self, keep_from, keep_to):
+        keep_from = max(keep_from, self.recent_start)
+        drop = keep_from - self.recent_start
+        if drop > 0:
+            self.recent_first_line += self.recent.count(b"\n", 0, drop)
+            del self.recent[:drop]
+            self.recent_start = keep_from
+        if keep_to - self.recent_start < len(self.recent):
+            del self.recent[max(0, keep_to - self.recent_start):]
+
+    def _leave_fast_path(self, chunk):
+        """
+        Switches from the byte comparison to unit-by-unit matching and returns
+        what the actual splitter still has to be pushed. Everything before
+        `chunk` equals the expected output, so the splitters start at
+        the end of the last non-blank line of that common prefix, where both
+        are in a clean state, and the units before it are counted rather than
+        compared.
+        """
+        self.identical = False
+        prefix_end = self.actual_pos
+        # Extend the common prefix into the chunk up to the first differing byte
+        lo, hi = 0, min(len(chunk), len(self.expected_data) - prefix_end)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.expected_data[prefix_end:prefix_end + mid] == chunk[:mid]:
+                lo = mid
+            else:
+                hi = mid - 1
+        common_end = prefix_end + lo
+
+        # The last newline of the common prefix that ends a non-blank line
+        boundary = 0
+        end = common_end
+        while end > 0:
+            newline = self.expected_data.rfind(b"\n", 0, end)
+            if newline < 0:
+                break
+            line_start = self.expected_data.rfind(b"\n", 0, newline) + 1
+            if self.expected_data[line_start:newline].strip(WHITESPACE):
+                boundary = newline + 1
+                break
+            end = newline
+
+        if boundary > 0:
+            prefix = self.expected_data[:boundary]
+            if self.expected.unit == "line":
+                self.index = prefix.lstrip(WHITESPACE).count(b"\n")
+                self.expected.started = self.actual.started = True
+            else:
+                self.index = len(prefix.split())
+            self.expected.consumed = self.actual.consumed = boundary
+        self.expected_pos = boundary
+        if boundary > prefix_end:
+            return chunk[boundary - prefix_end:]
+        return self.expected_data[boundary:prefix_end] + chunk
+
+    def feed(self, chunk):
+        """
+        Returns False once a mismatch has been found and enough output after
+        it has been seen to show the diff window.
+        """
+        if self.identical:
+            end = self.actual_pos + len(chunk)
+            if end <= len(self.expected_data) and self.expected_data[self.actual_pos:end] == chunk:
+                self.recent += chunk
+                self.actual_pos = end
+                self._trim_recent(self.actual_pos - 2 * WINDOW_BYTES, self.actual_pos)
+                return True
+            pending = self._leave_fast_path(chunk)
+            self.recent += chunk
+            self.actual_pos += len(chunk)
+            self.actual.push(pending)
+            self._match()
+            self._after_match()
+            return True
+
+        if self.mismatch is not None:
+            room = self.mismatch_offset + 3 * WINDOW_BYTES - (self.recent_start + len(self.recent))
+            if room <= 0:
+                return False
+            self.recent += chunk[:room]
+            self.actual_pos += len(chunk)
+            return True
+
+        self.recent += chunk
+        self.actual_pos += len(chunk)
+        self.actual.push(chunk)
+        self._match()
+        self._after_match()
+        return True
+
+    def _after_match(self):
+        if self.mismatch is None:
+            self._trim_recent(self.actual_pos - 2 * WINDOW_BYTES, self.actual_pos)
+        else:
+            actual = self.mismatch[2]
+            self.mismatch_offset = self.actual_pos if actual is None else actual[0]
+            self._trim_recent(self.mismatch_offset - WINDOW_BYTES, self.mismatch_offset + 3 * WINDOW_BYTES)
+
+    def close(self):
+        if isinstance(self.expected_data, mmap.mmap):
+            self.expected_data.close()
+        self.expected_file.close()
+
+    def finish(self):
+        """
+        Returns a dict with `ok` and, on a mismatch, the 0-based `index` of the
+        first differing `unit` (line or token) with its `expected` and `actual`
+        values (None where one output ended early) and `expected_window` /
+        `actual_window`, the numbered lines around it.
+        """
+        if self.identical:
+            if self.actual_pos == len(self.expected_data):
+                self.close()
+                return {"ok": True}
+            self.actual.push(self._leave_fast_path(b""))
+            self._match()
+        if self.mismatch is None:
+            self.actual.close()
+            self._match()
+        if self.mismatch is None:
+            while not self.expected.units and not self.expected_eof:
+                self._fill_expected()
+            if self.expected.units:
+                self.mismatch = (self.index, self.expected.units[0], None)
+
+        try:
+            if self.mismatch is None:
+                return {"ok": True}
+            index, expected, actual = self.mismatch
+            expected_offset = len(self.expected_data) if expected is None else expected[0]
+            actual_offset = self.actual_pos if actual is None else actual[0]
+            return {
+                "ok": False,
+                "unit": self.expected.unit,
+                "index": index,
+                "expected": None if expected is None else expected[1].decode("utf-8", errors="replace"),
+                "actual": None if actual is None else actual[1].decode("utf-8", errors="replace"),
+                "expected_window": self._expected_window(expected_offset),
+                "actual_window": _window(self.recent, self.recent_start, actual_offset, self.recent_first_line),
+            }
+        finally:
+            self.close()
+
+    def _expected_window(self, offset):
+        start = max(0, offset - WINDOW_BYTES)
+        end = min(len(self.expected_data), offset + WINDOW_BYTES)
+        # Counting the lines before the window scans the mapping once, only on a mismatch
+        first_line = 1 + self.expected_data[:start].count(b"\n") if start else 1
+        return _window(self.expected_data[start:end], start, offset, first_line)
+
+class CheckerComparison:
+    """
+    Spools the output to a temporary file and lets an external checker decide,
+    started as `<checker_cmd> <in_file> <output_file> <expected_file>` (the
+    testlib order). Exit code 0 means AC; whatever the checker prints is shown
+    as the reason otherwise.
+    """
+    def __init__(self, checker_cmd, in_file, expected_path, cwd=None):
+        self.checker_cmd = checker_cmd
+        self.cwd = cwd
+        self.in_file = in_file
+        self.expected_path = expected_path
+        import tempfile
+        self.workdir = tempfile.mkdtemp(prefix="atm_checker_")
+        self.output_path = os.path.join(self.workdir, "output.txt")
+        self.output = open(self.output_path, "wb")
+
+    def feed(self, chunk):
+        self.output.write(chunk)
+        return True
+
+    def close(self):
+        if not self.output.closed:
+            self.output.close()
+        import shutil
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def finish(self):
+        self.output.close()
+        try:
+            result = subprocess.run(
+                self.checker_cmd + [self.in_file, self.output_path, self.expected_path],
+                capture_output=True, timeout=CHECKER_TIMEOUT, cwd=self.cwd
+            )
+            message = (result.stdout + result.stderr).decode("utf-8", errors="replace").strip()
+            if result.returncode == 0:
+                return {"ok": True, "message": message}
+            return {"ok": False, "message": message or f"checker exited with code {result.returncode}"}
+        except subprocess.TimeoutExpired:
+            return {"ok": False, "message": "checker timed out"}
+        finally:
+            self.close()
+
+class Judge:
+    """
+    Decides AC/WA for one task, as configured by `metadata.json["judge"]`
+    (atcoder-tools format):
+
+      {"judge_type": "normal"}        line by line, trailing whitespace ignored
+      {"judge_type": "token"}         whitespace-separated tokens
+      {"judge_type": "decimal", "diff": 1e-6, "error_type": "absolute_or_relative"}
+                                      tokens, numbers compared with a tolerance
+                                      (error_type: absolute, relative or
+                                      absolute_or_relative)
+      {"judge_type": "multisolution", "checker": "checker.py"}
+                                      external checker program
+
+    `start(in_file, out_file)` returns a comparison fed with the program's
+    output as it is produced. Call `finish()` for the verdict, or `close()`
+    if the output doesn't need judging after all. The checker runs in `cwd`.
+    """
+    def __init__(self, spec=None, checker_cmd=None, cwd=None):
+        spec = spec or {}
+        self.judge_type = spec.get("judge_type", "normal")
+        self.checker_cmd = checker_cmd
+        self.cwd = cwd
+        self.diff = float(spec.get("diff", 1e-6))
+        self.error_type = spec.get("error_type", "absolute_or_relative")
+
+        if self.judge_type == "normal":
+            self.splitter, self.equal = _Lines, bytes.__eq__
+        elif self.judge_type == "token":
+            self.splitter, self.equal = _Tokens, bytes.__eq__
+        elif self.judge_type == "decimal":
+            self.splitter, self.equal = _Tokens, self._decimal_equal
+        elif self.judge_type == "multisolution":
+            if not checker_cmd:
+                raise ValueError("the multisolution judge needs a checker")
+            self.splitter = self.equal = None
+        else:
+            raise ValueError(f"unknown judge_type '{self.judge_type}'")
+
+    def _decimal_equal(self, actual, expected):
+        if actual == expected:
+            return True
+        a = _float_or_none(actual)
+        e = _float_or_none(expected)
+        if a is None or e is None:
+            return False
+        error = abs(a - e)
+        absolute_ok = error <= self.diff
+        relative_ok = error <= self.diff * abs(e)
+        if self.error_type == "absolute":
+            return absolute_ok
+        if self.error_type == "relative":
+            return relative_ok
+        return absolute_ok or relative_ok
+
+    def start(self, in_file, out_file):
+        if self.judge_type == "multisolution":
+            return CheckerComparison(self.checker_cmd, in_file, out_file, self.cwd)
+        return StreamComparison(out_file, self.splitter, self.equal)
+
+    def describe(self):
+        if self.judge_type == "decimal":
+            return f"decimal ({self.error_type.replace('_', ' ')} error <= {self.diff:g})"
+        return self.judge_type
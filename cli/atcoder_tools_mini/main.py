@@ -1,51 +1,115 @@
 import argparse
 import sys
-from .submit import submit_code
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="atcoder-tools-mini: A lightweight CLI tool for AtCoder automatic submission."
-    )
-    
-    subparsers = parser.add_subparsers(dest="command", help="Available commands")
-    
-    # 'submit' command
-    submit_parser = subparsers.add_parser("submit", help="Submit source code to AtCoder")
+def add_submit_arguments(submit_parser):
     submit_parser.add_argument("src", nargs="?", default="main.cpp", help="Path to source file (default: main.cpp)")
     submit_parser.add_argument("--contest", "-c", help="Contest ID (e.g., abc443). If not provided, it will be guessed from the directory path.")
     submit_parser.add_argument("--task", "-t", help="Task Screen Name (e.g., abc443_a). If not provided, it will be guessed.")
     submit_parser.add_argument("--lang", "-l", help="Language ID (e.g., 5001) or symbol (e.g., cpp, python). If not provided, it will be guessed from the file extension.")
-    
-    # 'gen' command
-    gen_parser = subparsers.add_parser("gen", help="Generate contest workspace and download test cases")
+    submit_parser.add_argument("--no-wait", action="store_true", help="Return right after dispatching instead of waiting for the verdict")
+
+def add_gen_arguments(gen_parser):
     gen_parser.add_argument("contest_id", nargs="?", default=None, help="Contest ID (e.g., abc443). If omitted, inferred from active browser tab.")
     gen_parser.add_argument("--template", "-t", help="Path to custom template file")
+    gen_parser.add_argument("--refresh", action="store_true", help="Ignore the local sample cache and download everything again")
+    gen_parser.add_argument("--update", "-u", action="store_true", help="Work in an existing contest directory: write missing tasks and rewrite those whose samples or limits changed, keeping your code (combine with --refresh to re-download)")
     gen_parser.add_argument("--open", nargs="?", const="default", default=None, help="Open a specific problem (e.g., A, B, tasks) in browser. If used without value, uses default_open from .atm_config.json (or 'A').")
-    
-    # 'test' command
-    test_parser = subparsers.add_parser("test", help="Test source code against sample cases")
+
+def add_run_arguments(parser):
+    # Shared by 'test' and 'ts'
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Number of sample cases to run in parallel (default: number of CPU cores)")
+    parser.add_argument("--no-cache", action="store_true", help="Always recompile, bypassing the compile cache")
+    parser.add_argument("--calibrated", action="store_true", help="Scale the time limit by this machine's speed relative to the judge, measured for the program's language (see 'atm calibrate')")
+    parser.add_argument("--warm", action="store_true", help="Fork Python/PyPy cases from a pre-started interpreter to skip startup time")
+    parser.add_argument("--interactor", "-i", help="Interactor program for interactive tasks (default: judge.interactor in metadata.json or interactor.*)")
+    parser.add_argument("--checker", help="External checker for tasks that accept multiple answers (overrides the judge in metadata.json)")
+
+def add_test_arguments(test_parser):
     test_parser.add_argument("src", nargs="?", default="main.cpp", help="Path to source file (default: main.cpp)")
+    add_run_arguments(test_parser)
+    test_parser.add_argument("--all", "-a", action="store_true", help="Test every task directory of the contest (run in the contest directory or in any task directory) and print a verdict matrix")
+    test_parser.add_argument("--watch", "-w", action="store_true", help="Keep running and re-test whenever the source, the samples, metadata.json or .atm_config.json change")
 
-    # 'ts' command
-    ts_parser = subparsers.add_parser("ts", help="Test source code and submit if all tests pass")
+def add_ts_arguments(ts_parser):
     ts_parser.add_argument("src", nargs="?", default="main.cpp", help="Path to source file (default: main.cpp)")
     ts_parser.add_argument("--contest", "-c", help="Contest ID")
     ts_parser.add_argument("--task", "-t", help="Task Screen Name")
     ts_parser.add_argument("--lang", "-l", help="Language ID or symbol")
+    ts_parser.add_argument("--no-wait", action="store_true", help="Return right after dispatching instead of waiting for the verdict")
+    add_run_arguments(ts_parser)
+
+def add_stress_arguments(stress_parser):
+    stress_parser.add_argument("src", nargs="?", default="main.cpp", help="Path to source file (default: main.cpp)")
+    stress_parser.add_argument("--brute", "-b", required=True, help="Path to a slow but correct reference solution")
+    stress_parser.add_argument("--gen", "-g", required=True, help="Path to a random input generator (receives the seed as its first argument)")
+    stress_parser.add_argument("--count", "-n", type=int, default=1000, help="Number of cases to try (default: 1000)")
+    stress_parser.add_argument("--seed", "-s", type=int, default=1, help="First seed passed to the generator (default: 1)")
+    stress_parser.add_argument("--lang", "-l", help="Language symbol of the solution (e.g., cpp, pypy)")
+    stress_parser.add_argument("--jobs", "-j", type=int, default=None, help="Number of cases to run in parallel (default: number of CPU cores)")
+    stress_parser.add_argument("--no-cache", action="store_true", help="Always recompile, bypassing the compile cache")
+    stress_parser.add_argument("--checker", help="External checker for tasks that accept multiple answers (overrides the judge in metadata.json)")
+
+def add_prefetch_arguments(prefetch_parser):
+    prefetch_parser.add_argument("contest_id", help="Contest ID of an upcoming contest (e.g., abc443)")
+    prefetch_parser.add_argument("--refresh", action="store_true", help="Download again even if the contest is already in the local sample cache")
+
+def add_calibrate_arguments(calibrate_parser):
+    calibrate_parser.add_argument("--lang", "-l", choices=["cpp", "pypy", "python"], default="python", help="Language to calibrate, with its own workload and toolchain (default: python)")
+    calibrate_parser.add_argument("--reference-ms", type=int, default=None, help="Judge time of the workload, as reported by AtCoder Custom Test (required the first time for each language)")
+    calibrate_parser.add_argument("--print-workload", action="store_true", help="Print the workload program of the language (to run it in Custom Test) and exit")
+
+COMMANDS = [
+    ("submit", "Submit source code to AtCoder", add_submit_arguments),
+    ("gen", "Generate contest workspace and download test cases", add_gen_arguments),
+    ("prefetch", "Wait for a contest to start and download it into the local sample cache, so that 'atm gen' runs offline", add_prefetch_arguments),
+    ("test", "Test source code against sample cases", add_test_arguments),
+    ("ts", "Test source code and submit if all tests pass", add_ts_arguments),
+    ("stress", "Compare a solution with a brute force on randomly generated inputs", add_stress_arguments),
+    ("calibrate", "Measure this machine's speed relative to the judge for 'atm test --calibrated'", add_calibrate_arguments),
+]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="atcoder-tools-mini: A lightweight CLI tool for AtCoder automatic submission."
+    )
+    
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    
+    # Every command is listed, but only the one being run gets its arguments:
+    # building all of them is a noticeable part of startup
+    invoked = next((arg for arg in sys.argv[1:] if not arg.startswith("-")), None)
+    for name, help_text, add_arguments in COMMANDS:
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if name == invoked:
+            add_arguments(command_parser)
 
     args = parser.parse_args()
 
+    # Parse and validate the config once, so that problems are reported before anything runs
+    from . import config
+    config.load()
+
     if args.command == "submit":
+        from .submit import submit_code
         submit_code(args)
     elif args.command == "gen":
         from .gen import gen_contest
         gen_contest(args)
+    elif args.command == "prefetch":
+        from .gen import prefetch_contest
+        prefetch_contest(args)
     elif args.command == "test":
         from .test import test_code
         test_code(args)
     elif args.command == "ts":
         from .submit import ts_run
         ts_run(args)
+    elif args.command == "stress":
+        from .stress import stress_test
+        stress_test(args)
+    elif args.command == "calibrate":
+        from .calibrate import calibrate
+        calibrate(args)
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,11 @@
+import os
+
+def cache_dir(*parts):
+    """
+    Returns (and creates) a directory under the atm cache root.
+    Honors $XDG_CACHE_HOME, falling back to ~/.cache/atcoder_tools_mini.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = os.path.join(base, "atcoder_tools_mini", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+import contextlib
+
+from .paths import cache_dir
+from .compile_cache import compiler_version
+from . import config
+
+STDCPP_INCLUDE_RE = re.compile(rb'^\s*#\s*include\s*<bits/stdc\+\+\.h>', re.MULTILINE)
+
+# Number of precompiled headers (one per flag set / compiler) kept around
+KEEP_HEADERS = 2
+
+# One lock per PCH key, so that threads compiling at once (`atm test --all`)
+# build a header once and the others wait for it
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+def load_settings(start_dir=None):
+    """
+    Reads the `pch` flag of the config that applies to `start_dir` (enabled
+    by default).
+    """
+    return config.load(start_dir).get("pch", True)
+
+def is_gcc(compile_cmd):
+    version = compiler_version(compile_cmd[0])
+    return "clang" not in version.lower() and "Free Software Foundation" in version
+
+def uses_stdcpp(src_path):
+    try:
+        with open(src_path, "rb") as f:
+            return STDCPP_INCLUDE_RE.search(f.read()) is not None
+    except OSError:
+        return False
+
+def header_flags(compile_cmd, src_path):
+    """
+    The flags a precompiled header has to be built with: the compile command
+    minus the compiler itself, the source file and the `-o <exec>` output.
+    """
+    flags = []
+    skip_next = False
+    for arg in compile_cmd[1:]:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg == "-o":
+            skip_next = True
+            continue
+        if arg == src_path or arg.startswith("-o"):
+            continue
+        flags.append(arg)
+    return flags
+
+def find_header(compiler, flags):
+    """
+    Resolves the path of the real bits/stdc++.h as seen with the given flags.
+    """
+    try:
+        result = subprocess.run(
+            [compiler] + flags + ["-x", "c++", "-M", "-"],
+            input="#include <bits/stdc++.h>\n",
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    for token in result.stdout.replace("\\\n", " ").split():
+        if token.endswith("bits/stdc++.h"):
+            return token
+    return None
+
+def prune(root, current):
+    entries = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name != current and not name.startswith(".") and os.path.isdir(path):
+            entries.append((os.path.getmtime(path), path))
+    entries.sort(reverse=True)
+    for _, path in entries[KEEP_HEADERS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+@contextlib.contextmanager
+def _build_lock(key, lock_path):
+    """
+    Serializes builds of one PCH across threads (in-process lock) and across
+    atm processes (flock on `lock_path`, where available).
+    """
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    with lock:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _build(compiler, flags, gch_path, log):
+    """
+    Builds the PCH into a temporary file next to it and moves it into place.
+    Returns False on failure.
+    """
+    header = find_header(compiler, flags)
+    if not header:
+        return False
+
+    log("[CLI] \033[90mBuilding precompiled header for bits/stdc++.h (only needed once per compiler/flags)...\033[0m")
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(gch_path), suffix=".tmp")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [compiler] + flags + ["-x", "c++-header", header, "-o", tmp_path],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        os.replace(tmp_path, gch_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        log(f"[CLI] \033[93mWarning: Failed to build precompiled header -> {getattr(e, 'stderr', None) or e}\033[0m")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+def ensure_pch(compile_cmd, src_path, log=print):
+    """
+    Makes sure a bits/stdc++.h.gch matching this exact compiler and flag set
+    exists, (re)building it when either changed. Returns the extra arguments
+    to inject into the compile command, or [] when no PCH applies.
+
+    GCC looks for `bits/stdc++.h.gch` in each include directory before the
+    header itself, so putting the PCH directory first on the include path is
+    enough. An unusable PCH is silently ignored by GCC. Concurrent callers
+    (threads or processes) build it once; the others wait and reuse it.
+    """
+    if not uses_stdcpp(src_path) or not is_gcc(compile_cmd):
+        return []
+
+    compiler = compile_cmd[0]
+    flags = header_flags(compile_cmd, src_path)
+
+    hasher = hashlib.sha256()
+    hasher.update(compiler_version(compiler).encode("utf-8") + b"\0")
+    hasher.update(json.dumps(flags).encode("utf-8"))
+    key = hasher.hexdigest()[:16]
+
+    root = cache_dir("pch")
+    pch_dir = os.path.join(root, key)
+    gch_path = os.path.join(pch_dir, "bits", "stdc++.h.gch")
+
+    if os.path.isfile(gch_path):
+        os.utime(pch_dir)
+        return ["-I", pch_dir]
+
+    os.makedirs(os.path.dirname(gch_path), exist_ok=True)
+    with _build_lock(key, f"{gch_path}.lock"):
+        # Another builder may have finished while we waited
+        if not os.path.isfile(gch_path):
+            if not _build(compiler, flags, gch_path, log):
+                return []
+            with open(os.path.join(pch_dir, "flags.json"), "w", encoding="utf-8") as f:
+                json.dump({"compiler": compiler, "flags": flags}, f, indent=1)
+            prune(root, key)
+
+    return ["-I", pch_dir]
+
+def inject(compile_cmd, src_path, log=print):
+    """
+    Returns the compile command with the precompiled header directory placed
+    ahead of every other include path.
+    """
+    extra = ensure_pch(compile_cmd, src_path, log)
+    if not extra:
+        return compile_cmd
+    return compile_cmd[:1] + extra + compile_cmd[1:]
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+
+HAS_WAIT4 = hasattr(os, "wait4")
+
+_rss_floor_kb = None
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+def _rss_kb(ru_maxrss):
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    if sys.platform == "darwin":
+        return ru_maxrss // 1024
+    return ru_maxrss
+
+def _pump(pipe, output, sink, capture_limit, max_bytes, on_limit):
+    """
+    Reads a pipe as it is produced: every chunk goes to `sink` (e.g. a
+    streaming comparator) until it returns False, only the first
+    `capture_limit` bytes are kept, and `on_limit` is called once more than
+    `max_bytes` have been written. The pipe is drained to the end either way.
+    """
+    fd = pipe.fileno()
+    try:
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            output["bytes"] += len(data)
+            if capture_limit is None:
+                output["chunks"].append(data)
+            elif output["captured"] < capture_limit:
+                kept = data[:capture_limit - output["captured"]]
+                output["chunks"].append(kept)
+                output["captured"] += len(kept)
+            if max_bytes is not None and output["bytes"] > max_bytes:
+                output["limit_exceeded"] = True
+                on_limit()
+                break
+            if sink is not None and sink(data) is False:
+                # The verdict is decided; keep draining and counting for OLE only
+                sink = None
+    finally:
+        pipe.close()
+
+def _feed(pipe, data):
+    try:
+        if data:
+            pipe.write(data)
+    except (BrokenPipeError, OSError):
+        # The program exited without reading all of its input
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+def run_process(cmd, input_data, timeout, cwd=None, stdout_sink=None, max_output_bytes=None, capture_limit=None, on_spawn=None):
+    """
+    Runs cmd with input_data (bytes) on stdin and returns a dict with:
+      returncode, stdout, stderr (bytes), timed_out,
+      wall_ms, user_ms, sys_ms, max_rss_kb,
+      output_bytes, output_limit_exceeded
+
+    stdout is handed to `stdout_sink` chunk by chunk while the program runs and
+    only the first `capture_limit` bytes of stdout and stderr are returned (all
+    of it if None). A program that writes more than `max_output_bytes` to
+    stdout is killed right away. `on_spawn` is called with a function that
+    kills the program, e.g. to abandon a run early.
+
+    `wall_ms` starts once the program has been spawned; the time spent
+    spawning it is returned separately as `launch_ms` (as in warm.WarmPool).
+
+    On POSIX the child is reaped with wait4(), so CPU times and peak RSS are
+    the child's own rusage rather than deltas around the whole call. Elsewhere
+    only wall time is available and the rusage fields are None.
+    """
+    if not HAS_WAIT4:
+        return _run_process_portable(cmd, input_data, timeout, cwd, stdout_sink, max_output_bytes, capture_limit, on_spawn)
+
+    launch_start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+    # fork/exec and the pipes are reported as launch_ms, not charged to the program
+    start = time.perf_counter()
+
+    # The timer must never signal a pid that was already reaped (and possibly reused)
+    lock = threading.Lock()
+    state = {"reaped": False, "timed_out": False}
+
+    def kill():
+        with lock:
+            if not state["reaped"]:
+                try:
+                    os.kill(proc.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    def on_timeout():
+        with lock:
+            if not state["reaped"]:
+                state["timed_out"] = True
+        kill()
+
+    if on_spawn is not None:
+        on_spawn(kill)
+
+    output = {"chunks": [], "captured": 0, "bytes": 0, "limit_exceeded": False}
+    errors = {"chunks": [], "captured": 0, "bytes": 0, "limit_exceeded": False}
+    threads = [
+        threading.Thread(target=_feed, args=(proc.stdin, input_data), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stdout, output, stdout_sink, capture_limit, max_output_bytes, kill), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, errors, None, capture_limit, None, kill), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+    try:
+        while True:
+            try:
+                _, status, rusage = os.wait4(proc.pid, 0)
+                break
+            except InterruptedError:
+                continue
+    finally:
+        with lock:
+            state["reaped"] = True
+        timer.cancel()
+
+    wall_ms = (time.perf_counter() - start) * 1000
+    # Let Popen know the child is gone so it never waits on the pid again
+    proc.returncode = _exit_code(status)
+
+    # A killed program may leave a grandchild holding the pipes open; don't wait on it forever
+    for t in threads:
+        t.join(1.0 if state["timed_out"] else None)
+
+    return {
+        "returncode": proc.returncode,
+        "stdout": b"".join(output["chunks"]),
+        "stderr": b"".join(errors["chunks"]),
+        "timed_out": state["timed_out"] and not output["limit_exceeded"],
+        "wall_ms": wall_ms,
+        "launch_ms": (start - launch_start) * 1000,
+        "user_ms": rusage.ru_utime * 1000,
+        "sys_ms": rusage.ru_stime * 1000,
+        "max_rss_kb": _rss_kb(rusage.ru_maxrss),
+        "output_bytes": output["bytes"],
+        "output_limit_exceeded": output["limit_exceeded"],
+    }
+
+def _run_process_portable(cmd, input_data, timeout, cwd, stdout_sink=None, max_output_bytes=None, capture_limit=None, on_spawn=None):
+    launch_start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+    start = time.perf_counter()
+
+    def kill():
+        try:
+            proc.kill()
+        except OSError:
+            # Already exited
+            pass
+
+    if on_spawn is not None:
+        on_spawn(kill)
+
+    timed_out = False
+    try:
+        stdout, stderr = proc.communicate(input_data, timeout=timeout)
+        returncode = proc.returncode
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        kill()
+        stdout, stderr = proc.communicate()
+        returncode = None
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    # Without the streaming pump, the output is only bounded after the fact
+    limit_exceeded = max_output_bytes is not None and len(stdout) > max_output_bytes
+    if stdout_sink is not None and not limit_exceeded:
+        stdout_sink(stdout)
+
+    return {
+        "returncode": returncode,
+        "stdout": stdout if capture_limit is None else stdout[:capture_limit],
+        "stderr": stderr,
+        "timed_out": timed_out,
+        "output_bytes": len(stdout),
+        "output_limit_exceeded": limit_exceeded,
+        "wall_ms": wall_ms,
+        "launch_ms": (start - launch_start) * 1000,
+        "user_ms": None,
+        "sys_ms": None,
+        "max_rss_kb": None,
+    }
+
+def rss_floor_kb():
+    """
+    Linux carries a process's peak RSS across fork and exec, so every child
+    reports at least the RSS of this Python process at spawn time. Measures
+    that floor once with a trivial program; peaks at or below it are not
+    meaningful. Returns None where rusage isn't available.
+    """
+    global _rss_floor_kb
+    if _rss_floor_kb is None and HAS_WAIT4:
+        try:
+            _rss_floor_kb = run_process(["true"], b"", 5.0)["max_rss_kb"]
+        except OSError:
+            _rss_floor_kb = 0
+    return _rss_floor_kb
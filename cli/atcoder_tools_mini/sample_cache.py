@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import hashlib
+
+from .paths import cache_dir
+from . import config
+
+DEFAULT_TTL_HOURS = 24
+
+def load_settings(start_dir=None):
+    """
+    Reads the `sample_cache` section of the config that applies to
+    `start_dir` (see config.load). Returns (enabled, ttl_seconds).
+    """
+    settings = config.load(start_dir).section("sample_cache")
+    return settings.get("enabled", True), settings.get("ttl_hours", DEFAULT_TTL_HOURS) * 3600
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    # The cache is best-effort: failing to write it must never break gen/test
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+def _is_fresh(entry, ttl):
+    return time.time() - entry.get("fetched_at", 0) < ttl
+
+def store_samples(samples):
+    """
+    Stores a sample set content-addressed by its hash and returns the hash.
+    Identical sample sets (e.g. re-fetched pages) share one object.
+    """
+    data = json.dumps(samples, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(cache_dir("samples", "objects"), f"{digest}.json")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    return digest
+
+def store_task(contest_id, task):
+    """
+    Caches the samples and limits of one task, keyed by its screen name (e.g. abc300_a).
+    """
+    entry = {
+        "contest_id": contest_id,
+        "label": task.get("label"),
+        "screen_name": task["screen_name"],
+        "hash": store_samples(task["samples"]),
+        "time_limit_ms": task.get("time_limit_ms"),
+        "memory_limit_mb": task.get("memory_limit_mb"),
+        "interactive": bool(task.get("interactive")),
+        "error_tolerance": task.get("error_tolerance"),
+        "fetched_at": time.time()
+    }
+    _write_json(os.path.join(cache_dir("samples", "tasks"), f"{_safe_name(task['screen_name'])}.json"), entry)
+
+def store_contest(contest_id, task_list):
+    """
+    Caches the task list ([{label, screen_name}, ...]) of a contest.
+    """
+    entry = {
+        "contest_id": contest_id,
+        "tasks": [{"label": t["label"], "screen_name": t["screen_name"]} for t in task_list],
+        "fetched_at": time.time()
+    }
+    _write_json(os.path.join(cache_dir("samples", "contests"), f"{_safe_name(contest_id)}.json"), entry)
+
+def load_task(screen_name, ttl):
+    """
+    Returns the cached task ({label, screen_name, samples, time_limit_ms,
+    memory_limit_mb, interactive, error_tolerance}) if it is younger than ttl seconds, otherwise None.
+    The limits are None for entries written before they were recorded.
+    """
+    entry = _read_json(os.path.join(cache_dir("samples", "tasks"), f"{_safe_name(screen_name)}.json"))
+    if not entry or not _is_fresh(entry, ttl):
+        return None
+    samples = _read_json(os.path.join(cache_dir("samples", "objects"), f"{entry['hash']}.json"))
+    if samples is None:
+        return None
+    return {
+        "label": entry["label"],
+        "screen_name": entry["screen_name"],
+        "samples": samples,
+        "time_limit_ms": entry.get("time_limit_ms"),
+        "memory_limit_mb": entry.get("memory_limit_mb"),
+        "interactive": entry.get("interactive", False),
+        "error_tolerance": entry.get("error_tolerance")
+    }
+
+def load_contest(contest_id, ttl):
+    """
+    Returns every task of the contest with its samples if the task list and all
+    tasks are cached and fresh, otherwise None.
+    """
+    entry = _read_json(os.path.join(cache_dir("samples", "contests"), f"{_safe_name(contest_id)}.json"))
+    if not entry or not _is_fresh(entry, ttl) or not entry.get("tasks"):
+        return None
+
+    tasks = []
+    for t in entry["tasks"]:
+        task = load_task(t["screen_name"], ttl)
+        if task is None:
+            return None
+        task["label"] = t["label"]
+        tasks.append(task)
+    return tasks
@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .runner import run_process
+from .test import get_test_commands, prepare_program, prepare_judge, print_judge_outcome, resolve_jobs, DEFAULT_TIME_LIMIT_MS
+
+# The generator and the brute force are allowed to be slow; only the solution is held to the task's limit
+AUX_TIMEOUT = 10.0
+
+def _exec_name(role):
+    return f"{role}.out" if os.name != "nt" else f"{role}.exe"
+
+def _build(role, src_path, lang, use_cache):
+    compile_template, run_template = get_test_commands(argparse.Namespace(lang=lang), src_path, None)
+    run_cmd = prepare_program(compile_template, run_template, src_path, _exec_name(role), use_cache=use_cache)
+    if run_cmd is None:
+        print(f"[CLI] \033[91mError: Failed to build the {role} program '{src_path}'.\033[0m")
+        sys.exit(1)
+    return run_cmd
+
+def run_stress_case(seed, gen_cmd, sol_cmd, brute_cmd, timeout, judge, workdir):
+    """
+    Generates one input from `seed` and runs the solution and the brute force
+    on it. The outputs are compared by `judge` (see judge.Judge), with the
+    brute force's output as the expected one; the input and expected output
+    are written to `workdir` for it. Returns a dict with the input and, for a
+    failing case, the verdict and both outputs; `verdict` is None when the
+    outputs agree.
+    """
+    generated = run_process(gen_cmd + [str(seed)], b"", AUX_TIMEOUT)
+    if generated["timed_out"] or generated["returncode"] != 0:
+        return {"seed": seed, "error": "generator", "stderr": generated["stderr"]}
+    case_in = generated["stdout"]
+
+    expected = run_process(brute_cmd, case_in, AUX_TIMEOUT)
+    if expected["timed_out"] or expected["returncode"] != 0:
+        return {"seed": seed, "error": "brute force", "input": case_in, "stderr": expected["stderr"]}
+
+    in_file = os.path.join(workdir, f"{seed}.in")
+    out_file = os.path.join(workdir, f"{seed}.out")
+    with open(in_file, "wb") as f:
+        f.write(case_in)
+    with open(out_file, "wb") as f:
+        f.write(expected["stdout"])
+
+    result = run_process(sol_cmd, case_in, timeout)
+    case = {
+        "seed": seed,
+        "input": case_in,
+        "expected": expected["stdout"],
+        "stdout": result["stdout"],
+        "stderr": result["stderr"],
+        "verdict": None
+    }
+    if result["timed_out"]:
+        case["verdict"] = "TLE"
+    elif result["returncode"] != 0:
+        case["verdict"] = "RE"
+    else:
+        comparison = judge.start(in_file, out_file)
+        comparison.feed(result["stdout"])
+        case["judge"] = comparison.finish()
+        if not case["judge"]["ok"]:
+            case["verdict"] = "WA"
+
+    os.remove(in_file)
+    os.remove(out_file)
+    return case
+
+def save_case(case, in_dir="in", out_dir="out"):
+    """
+    Adds a failing case to the samples as in_<N>.txt / out_<N>.txt, with N one
+    past the highest existing index. Returns the input file path.
+    """
+    os.makedirs(in_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+
+    indices = [0]
+    for name in os.listdir(in_dir):
+        m = re.fullmatch(r"in_(\d+)\.txt", name)
+        if m:
+            indices.append(int(m.group(1)))
+    idx = max(indices) + 1
+
+    in_file = os.path.join(in_dir, f"in_{idx}.txt")
+    with open(in_file, "wb") as f:
+        f.write(case["input"])
+    with open(os.path.join(out_dir, f"out_{idx}.txt"), "wb") as f:
+        f.write(case["expected"])
+    return in_file
+
+def stress_test(args):
+    # Try to load metadata.json for the time limit
+    metadata = {}
+    if os.path.isfile("metadata.json"):
+        try:
+            with open("metadata.json", "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except json.JSONDecodeError:
+            pass
+    timeout = int(metadata.get("timeout_ms", DEFAULT_TIME_LIMIT_MS)) / 1000
+
+    for path in (args.src, args.brute, args.gen):
+        if not os.path.isfile(path):
+            print(f"[CLI] \033[91mError: '{path}' not found.\033[0m")
+            sys.exit(1)
+
+    # Everything is compiled once up front; the loop below only spawns processes
+    use_cache = not args.no_cache
+    sol_cmd = _build("a", args.src, args.lang, use_cache)
+    brute_cmd = _build("brute", args.brute, None, use_cache)
+    gen_cmd = _build("gen", args.gen, None, use_cache)
+
+    # The same judge as `atm test`: decimal tolerance, tokens or a checker from metadata.json
+    judge = prepare_judge(args, metadata)
+    if judge is None:
+        sys.exit(1)
+    if judge.judge_type != "normal":
+        print(f"[CLI] \033[90mJudge: {judge.describe()}\033[0m")
+
+    jobs = resolve_jobs(args.jobs, args.count)
+    print(f"[CLI] Stress testing {args.src} against {args.brute} with {args.count} cases ({jobs} parallel)...")
+    sys.stdout.flush()
+
+    interactive = sys.stdout.isatty()
+    start = time.perf_counter()
+    done = 0
+    failures = []
+    error = None
+
+    # At most 2 * jobs cases are in flight, so a mismatch stops the run almost immediately.
+    # The cases that are already running are still collected and the shortest failing input wins.
+    seeds = iter(range(args.seed, args.seed + args.count))
+    with tempfile.TemporaryDirectory(prefix="atm_stress_") as workdir, ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = set()
+        while True:
+            while not failures and not error and len(pending) < jobs * 2:
+                seed = next(seeds, None)
+                if seed is None:
+                    break
+                pending.add(executor.submit(run_stress_case, seed, gen_cmd, sol_cmd, brute_cmd, timeout, judge, workdir))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                case = future.result()
+                done += 1
+                if case.get("error"):
+                    error = error or case
+                elif case["verdict"]:
+                    failures.append(case)
+
+            if interactive:
+                rate = done / max(time.perf_counter() - start, 1e-9)
+                print(f"\r[CLI] {done}/{args.count} cases, {rate:.0f} cases/s", end="")
+                sys.stdout.flush()
+
+    elapsed = time.perf_counter() - start
+    if interactive:
+        print()
+    rate_line = f"{done} cases in {elapsed:.2f} s ({done / max(elapsed, 1e-9):.0f} cases/s)"
+
+    if error:
+        print(f"[CLI] \033[91mError: The {error['error']} program failed on seed {error['seed']}.\033[0m")
+        if error.get("stderr"):
+            print(error["stderr"].decode("utf-8", errors="replace").strip())
+        sys.exit(1)
+
+    if not failures:
+        print(f"\033[92mNo mismatch found.\033[0m {rate_line}")
+        return
+
+    case = min(failures, key=lambda c: (len(c["input"]), c["seed"]))
+    print(f"# seed {case['seed']} ... \033[91m{case['verdict']}\033[0m")
+    print(f"[Input]\n{case['input'].decode('utf-8', errors='replace').strip()}")
+    print(f"[Expected]\n{case['expected'].decode('utf-8', errors='replace').strip()}")
+    print(f"[Received]\n{case['stdout'].decode('utf-8', errors='replace').strip()}")
+    print_judge_outcome(case.get("judge"))
+    if case["stderr"].strip():
+        print(f"[Error]\n{case['stderr'].decode('utf-8', errors='replace').strip()}")
+
+    in_file = save_case(case)
+    print(f"\n[CLI] Saved the failing case as a new sample: {in_file}")
+    print(f"\033[91mMismatch found\033[0m after {rate_line}")
+    sys.exit(1)
@@ -1,9 +1,12 @@
-import socket
 import json
 import os
 import sys
 
 from .lang_map import guess_language_id
+from .client import get_connection
+
+# Covers the extension's own limits: the submit page redirect and 10 minutes of judging
+JUDGE_WAIT_TIMEOUT_SEC = 15 * 60
 
 def guess_contest_and_task(path):
     abs_path = os.path.abspath(path)
@@ -81,7 +84,7 @@ def submit_code(args):
     if (not contest_id or not task_screen_name) and not metadata:
         sys.stdout.flush()
         from .gen import request_current_context
-        ctx = request_current_context()
+        ctx = request_current_context(with_samples=False)
         if ctx and ctx.get("contest_id") and ctx.get("task_screen_name"):
             print("[CLI] \033[96mUsing Tab-Sync Fallback for contest context...\033[0m")
             contest_id = contest_id or ctx.get("contest_id")
@@ -103,18 +106,78 @@ def submit_code(args):
         "source_code": source_code
     }
 
-    send_to_native_host(payload)
+    wait = not getattr(args, "no_wait", False)
+    verdict = send_to_native_host(payload, wait=wait)
+    if wait and verdict != "AC":
+        sys.exit(1)
 
-def send_to_native_host(payload):
+def send_to_native_host(payload, wait=True):
+    """
+    Dispatches the submission to the browser. With wait=True, stays attached and
+    streams judge status updates until the final verdict, which is returned.
+    """
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect(('127.0.0.1', 49153))
-        
-        s.sendall(json.dumps(payload).encode('utf-8'))
+        conn = get_connection()
+        req_id = conn.request(payload)
         
         print("\n[CLI] \033[92mSubmission dispatched to the browser!\033[0m")
-        print("[CLI] Processing in the background... Check notifications for the result (AC/WA).")
-        return
+        if not wait:
+            print("[CLI] Processing in the background... Check notifications for the result (AC/WA).")
+            return None
+        try:
+            return wait_for_judge(conn, req_id)
+        finally:
+            conn.finish(req_id)
     except ConnectionRefusedError:
         print("[CLI] \033[91mError: Could not connect to background Native Host.\033[0m")
         print("[CLI] \033[91mPlease ensure you have run 'python install_native.py', closed your browser and re-opened it.\033[0m")
+        return None
+
+def colorize_verdict(verdict):
+    if verdict == "AC":
+        return f"\033[92m{verdict}\033[0m"
+    if verdict == "WA":
+        return f"\033[91m{verdict}\033[0m"
+    return f"\033[93m{verdict}\033[0m"
+
+def wait_for_judge(conn, req_id):
+    """
+    Prints judge status updates (WJ -> progress -> verdict) as the extension
+    streams them. Returns the final verdict, or None if detached or failed.
+    """
+    interactive = sys.stdout.isatty()
+    print("[CLI] Waiting for the judge... (Ctrl-C to detach, the result will still be notified in the browser)")
+    
+    try:
+        for msg in conn.messages(req_id, timeout=JUDGE_WAIT_TIMEOUT_SEC):
+            # Extensions before the `submitted` action only sent a status field
+            if msg.get("action") == "submitted" or msg.get("status") == "submitted":
+                print("[CLI] Submission accepted by AtCoder.")
+            elif msg.get("action") == "judge_status":
+                res = msg.get("data", {})
+                if res.get("state") == "DONE":
+                    if interactive:
+                        print("\r\033[K", end="")
+                    verdict = res.get("status")
+                    print(f"[CLI] Result: {colorize_verdict(verdict)}  Score: {res.get('score', '')}  Time: {res.get('time') or '-'}  Memory: {res.get('memory') or '-'}")
+                    if res.get("href"):
+                        print(f"[CLI] \033[90m{res['href']}\033[0m")
+                    return verdict
+                
+                progress = f"[CLI] Judging... {res.get('progress') or res.get('status')}"
+                if interactive:
+                    print(f"\r\033[K{progress}", end="", flush=True)
+                else:
+                    print(progress)
+            elif msg.get("action") in ("submit_error", "judge_error"):
+                print(f"\n[CLI] \033[91mError: {msg.get('error')}\033[0m")
+                return None
+    except KeyboardInterrupt:
+        print("\n[CLI] Detached. The result will still be shown as a browser notification.")
+        return None
+    except TimeoutError:
+        print(f"\n[CLI] \033[93mWarning: No verdict after {JUDGE_WAIT_TIMEOUT_SEC // 60} minutes. Check the browser for the result.\033[0m")
+        return None
+    
+    print("\n[CLI] \033[93mWarning: Lost connection to the Native Host before the verdict arrived.\033[0m")
+    return None
@@ -1,12 +1,28 @@
 import os
 import sys
-import subprocess
-import time
 import json
 import glob
 from .lang_map import LANGUAGE_TABLE
+from .runner import run_process, rss_floor_kb
+from . import config
+from .judge import Judge
 
-def get_test_commands(args, src_path, metadata):
+# Modules only some runs need (compilation, calibration, the warm runner,
+# interactive tasks, a worker pool) are imported where they are used, which
+# keeps `atm test` startup close to the interpreter's own
+
+DEFAULT_TIME_LIMIT_MS = 2000
+DEFAULT_MEMORY_LIMIT_MB = 1024
+DEFAULT_MAX_OUTPUT_MB = 64
+
+# How much of the input, output and expected output is kept for display
+PREVIEW_BYTES = 64 * 1024
+
+def resolve_language(args, src_path, metadata):
+    """
+    The LANGUAGE_TABLE symbol of the program: --lang, the file extension or
+    metadata.json, in that order. Exits if none of them tells.
+    """
     symbol_found = None
     
     # Priority 1: explicit option
@@ -33,31 +49,447 @@ def get_test_commands(args, src_path, metadata):
     if not symbol_found:
         print(f"[CLI] \033[91mError: Could not determine language for local testing of '{src_path}'.\033[0m")
         sys.exit(1)
-        
-    compile_cmd = LANGUAGE_TABLE[symbol_found]["compile"]
-    run_cmd = LANGUAGE_TABLE[symbol_found]["run"]
+    return symbol_found
+
+def get_test_commands(args, src_path, metadata):
+    symbol_found = resolve_language(args, src_path, metadata)
     
-    # Try overriding from ~/.atm_config.json
-    config_path = os.path.expanduser("~/.atm_config.json")
-    if os.path.isfile(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                if "test_commands" in config and symbol_found in config["test_commands"]:
-                    user_cmds = config["test_commands"][symbol_found]
-                    if "compile" in user_cmds:
-                        compile_cmd = user_cmds["compile"]
-                        if isinstance(compile_cmd, str):
-                            compile_cmd = compile_cmd.split()
-                    if "run" in user_cmds:
-                        run_cmd = user_cmds["run"]
-                        if isinstance(run_cmd, str):
-                            run_cmd = run_cmd.split()
-        except Exception as e:
-            print(f"[CLI] \033[93mWarning: Failed to parses {config_path} -> {e}\033[0m")
-            
+    # Overrides from ~/.atm_config.json (or a .atm_config.json next to the source)
+    overrides = config.load(os.path.dirname(os.path.abspath(src_path))).test_commands(symbol_found)
+    compile_cmd = overrides.get("compile", LANGUAGE_TABLE[symbol_found]["compile"])
+    run_cmd = overrides.get("run", LANGUAGE_TABLE[symbol_found]["run"])
     return compile_cmd, run_cmd
 
+def compile_source(compile_cmd, src_path, artifact, use_cache=True, cwd=None, log=print, on_spawn=None):
+    """
+    Compiles the source (in `cwd`) unless an identical build (same source
+    bytes, compile command and compiler version) is already in the compile
+    cache. Messages go through `log`. `on_spawn`, if given, receives a
+    function that kills the compiler (as in runner.run_process). Returns
+    False if compilation failed.
+    """
+    import subprocess
+    from . import compile_cache
+    from . import pch
+    
+    # Settings come from the config next to the source, like the commands
+    src_dir = os.path.dirname(os.path.abspath(src_path))
+    enabled, max_size_bytes = compile_cache.load_settings(src_dir)
+    key = None
+    if use_cache and enabled and artifact and os.path.isfile(src_path):
+        key = compile_cache.cache_key(src_path, compile_cmd)
+        if compile_cache.lookup(key, artifact):
+            log("[CLI] \033[90mCompile cache hit. Skipped compilation.\033[0m")
+            return True
+    
+    build_cmd = compile_cmd
+    if pch.load_settings(src_dir):
+        build_cmd = pch.inject(compile_cmd, src_path, log)
+    
+    # A killable build gets its own process group, so that the compiler's
+    # children (cc1plus, as, ld) go down with it
+    group = on_spawn is not None and os.name != "nt"
+    proc = subprocess.Popen(build_cmd, stderr=subprocess.PIPE, text=True, cwd=cwd, start_new_session=group)
+    if on_spawn:
+        def kill():
+            if proc.poll() is not None:
+                return
+            try:
+                if group:
+                    import signal
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+            except OSError:
+                pass
+        on_spawn(kill)
+    _, stderr = proc.communicate()
+    if proc.returncode != 0:
+        log("[CLI] \033[91mCompilation Failed!\033[0m")
+        log(stderr)
+        return False
+    
+    if key:
+        compile_cache.store(key, artifact, max_size_bytes)
+    return True
+
+def expand_command(template, src_path, exec_filename):
+    file_base = os.path.splitext(os.path.basename(src_path))[0]
+    return [cmd.format(src=src_path, exec=exec_filename, basename=file_base) for cmd in template]
+
+def prepare_program(compile_template, run_template, src_path, exec_filename, use_cache=True, cwd=None, log=print, on_spawn=None):
+    """
+    Compiles src_path (if the language needs it) and returns the command that
+    runs it, or None if compilation failed. With `cwd`, the build and the
+    returned command are relative to that directory.
+    """
+    file_base = os.path.splitext(os.path.basename(src_path))[0]
+    
+    if compile_template:
+        from . import compile_cache
+        compile_cmd = expand_command(compile_template, src_path, exec_filename)
+        artifact = compile_cache.artifact_path(run_template, exec_filename, src_path, file_base)
+        if artifact and cwd:
+            artifact = os.path.join(cwd, artifact)
+        if not compile_source(compile_cmd, src_path, artifact, use_cache=use_cache, cwd=cwd, log=log, on_spawn=on_spawn):
+            return None
+    
+    return expand_command(run_template, src_path, exec_filename)
+
+def normalize_output(s):
+    # Normalize trailing whitespaces for flexible comparison
+    lines = s.strip().split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+def use_calibration(args, start_dir=None):
+    """
+    True if limits should be scaled by the stored calibration factor, either
+    via --calibrated or `"test": {"calibrated": true}` in the config that
+    applies to `start_dir` (the task directory).
+    """
+    if getattr(args, "calibrated", False):
+        return True
+    return config.load(start_dir).section("test").get("calibrated", False)
+
+def use_warm_runner(args, run_cmd, start_dir=None):
+    """
+    True if Python/PyPy cases should be forked from a pre-started interpreter,
+    via --warm or `"test": {"warm": true}` in the config that applies to
+    `start_dir`.
+    """
+    if not (getattr(args, "warm", False) or config.load(start_dir).section("test").get("warm", False)):
+        return False
+    from . import warm
+    if not warm.supports(run_cmd):
+        print("[CLI] \033[93mWarning: The warm runner only supports `python`/`pypy` run commands. Using a fresh process per case.\033[0m")
+        return False
+    return True
+
+def resolve_time_limit(args, time_limit_ms, lang, start_dir=None):
+    """
+    Returns the time limit to enforce locally. In calibrated mode the task's
+    limit is scaled by how much slower (or faster) this machine ran the
+    reference workload of the program's language than the judge.
+    """
+    if not use_calibration(args, start_dir):
+        return time_limit_ms
+    from . import calibrate
+    factor = calibrate.load_factor(lang)
+    if factor is None:
+        print(f"[CLI] \033[93mWarning: No calibration for {lang}. {calibrate.missing_hint(lang)}; using the unscaled limit.\033[0m")
+        return time_limit_ms
+    scaled = calibrate.scale_limit(time_limit_ms, factor)
+    print(f"[CLI] \033[90mCalibrated time limit ({lang}): {time_limit_ms} ms x {factor:.2f} = {scaled} ms\033[0m")
+    return scaled
+
+def resolve_jobs(jobs, case_count):
+    """
+    Number of sample cases to run concurrently. Defaults to the CPU count so that
+    every case gets a core of its own and the measured time stays comparable to a
+    sequential run.
+    """
+    if not jobs or jobs < 1:
+        jobs = os.cpu_count() or 1
+    return max(1, min(jobs, case_count))
+
+def run_in_order(fn, arg_list, jobs):
+    """
+    Yields fn(*args) for every args in arg_list, in order. With several jobs
+    all calls are dispatched to a thread pool at once, and iterating the futures
+    in submission order blocks only until the next one is done. With one job
+    they simply run one after another, without the pool (and its import cost).
+    """
+    if jobs <= 1:
+        for args in arg_list:
+            yield fn(*args)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(fn, *args) for args in arg_list]
+        for future in futures:
+            yield future.result()
+
+def _preview(data):
+    """
+    Decodes the start of a (possibly huge) output for display, marking where it
+    was cut.
+    """
+    text = data[:PREVIEW_BYTES].decode("utf-8", errors="replace")
+    if len(data) > PREVIEW_BYTES:
+        text += f"\n... ({len(data) - PREVIEW_BYTES} more bytes)"
+    return text
+
+def max_output_bytes(start_dir=None):
+    """
+    Output limit per case, from `"test": {"max_output_mb": ...}` in the config
+    that applies to `start_dir`.
+    """
+    return int(config.load(start_dir).section("test").get("max_output_mb", DEFAULT_MAX_OUTPUT_MB) * 1024 * 1024)
+
+def run_case(run_cmd, in_file, out_file, timeout, memory_limit_kb, judge, run=run_process, max_output=None, cwd=None):
+    """
+    Runs a single sample case and returns a dict describing the outcome.
+    Time and memory come from the child's own rusage (see runner.run_process),
+    so neither spawn overhead nor waiting in the pool queue is counted.
+    `run` is run_process or WarmPool.run, which have the same contract.
+
+    The output is streamed into `judge` (see judge.Judge) while the program
+    runs; only a preview of it is kept. A program writing more than
+    `max_output` bytes is stopped with OLE.
+    """
+    with open(in_file, "rb") as f:
+        sample_in = f.read()
+    with open(out_file, "rb") as f:
+        expected_preview = f.read(PREVIEW_BYTES + 1)
+    
+    comparison = judge.start(in_file, out_file)
+    result = run(run_cmd, sample_in, timeout, cwd=cwd, stdout_sink=comparison.feed, max_output_bytes=max_output, capture_limit=PREVIEW_BYTES + 1)
+    
+    case = {
+        "input": _preview(sample_in),
+        "expected": _preview(expected_preview),
+        "stdout": _preview(result["stdout"]),
+        "stderr": _preview(result["stderr"]),
+        "elapsed_ms": int(result["wall_ms"]),
+        "cpu_ms": None if result["user_ms"] is None else int(result["user_ms"] + result["sys_ms"]),
+        "max_rss_kb": result["max_rss_kb"],
+        "rss_floor_kb": result.get("rss_floor_kb"),
+        "launch_ms": result.get("launch_ms"),
+        "output_bytes": result.get("output_bytes"),
+        "truncated": len(expected_preview) > PREVIEW_BYTES or len(result["stdout"]) > PREVIEW_BYTES,
+    }
+    
+    if result.get("output_limit_exceeded"):
+        case["verdict"] = "OLE"
+    elif result["timed_out"]:
+        case["verdict"] = "TLE"
+    elif case["max_rss_kb"] is not None and case["max_rss_kb"] > memory_limit_kb:
+        case["verdict"] = "MLE"
+    elif result["returncode"] != 0:
+        case["verdict"] = "RE"
+    
+    if "verdict" in case:
+        comparison.close()
+        return case
+    
+    outcome = comparison.finish()
+    case["judge"] = outcome
+    case["verdict"] = "AC" if outcome["ok"] else "WA"
+    return case
+
+def prepare_helper(name, path, args, cwd=None):
+    """
+    Builds a helper program of the task (the interactor or the checker):
+    `path` if given, otherwise a `<name>.*` file in the task directory
+    (`cwd`, or the current one). Returns its run command, or None.
+    """
+    if path and cwd:
+        path = os.path.join(cwd, path)
+    if not path:
+        candidates = [p for p in sorted(glob.glob(os.path.join(cwd or "", f"{name}.*"))) if not p.endswith((".out", ".exe"))]
+        path = candidates[0] if candidates else None
+    if not path or not os.path.isfile(path):
+        print(f"[CLI] \033[91mError: This task needs a {name} but none was found. Put one at {name}.<ext> or pass --{name}.\033[0m")
+        return None
+    
+    import argparse
+    compile_template, run_template = get_test_commands(argparse.Namespace(lang=None), path, None)
+    exec_filename = f"{name}.out" if os.name != "nt" else f"{name}.exe"
+    return prepare_program(compile_template, run_template, path, exec_filename, use_cache=not getattr(args, "no_cache", False), cwd=cwd)
+
+def prepare_judge(args, metadata, cwd=None):
+    """
+    Creates the Judge described by metadata.json (--checker forces an external
+    checker). Returns None on error.
+    """
+    spec = dict(metadata.get("judge") or {})
+    if getattr(args, "checker", None):
+        spec = {"judge_type": "multisolution", "checker": args.checker}
+    
+    checker_cmd = None
+    if spec.get("judge_type") == "multisolution":
+        checker_cmd = prepare_helper("checker", spec.get("checker"), args, cwd)
+        if checker_cmd is None:
+            return None
+    
+    try:
+        return Judge(spec, checker_cmd, cwd)
+    except ValueError as e:
+        print(f"[CLI] \033[91mError: Invalid judge in metadata.json -> {e}\033[0m")
+        return None
+
+def run_interactive_case(run_cmd, interactor_cmd, in_file, out_file, timeout, memory_limit_kb, cwd=None, on_spawn=None):
+    """
+    Runs a single case of an interactive task (see interactive.run_interactive)
+    and returns a dict in the same shape as run_case.
+    """
+    from . import interactive
+    with open(in_file, "r", encoding="utf-8") as f:
+        sample_in = f.read()
+    
+    result = interactive.run_interactive(run_cmd, interactor_cmd, in_file, out_file, timeout, cwd, on_spawn)
+    
+    case = {
+        "input": sample_in,
+        "expected": "",
+        "stdout": "",
+        "stderr": result["sol_stderr"].decode("utf-8", errors="replace"),
+        "elapsed_ms": int(result["sol_wall_ms"]),
+        "cpu_ms": int(result["sol_user_ms"] + result["sol_sys_ms"]),
+        "max_rss_kb": result["sol_max_rss_kb"],
+        "queries": result["queries"],
+        "answers": result["answers"],
+        "interactor_cpu_ms": int(result["interactor_cpu_ms"]),
+        "interactor_stderr": result["interactor_stderr"].decode("utf-8", errors="replace"),
+        "transcript": [(tag, line.decode("utf-8", errors="replace")) for tag, line in result["transcript"]],
+        "deadlocked": result["deadlocked"],
+    }
+    
+    if result["sol_timed_out"] or result["deadlocked"]:
+        case["verdict"] = "TLE"
+    elif case["max_rss_kb"] > memory_limit_kb:
+        case["verdict"] = "MLE"
+    elif result["interactor_returncode"] != 0 and result["interactor_exited_first"]:
+        # The interactor rejected the solution, which then crashed reading from a closed pipe
+        case["verdict"] = "WA"
+    elif result["sol_returncode"] != 0:
+        case["verdict"] = "RE"
+    elif result["interactor_killed"] or result["interactor_returncode"] != 0:
+        case["verdict"] = "WA"
+    else:
+        case["verdict"] = "AC"
+    return case
+
+def report_interactive_case(basename, case):
+    verdict = case["verdict"]
+    traffic = f"{case['queries']} queries, interactor {case['interactor_cpu_ms']} ms"
+    
+    if verdict == "AC":
+        print(f"# {basename} ... \033[92mPASSED\033[0m {case['elapsed_ms']} ms ({traffic})")
+        return True
+    
+    note = " (deadlock: both sides were waiting for input)" if case["deadlocked"] else ""
+    color = "91" if verdict == "WA" else "93"
+    print(f"# {basename} ... \033[{color}m{verdict}\033[0m{note} ({traffic})")
+    print(f"[Input]\n{case['input'].strip()}")
+    if case["transcript"]:
+        print(f"[Transcript] (last {len(case['transcript'])} lines, > solution, < interactor)")
+        for tag, line in case["transcript"]:
+            print(f"{tag} {line}")
+    if case["stderr"].strip():
+        print(f"[Error]\n{case['stderr'].strip()}")
+    if case["interactor_stderr"].strip():
+        print(f"[Interactor]\n{case['interactor_stderr'].strip()}")
+    print("\n")
+    return False
+
+def print_diff_window(outcome):
+    for title, window in (("Expected", outcome["expected_window"]), ("Received", outcome["actual_window"])):
+        print(f"[{title}] (around the first difference)")
+        width = len(str(window[-1][0])) if window else 1
+        for line_no, text, is_target in window:
+            marker = "\033[91m>\033[0m" if is_target else " "
+            print(f"{marker} {str(line_no).rjust(width)} | {text}")
+
+def report_case(basename, case):
+    """
+    Prints the result of a single case. Returns True if the case passed.
+    """
+    if "transcript" in case:
+        return report_interactive_case(basename, case)
+    
+    verdict = case["verdict"]
+    
+    if verdict == "AC":
+        print(f"# {basename} ... \033[92mPASSED\033[0m {case['elapsed_ms']} ms")
+        if case["stderr"].strip():
+            print(f"[Error]\n{case['stderr'].strip()}")
+        return True
+    
+    if verdict == "TLE":
+        print(f"# {basename} ... \033[93mTLE\033[0m")
+        print("\n")
+        return False
+    
+    if verdict == "MLE":
+        print(f"# {basename} ... \033[93mMLE\033[0m {case['max_rss_kb'] / 1024:.1f} MiB")
+        print("\n")
+        return False
+    
+    if verdict == "OLE":
+        print(f"# {basename} ... \033[93mOLE\033[0m stopped after {case['output_bytes'] / (1024 * 1024):.1f} MiB of output")
+        print("\n")
+        return False
+    
+    if verdict == "RE":
+        print(f"# {basename} ... \033[93mRE\033[0m")
+    else:
+        print(f"# {basename} ... \033[91mWA\033[0m")
+    outcome = case.get("judge")
+    print(f"[Input]\n{case['input'].strip()}")
+    if outcome and "expected_window" in outcome and case["truncated"]:
+        # Large outputs: only the lines around the first difference
+        print_diff_window(outcome)
+    else:
+        print(f"[Expected]\n{case['expected'].strip()}")
+        print(f"[Received]\n{case['stdout'].strip()}")
+    print_judge_outcome(outcome)
+    if case["stderr"].strip():
+        print(f"[Error]\n{case['stderr'].strip()}")
+    print("\n")
+    return False
+
+def print_judge_outcome(outcome):
+    """
+    The checker's message or the first differing line/token of a WA.
+    """
+    if outcome and outcome.get("message"):
+        print(f"[Checker]\n{outcome['message']}")
+    elif outcome and "index" in outcome:
+        expected = "(end of output)" if outcome["expected"] is None else repr(outcome["expected"])
+        received = "(end of output)" if outcome["actual"] is None else repr(outcome["actual"])
+        print(f"[Judge] First difference at {outcome['unit']} {outcome['index'] + 1}: expected {expected}, received {received}")
+
+def print_summary(results, time_limit_ms, memory_limit_kb):
+    """
+    Prints a per-case table of wall time, CPU time (user + sys) and peak memory.
+    Values at 80% of the limit or more are highlighted. Peaks below what a
+    child inherits from its parent (this process or the warm fork server) are
+    shown as an upper bound.
+    """
+    verdict_colors = {"AC": "92", "WA": "91"}
+    
+    def cell(text, width, warn=False, color=None):
+        padded = text.ljust(width)
+        if warn:
+            return f"\033[93m{padded}\033[0m"
+        if color:
+            return f"\033[{color}m{padded}\033[0m"
+        return padded
+    
+    name_width = max([len(name) for name, _ in results] + [4]) + 2
+    print(f"{'Case'.ljust(name_width)}{'Verdict'.ljust(9)}{'Wall'.ljust(10)}{'CPU'.ljust(10)}Memory")
+    for name, case in results:
+        cpu = case.get("cpu_ms")
+        rss = case.get("max_rss_kb")
+        rss_floor = case.get("rss_floor_kb") or rss_floor_kb()
+        line = cell(name, name_width)
+        line += cell(case["verdict"], 9, color=verdict_colors.get(case["verdict"], "93"))
+        line += cell(f"{case['elapsed_ms']} ms", 10, warn=case["elapsed_ms"] >= time_limit_ms * 0.8)
+        line += cell("-" if cpu is None else f"{cpu} ms", 10, warn=cpu is not None and cpu >= time_limit_ms * 0.8)
+        if rss is None:
+            memory = "-"
+        elif rss_floor and rss <= rss_floor:
+            memory = f"<= {rss_floor / 1024:.1f} MiB"
+        else:
+            memory = f"{rss / 1024:.1f} MiB"
+        line += cell(memory, 0, warn=rss is not None and rss >= memory_limit_kb * 0.8)
+        print(line.rstrip())
+    print(f"\033[90mLimits: {time_limit_ms} ms / {memory_limit_kb // 1024} MiB\033[0m")
+    launches = [case["launch_ms"] for _, case in results if case.get("launch_ms") is not None]
+    if launches:
+        print(f"\033[90mLaunch overhead: {sum(launches) / len(launches):.1f} ms per case (not included in Wall)\033[0m")
+
 def run_tests(args):
     """
     Finds the main.cpp code (or whichever specified), compiles it if needed,
@@ -67,8 +499,6 @@ def run_tests(args):
     src_path = args.src
     cwd = os.getcwd()
     
-    import datetime
-    
     # Try to load metadata.json
     metadata = {}
     metadata_path = os.path.join(cwd, "metadata.json")
@@ -82,18 +512,13 @@ def run_tests(args):
     compile_template, run_template = get_test_commands(args, src_path, metadata)
     
     exec_filename = "a.out" if os.name != "nt" else "a.exe"
-    file_base = os.path.splitext(os.path.basename(src_path))[0]
+    
+    run_cmd = prepare_program(compile_template, run_template, src_path, exec_filename, use_cache=not getattr(args, "no_cache", False))
+    if run_cmd is None:
+        return False
     
     if compile_template:
-        compile_cmd = [cmd.format(src=src_path, exec=exec_filename, basename=file_base) for cmd in compile_template]
-        
-        try:
-            subprocess.run(compile_cmd, check=True, stderr=subprocess.PIPE, text=True)
-        except subprocess.CalledProcessError as e:
-            print("[CLI] \033[91mCompilation Failed!\033[0m")
-            print(e.stderr)
-            return False
-            
+        import datetime
         dt_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
         print(f"{dt_str} INFO: Inferred exec file: ./{exec_filename}")
     
@@ -104,13 +529,21 @@ def run_tests(args):
     
     temp_dir_obj = None
     
-    if not os.path.isdir(in_dir) or not os.path.isdir(out_dir):
+    # Interactive tasks run against an interactor instead of comparing with out/
+    def is_interactive():
+        return metadata.get("judge", {}).get("judge_type") == "interactive" or bool(getattr(args, "interactor", None))
+    
+    if not os.path.isdir(in_dir) or not (os.path.isdir(out_dir) or is_interactive()):
         print("[CLI] \033[93mCurrent directory doesn't have 'in/' or 'out/' folders.\033[0m")
         print("[CLI] \033[96mInitiating Tab-Sync Fallback...\033[0m")
         sys.stdout.flush()
-        from .gen import request_current_context
-        ctx = request_current_context()
-        if not ctx or not ctx.get('samples'):
+        from .gen import request_current_context, request_task_samples, judge_spec
+        ctx = request_current_context(with_samples=False)
+        task = None
+        if ctx and ctx.get('task_screen_name'):
+            task = request_task_samples(ctx['contest_id'], ctx['task_screen_name'])
+        samples = task.get("samples") if task else None
+        if not samples:
             print(f"[CLI] \033[91mTab-Sync Fallback failed. Could not find samples in active tab.\033[0m")
             return False
             
@@ -122,15 +555,40 @@ def run_tests(args):
         os.makedirs(in_dir)
         os.makedirs(out_dir)
         
-        for i, sample in enumerate(ctx['samples']):
+        for i, sample in enumerate(samples):
             idx = i + 1
             with open(os.path.join(in_dir, f"in_{idx}.txt"), "w", encoding="utf-8") as f:
                 f.write(sample["input"])
             with open(os.path.join(out_dir, f"out_{idx}.txt"), "w", encoding="utf-8") as f:
                 f.write(sample["output"])
-        print(f"[CLI] Tab-Sync Fallback successful: Extracted {len(ctx['samples'])} samples into temporary secret room.")
+        print(f"[CLI] Tab-Sync Fallback successful: Extracted {len(samples)} samples into temporary secret room.")
+        
+        # Without metadata.json, the limits fetched along with the samples apply
+        if task.get("time_limit_ms") and "timeout_ms" not in metadata:
+            metadata["timeout_ms"] = task["time_limit_ms"]
+        if task.get("memory_limit_mb") and "memory_limit_mb" not in metadata:
+            metadata["memory_limit_mb"] = task["memory_limit_mb"]
+        if "judge" not in metadata:
+            metadata["judge"] = judge_spec(task)
         
     try:
+        interactor_cmd = None
+        judge = None
+        if is_interactive():
+            from . import interactive
+            if not interactive.supported():
+                print("[CLI] \033[91mError: Interactive testing is only supported on Linux/macOS.\033[0m")
+                return False
+            interactor_cmd = prepare_helper("interactor", getattr(args, "interactor", None) or metadata.get("judge", {}).get("interactor"), args)
+            if interactor_cmd is None:
+                return False
+        else:
+            judge = prepare_judge(args, metadata)
+            if judge is None:
+                return False
+            if judge.judge_type != "normal":
+                print(f"[CLI] \033[90mJudge: {judge.describe()}\033[0m")
+        
         in_files = sorted(glob.glob(os.path.join(in_dir, "*.txt")))
         
         if not in_files:
@@ -140,6 +598,7 @@ def run_tests(args):
         passed_count = 0
         total_count = len(in_files)
         
+        cases = []
         for in_file in in_files:
             basename = os.path.basename(in_file)
             # Expected corresponding output file
@@ -148,68 +607,48 @@ def run_tests(args):
             out_file = os.path.join(out_dir, out_name)
             
             if not os.path.isfile(out_file):
+                if interactor_cmd:
+                    # The interactor gets the expected output only if there is one
+                    cases.append((basename, in_file, None))
+                    continue
                 print(f"[CLI] \033[93mWarning: Missing expected output file '{out_file}' for input '{basename}'. Skipping.\033[0m")
                 continue
-                
-            with open(in_file, "r", encoding="utf-8") as f:
-                sample_in = f.read()
-                
-            with open(out_file, "r", encoding="utf-8") as f:
-                expected_out = f.read()
-                
-            # Run the program
-            start_time = time.time()
-            try:
-                # Format the run command
-                run_cmd = [cmd.format(src=src_path, exec=exec_filename, basename=file_base) for cmd in run_template]
-                
-                result = subprocess.run(
-                    run_cmd,
-                    input=sample_in,
-                    text=True,
-                    capture_output=True,
-                    timeout=2.0
-                )
-                
-                elapsed_ms = int((time.time() - start_time) * 1000)
-                
-                if result.returncode != 0:
-                    print(f"# {basename} ... \033[93mRE\033[0m")
-                    print(f"[Input]\n{sample_in.strip()}")
-                    print(f"[Expected]\n{expected_out.strip()}")
-                    print(f"[Received]\n{result.stdout.strip()}")
-                    if result.stderr.strip():
-                        print(f"[Error]\n{result.stderr.strip()}")
-                    print("\n")
-                    continue
-                    
-                actual_out = result.stdout
-                
-                # Normalize trailing whitespaces for flexible comparison
-                def normalize_str(s):
-                    lines = s.strip().split('\n')
-                    return '\n'.join(line.rstrip() for line in lines)
-                    
-                norm_actual = normalize_str(actual_out)
-                norm_expected = normalize_str(expected_out)
-                
-                if norm_actual == norm_expected:
-                    print(f"# {basename} ... \033[92mPASSED\033[0m {elapsed_ms} ms")
+            cases.append((basename, in_file, out_file))
+        
+        jobs = resolve_jobs(getattr(args, "jobs", None), len(cases))
+        # Per-task settings come from the config next to the source, so that
+        # `atm test path/to/A/main.cpp` behaves as it does inside A
+        src_dir = os.path.dirname(os.path.abspath(src_path))
+        time_limit_ms = resolve_time_limit(args, int(metadata.get("timeout_ms", DEFAULT_TIME_LIMIT_MS)), resolve_language(args, src_path, metadata), src_dir)
+        timeout = time_limit_ms / 1000
+        memory_limit_kb = int(metadata.get("memory_limit_mb", DEFAULT_MEMORY_LIMIT_MB)) * 1024
+        max_output = max_output_bytes(src_dir)
+        results = []
+        
+        run = run_process
+        pool = None
+        if not interactor_cmd and use_warm_runner(args, run_cmd, src_dir):
+            from . import warm
+            pool = warm.WarmPool(run_cmd, jobs)
+            run = pool.run
+        
+        def run_one(in_file, out_file):
+            if interactor_cmd:
+                return run_interactive_case(run_cmd, interactor_cmd, in_file, out_file, timeout, memory_limit_kb)
+            return run_case(run_cmd, in_file, out_file, timeout, memory_limit_kb, judge, run, max_output)
+        
+        try:
+            for (basename, _, _), case in zip(cases, run_in_order(run_one, [(i, o) for _, i, o in cases], jobs)):
+                results.append((basename, case))
+                if report_case(basename, case):
                     passed_count += 1
-                    if result.stderr.strip():
-                        print(f"[Error]\n{result.stderr.strip()}")
-                else:
-                    print(f"# {basename} ... \033[91mWA\033[0m")
-                    print(f"[Input]\n{sample_in.strip()}")
-                    print(f"[Expected]\n{expected_out.strip()}")
-                    print(f"[Received]\n{actual_out.strip()}")
-                    if result.stderr.strip():
-                        print(f"[Error]\n{result.stderr.strip()}")
-                    print("\n")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"# {basename} ... \033[93mTLE\033[0m")
-                print("\n")
+                sys.stdout.flush()
+        finally:
+            if pool:
+                pool.close()
+        
+        if results:
+            print_summary(results, time_limit_ms, memory_limit_kb)
                 
         if passed_count == total_count:
             print("\033[92mPassed all test cases!!!\033[0m")
@@ -225,7 +664,20 @@ def run_tests(args):
             print("[CLI] \033[90mCleaned up temporary secret room.\033[0m")
 
 def test_code(args):
-    success = run_tests(args)
+    if getattr(args, "watch", False):
+        if getattr(args, "all", False):
+            print("[CLI] \033[91mError: --watch works on a single task and can't be combined with --all.\033[0m")
+            sys.exit(1)
+        if getattr(args, "warm", False):
+            print("[CLI] \033[91mError: --warm can't be combined with --watch, which starts a fresh process per case so that a new run can kill it.\033[0m")
+            sys.exit(1)
+        from .watch import watch_tests
+        success = watch_tests(args)
+    elif getattr(args, "all", False):
+        from .batch import test_all
+        success = test_all(args)
+    else:
+        success = run_tests(args)
     if not success:
         sys.exit(1)
     sys.exit(0)
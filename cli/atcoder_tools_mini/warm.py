@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import tempfile
+import subprocess
+
+from .runner import run_process, HAS_WAIT4
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_forkserver.py")
+
+def supports(run_cmd):
+    """
+    True if run_cmd is a plain `<python|pypy> <src>.py` invocation that the
+    fork server can take over.
+    """
+    if not HAS_WAIT4 or not hasattr(os, "fork") or len(run_cmd) != 2:
+        return False
+    interpreter = os.path.basename(run_cmd[0]).lower()
+    return interpreter.startswith(("python", "pypy")) and run_cmd[1].endswith(".py")
+
+class WarmServerError(Exception):
+    pass
+
+class WarmServer:
+    """
+    One fork server process (see _forkserver.py). Handles one case at a time.
+    """
+    def __init__(self, run_cmd, cwd=None):
+        interpreter, src = run_cmd
+        self.workdir = tempfile.mkdtemp(prefix="atm_warm_")
+        self.proc = subprocess.Popen(
+            [interpreter, SERVER_SCRIPT, src],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", cwd=cwd
+        )
+        self.rss_floor_kb = None
+        self.ready = False
+
+    def _reply(self):
+        line = self.proc.stdout.readline()
+        if not line:
+            raise WarmServerError("fork server exited")
+        return json.loads(line)
+
+    def run(self, input_data, timeout, stdout_sink=None, max_output_bytes=None, capture_limit=None):
+        """
+        Same contract as runner.run_process, where `launch_ms` is the time
+        spent outside the solution (request round trip and fork). `wall_ms` is the
+        solution's own time from fork to exit. The output limit is enforced
+        with RLIMIT_FSIZE on the child's output file.
+        """
+        if not self.ready:
+            self.rss_floor_kb = self._reply().get("rss_floor_kb")
+            self.ready = True
+
+        in_path = os.path.join(self.workdir, "in")
+        out_path = os.path.join(self.workdir, "out")
+        err_path = os.path.join(self.workdir, "err")
+        with open(in_path, "wb") as f:
+            f.write(input_data)
+
+        start = time.perf_counter()
+        try:
+            self.proc.stdin.write(json.dumps({"in": in_path, "out": out_path, "err": err_path, "timeout": timeout, "max_output": max_output_bytes}) + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise WarmServerError(str(e))
+        reply = self._reply()
+        total_ms = (time.perf_counter() - start) * 1000
+
+        output_bytes = os.path.getsize(out_path)
+        limit_exceeded = max_output_bytes is not None and output_bytes > max_output_bytes
+        with open(out_path, "rb") as f:
+            if stdout_sink is None or limit_exceeded:
+                stdout = f.read(capture_limit if capture_limit is not None else -1)
+            else:
+                stdout = b""
+                while True:
+                    chunk = f.read(65536)
+                    if not chunk:
+                        break
+                    if capture_limit is None or len(stdout) < capture_limit:
+                        stdout += chunk if capture_limit is None else chunk[:capture_limit - len(stdout)]
+                    stdout_sink(chunk)
+        with open(err_path, "rb") as f:
+            stderr = f.read(capture_limit if capture_limit is not None else -1)
+
+        return {
+            "returncode": reply["returncode"],
+            "stdout": stdout,
+            "stderr": stderr,
+            "timed_out": reply["timed_out"],
+            "wall_ms": reply["run_ms"],
+            "user_ms": reply["user_ms"],
+            "sys_ms": reply["sys_ms"],
+            "max_rss_kb": reply["max_rss_kb"],
+            "rss_floor_kb": self.rss_floor_kb,
+            "launch_ms": max(0.0, total_ms - reply["run_ms"]),
+            "output_bytes": output_bytes,
+            "output_limit_exceeded": limit_exceeded,
+        }
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+class WarmPool:
+    """
+    `size` fork servers shared by the worker threads of run_tests. All servers
+    start at once, so their interpreter startup overlaps with compilation and
+    with each other. A server that breaks is dropped and its case (and every
+    later one it would have taken) runs through run_process instead. The
+    servers (and so every case) run in `cwd`.
+    """
+    def __init__(self, run_cmd, size, cwd=None):
+        self.run_cmd = run_cmd
+        self.cwd = cwd
+        self.servers = [WarmServer(run_cmd, cwd) for _ in range(size)]
+        self.idle = queue.Queue()
+        for server in self.servers:
+            self.idle.put(server)
+
+    def run(self, cmd, input_data, timeout, cwd=None, **kwargs):
+        cwd = cwd or self.cwd
+        server = self.idle.get()
+        if server is None:
+            self.idle.put(None)
+            return run_process(cmd, input_data, timeout, cwd=cwd, **kwargs)
+        try:
+            result = server.run(input_data, timeout, **kwargs)
+        except (WarmServerError, OSError, ValueError):
+            print("[CLI] \033[93mWarning: Warm runner failed. Falling back to a fresh process per case.\033[0m", file=sys.stderr)
+            self.idle.put(None)
+            return run_process(cmd, input_data, timeout, cwd=cwd, **kwargs)
+        self.idle.put(server)
+        return result
+
+    def close(self):
+        for server in self.servers:
+            server.close()
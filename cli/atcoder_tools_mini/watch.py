@@ -0,0 +1,375 @@
+import os
+import sys
+import glob
+import json
+import time
+import struct
+import select
+import datetime
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .runner import run_process
+from . import interactive
+from . import config
+from .test import (
+    DEFAULT_TIME_LIMIT_MS, DEFAULT_MEMORY_LIMIT_MB,
+    get_test_commands, resolve_language, prepare_program, prepare_judge, prepare_helper,
+    run_case, run_interactive_case, report_case, print_summary,
+    resolve_jobs, resolve_time_limit, max_output_bytes,
+)
+
+# Editors write a file in several steps (or via a temporary file and a rename);
+# a round starts once nothing has changed for this long
+DEBOUNCE_MS = 150
+
+# Used where inotify is not available
+POLL_INTERVAL = 0.3
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+HEADER_EXTENSIONS = (".h", ".hpp", ".hh", ".hxx")
+
+class _Inotify:
+    """
+    Watches directories with Linux inotify through libc (no dependencies).
+    """
+    name = "inotify"
+
+    def __init__(self, dirs):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for d in dirs:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = d
+
+    def wait(self, timeout):
+        """
+        Returns the paths changed within `timeout` seconds (None: no limit).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        paths = []
+        pos = 0
+        while pos + 16 <= len(data):
+            wd, _, _, length = struct.unpack_from("iIII", data, pos)
+            name = data[pos + 16:pos + 16 + length].rstrip(b"\0")
+            pos += 16 + length
+            if wd in self.dirs and name:
+                paths.append(os.path.join(self.dirs[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class _Poller:
+    """
+    Fallback watcher comparing the mtime and size of every file in the
+    directories.
+    """
+    name = "polling"
+
+    def __init__(self, dirs):
+        self.dirs = dirs
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        files = {}
+        for d in self.dirs:
+            try:
+                for entry in os.scandir(d):
+                    if entry.is_file():
+                        st = entry.stat()
+                        files[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        return files
+
+    def wait(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(POLL_INTERVAL if deadline is None else max(0.0, min(POLL_INTERVAL, deadline - time.monotonic())))
+            current = self._scan()
+            changed = [p for p in current.keys() | self.snapshot.keys() if current.get(p) != self.snapshot.get(p)]
+            self.snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+def open_watcher(dirs):
+    if sys.platform.startswith("linux"):
+        try:
+            return _Inotify(dirs)
+        except (OSError, AttributeError):
+            pass
+    return _Poller(dirs)
+
+def classify(path, src_path):
+    """
+    What a changed file invalidates: "source" (recompile and rerun all),
+    "setup" (metadata.json, .atm_config.json, checker or interactor: reload
+    and rerun all), "case" (rerun that case only), or None if it doesn't
+    matter.
+    """
+    name = os.path.basename(path)
+    if name == config.LOCAL_CONFIG_NAME and os.path.dirname(path) == os.getcwd():
+        return "setup"
+    if name.startswith(".") or name.endswith(("~", ".swp", ".swx", ".tmp")):
+        return None
+    parent = os.path.basename(os.path.dirname(path))
+    if os.path.dirname(path) != os.getcwd():
+        return "case" if parent in ("in", "out") and name.endswith(".txt") else None
+    if os.path.abspath(path) == os.path.abspath(src_path) or name.endswith(HEADER_EXTENSIONS):
+        return "source"
+    if name == "metadata.json" or (name.startswith(("checker.", "interactor.")) and not name.endswith((".out", ".exe"))):
+        return "setup"
+    return None
+
+def wait_for_changes(watcher, src_path):
+    """
+    Blocks until a relevant file changes, then collects changes until none
+    arrive for DEBOUNCE_MS. Returns a plan: {"source", "setup", "cases"}.
+    """
+    plan = {"source": False, "setup": False, "cases": set()}
+    timeout = None
+    while True:
+        paths = watcher.wait(timeout)
+        if not paths and timeout is not None:
+            return plan
+        for path in paths:
+            kind = classify(path, src_path)
+            if kind == "case":
+                plan["cases"].add(os.path.basename(path))
+            elif kind:
+                plan[kind] = True
+        if plan["source"] or plan["setup"] or plan["cases"]:
+            timeout = DEBOUNCE_MS / 1000
+
+def merge_plans(a, b):
+    return {"source": a["source"] or b["source"], "setup": a["setup"] or b["setup"], "cases": a["cases"] | b["cases"]}
+
+class _Round(threading.Thread):
+    """
+    One compile-and-test pass. cancel() kills the compiler or the cases that
+    are running and keeps the rest from starting or being reported. Once the
+    round has completed, cancel() is a no-op.
+    """
+    def __init__(self, session, plan):
+        super().__init__(daemon=True)
+        self.session = session
+        self.plan = plan
+        self.cancelled = threading.Event()
+        self.kills = []
+        self.lock = threading.Lock()
+        self.completed = False
+
+    def register(self, kill):
+        with self.lock:
+            self.kills.append(kill)
+            if self.cancelled.is_set():
+                kill()
+
+    def cancel(self):
+        with self.lock:
+            if self.completed:
+                return
+            self.cancelled.set()
+            for kill in self.kills:
+                kill()
+
+    def run(self):
+        completed = False
+        try:
+            completed = run_round(self.session, self.plan, self)
+        finally:
+            with self.lock:
+                self.completed = completed
+
+def load_setup(session):
+    """
+    (Re)reads metadata.json and prepares the judge or interactor and the limits.
+    Returns False on error.
+    """
+    args = session["args"]
+    metadata = {}
+    if os.path.isfile("metadata.json"):
+        try:
+            with open("metadata.json", "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+    session["metadata"] = metadata
+    session["templates"] = get_test_commands(args, session["src"], metadata)
+    session["interactor_cmd"] = session["judge"] = None
+
+    if metadata.get("judge", {}).get("judge_type") == "interactive" or getattr(args, "interactor", None):
+        if not interactive.supported():
+            print("[CLI] \033[91mError: Interactive testing is only supported on Linux/macOS.\033[0m")
+            return False
+        session["interactor_cmd"] = prepare_helper("interactor", getattr(args, "interactor", None) or metadata.get("judge", {}).get("interactor"), args)
+        if session["interactor_cmd"] is None:
+            return False
+    else:
+        session["judge"] = prepare_judge(args, metadata)
+        if session["judge"] is None:
+            return False
+
+    src_dir = os.path.dirname(os.path.abspath(session["src"]))
+    session["time_limit_ms"] = resolve_time_limit(args, int(metadata.get("timeout_ms", DEFAULT_TIME_LIMIT_MS)), resolve_language(args, session["src"], metadata), src_dir)
+    session["max_output"] = max_output_bytes(src_dir)
+    session["memory_limit_kb"] = int(metadata.get("memory_limit_mb", DEFAULT_MEMORY_LIMIT_MB)) * 1024
+    return True
+
+def select_cases(plan):
+    """
+    The (basename, in_file, out_file) cases to run: all of them after a
+    source or setup change, otherwise those whose input or output changed.
+    """
+    cases = []
+    for in_file in sorted(glob.glob(os.path.join("in", "*.txt"))):
+        basename = os.path.basename(in_file)
+        out_name = basename.replace("in", "out")
+        if not (plan["source"] or plan["setup"]) and basename not in plan["cases"] and out_name not in plan["cases"]:
+            continue
+        out_file = os.path.join("out", out_name)
+        cases.append((basename, in_file, out_file if os.path.isfile(out_file) else None))
+    return cases
+
+def run_round(session, plan, round_):
+    """
+    Returns False if the round was cancelled before it finished reporting.
+    """
+    args = session["args"]
+    if plan["setup"] or session.get("templates") is None:
+        session["ready"] = load_setup(session)
+    if not session["ready"]:
+        return True
+    if round_.cancelled.is_set():
+        return False
+
+    if plan["source"] or plan["setup"]:
+        compile_template, run_template = session["templates"]
+        exec_filename = "a.out" if os.name != "nt" else "a.exe"
+        # A killed compiler is not a compile error
+        log = lambda message: round_.cancelled.is_set() or print(message)
+        session["run_cmd"] = prepare_program(compile_template, run_template, session["src"], exec_filename,
+                                             use_cache=not getattr(args, "no_cache", False), log=log, on_spawn=round_.register)
+    if round_.cancelled.is_set():
+        return False
+    run_cmd = session.get("run_cmd")
+    if run_cmd is None:
+        return True
+
+    interactor_cmd = session["interactor_cmd"]
+    cases = [case for case in select_cases(plan) if case[2] or interactor_cmd]
+    if not cases:
+        return True
+
+    timeout = session["time_limit_ms"] / 1000
+    memory_limit_kb = session["memory_limit_kb"]
+    run = functools.partial(run_process, on_spawn=round_.register)
+
+    def run_one(in_file, out_file):
+        if round_.cancelled.is_set():
+            return None
+        if interactor_cmd:
+            return run_interactive_case(run_cmd, interactor_cmd, in_file, out_file, timeout, memory_limit_kb, on_spawn=round_.register)
+        return run_case(run_cmd, in_file, out_file, timeout, memory_limit_kb, session["judge"], run, session["max_output"])
+
+    results = []
+    passed_count = 0
+    with ThreadPoolExecutor(max_workers=resolve_jobs(getattr(args, "jobs", None), len(cases))) as executor:
+        futures = [executor.submit(run_one, in_file, out_file) for _, in_file, out_file in cases]
+        for (basename, _, _), future in zip(cases, futures):
+            case = future.result()
+            if round_.cancelled.is_set():
+                for f in futures:
+                    f.cancel()
+                return False
+            results.append((basename, case))
+            if report_case(basename, case):
+                passed_count += 1
+            sys.stdout.flush()
+
+    print_summary(results, session["time_limit_ms"], memory_limit_kb)
+    if passed_count == len(cases):
+        print(f"\033[92mPassed all {len(cases)} test cases!!!\033[0m")
+    else:
+        print(f"\033[91mSome cases FAILED (passed {passed_count} of {len(cases)})\033[0m")
+    sys.stdout.flush()
+    return True
+
+def describe_plan(plan):
+    if plan["setup"]:
+        return "Setup changed. Reloading and re-running all cases"
+    if plan["source"]:
+        return "Source changed. Re-running all cases"
+    names = ", ".join(sorted(plan["cases"]))
+    return f"{names} changed. Re-running the affected cases"
+
+def watch_tests(args):
+    """
+    `atm test --watch`: keeps running and re-tests whenever the source, the
+    samples or the task setup change, cancelling a run that is still going.
+    Configuration is read once per setup change instead of once per run.
+    """
+    src_path = args.src
+    if not os.path.isfile(src_path):
+        print(f"[CLI] \033[91mError: '{src_path}' not found.\033[0m")
+        return False
+    if not os.path.isdir("in"):
+        print("[CLI] \033[91mError: Watch mode needs the 'in/' (and 'out/') folders of a task directory created by `atm gen`.\033[0m")
+        return False
+
+    dirs = [os.getcwd()] + [os.path.abspath(d) for d in ("in", "out") if os.path.isdir(d)]
+    watcher = open_watcher(dirs)
+    session = {"args": args, "src": src_path, "templates": None, "ready": False}
+    if config.load(os.path.dirname(os.path.abspath(src_path))).section("test").get("warm", False):
+        print("[CLI] \033[90m\"test\": {\"warm\": true} is ignored in watch mode, which starts a fresh process per case.\033[0m")
+    print(f"[CLI] \033[96mWatching {src_path}, in/ and out/ ({watcher.name}). Press Ctrl+C to stop.\033[0m")
+
+    plan = {"source": True, "setup": True, "cases": set()}
+    current = None
+    try:
+        while True:
+            if current is not None:
+                current.cancel()
+                current.join()
+                if not current.completed:
+                    # The cancelled round's work still has to be done
+                    plan = merge_plans(current.plan, plan)
+            if current is not None:
+                now = datetime.datetime.now().strftime("%H:%M:%S")
+                print(f"\n[CLI] \033[96m{now} {describe_plan(plan)}...\033[0m")
+                sys.stdout.flush()
+            current = _Round(session, plan)
+            current.start()
+            plan = wait_for_changes(watcher, src_path)
+    except KeyboardInterrupt:
+        print("\n[CLI] \033[90mStopped watching.\033[0m")
+    finally:
+        if current is not None:
+            current.cancel()
+            current.join(1.0)
+        watcher.close()
+    return True
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compile latency of a typical `#include <bits/stdc++.h>` solution with and
+without the precompiled header managed by `atm`.
+
+With --batch N, instead runs `atm test --all -j N` on N C++ tasks with a
+cold cache and fails unless the header was built exactly once.
+
+Usage (from the `cli` directory):
+    python benchmarks/bench_pch.py [--repeat N] [--batch N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+CLI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, CLI_DIR)
+
+from atcoder_tools_mini.lang_map import LANGUAGE_TABLE
+from atcoder_tools_mini import pch
+
+SOURCE = """#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    int n;
+    cin >> n;
+    vector<long long> a(n);
+    for (auto &x : a) cin >> x;
+    sort(a.begin(), a.end());
+    cout << accumulate(a.begin(), a.end(), 0LL) << endl;
+    return 0;
+}
+"""
+
+def measure(cmd, cwd, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def check_batch(task_count):
+    """
+    `atm test --all -j N` on a cold cache: every task needs the same header,
+    which must be built once and not once per parallel compile.
+    """
+    with tempfile.TemporaryDirectory(prefix="atm_bench_pch_batch_") as root:
+        contest = os.path.join(root, "contest")
+        for i in range(task_count):
+            task = os.path.join(contest, f"T{i}")
+            os.makedirs(os.path.join(task, "in"))
+            os.makedirs(os.path.join(task, "out"))
+            with open(os.path.join(task, "metadata.json"), "w", encoding="utf-8") as f:
+                json.dump({"code_filename": "main.cpp", "problem": {"alphabet": f"T{i}"}}, f)
+            with open(os.path.join(task, "main.cpp"), "w", encoding="utf-8") as f:
+                f.write(SOURCE)
+            with open(os.path.join(task, "in", "in_1.txt"), "w", encoding="utf-8") as f:
+                f.write(f"3\n{i} 1 2\n")
+            with open(os.path.join(task, "out", "out_1.txt"), "w", encoding="utf-8") as f:
+                f.write(f"{i + 3}\n")
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = CLI_DIR + os.pathsep + env.get("PYTHONPATH", "")
+        env["HOME"] = os.path.join(root, "home")
+        env["XDG_CACHE_HOME"] = os.path.join(root, "cache")
+        os.makedirs(env["HOME"])
+
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "atcoder_tools_mini.main", "test", "--all", "-j", str(task_count)],
+            cwd=contest, env=env, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+
+    builds = result.stdout.count("Building precompiled header")
+    print(f"atm test --all -j {task_count} (cold cache): {elapsed:.1f} s, header built {builds} time(s), exit status {result.returncode}")
+    if builds != 1 or result.returncode != 0:
+        print(result.stdout + result.stderr)
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark C++ compile latency with and without the precompiled header.")
+    parser.add_argument("--repeat", "-n", type=int, default=5, help="Number of compilations per configuration (default: 5)")
+    parser.add_argument("--batch", type=int, default=None, help="Check that `atm test --all -j N` on N tasks with a cold cache builds the header once")
+    args = parser.parse_args()
+
+    if args.batch:
+        return check_batch(args.batch)
+
+    with tempfile.TemporaryDirectory(prefix="atm_bench_pch_") as work:
+        with open(os.path.join(work, "main.cpp"), "w", encoding="utf-8") as f:
+            f.write(SOURCE)
+
+        compile_cmd = [c.format(src="main.cpp", exec="a.out", basename="main") for c in LANGUAGE_TABLE["cpp"]["compile"]]
+
+        print(f"Command: {' '.join(compile_cmd)}")
+        baseline = measure(compile_cmd, work, args.repeat)
+
+        start = time.perf_counter()
+        cwd = os.getcwd()
+        os.chdir(work)
+        try:
+            pch_cmd = pch.inject(compile_cmd, "main.cpp")
+        finally:
+            os.chdir(cwd)
+        setup_ms = (time.perf_counter() - start) * 1000
+
+        if pch_cmd == compile_cmd:
+            print("Precompiled header not applicable (compiler is not GCC?).")
+            return 1
+
+        with_pch = measure(pch_cmd, work, args.repeat)
+
+    base_med = statistics.median(baseline)
+    pch_med = statistics.median(with_pch)
+    print(f"without PCH : median {base_med:8.1f} ms  (min {min(baseline):.1f}, max {max(baseline):.1f})")
+    print(f"with PCH    : median {pch_med:8.1f} ms  (min {min(with_pch):.1f}, max {max(with_pch):.1f})")
+    print(f"PCH lookup/build: {setup_ms:.1f} ms")
+    print(f"speedup     : {base_med / pch_med:.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Startup latency of the `atm` CLI: the time from launching the process to its
+first byte of output, next to a bare `python -c "print()"`, and the slowest
+imports of `atm test` as reported by `python -X importtime`.
+
+Usage (from the `cli` directory):
+    python benchmarks/bench_startup.py [--repeat N] [--budget-ms MS]
+
+With --budget-ms, exits with status 1 if `atm test` needs more than MS on top
+of the bare interpreter's startup to print its first line.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+CLI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def make_task(root):
+    """
+    A task directory with one Python sample, plus an empty one where
+    `atm test` prints its first line right after startup.
+    """
+    task = os.path.join(root, "A")
+    os.makedirs(os.path.join(task, "in"))
+    os.makedirs(os.path.join(task, "out"))
+    with open(os.path.join(task, "main.py"), "w") as f:
+        f.write("print(int(input()) * 2)\n")
+    with open(os.path.join(task, "in", "in_1.txt"), "w") as f:
+        f.write("21\n")
+    with open(os.path.join(task, "out", "out_1.txt"), "w") as f:
+        f.write("42\n")
+
+    empty = os.path.join(root, "B")
+    os.makedirs(os.path.join(empty, "in"))
+    os.makedirs(os.path.join(empty, "out"))
+    with open(os.path.join(empty, "main.py"), "w") as f:
+        f.write("pass\n")
+    return task, empty
+
+def time_to_first_output(cmd, cwd, env):
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    first = proc.stdout.read(1)
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.stdout.read()
+    _, stderr = proc.communicate()
+    if not first:
+        raise RuntimeError(f"{' '.join(cmd)} printed nothing:\n{stderr.decode(errors='replace')}")
+    return elapsed
+
+def measure(cmd, cwd, env, repeat):
+    time_to_first_output(cmd, cwd, env)  # warm the page cache and __pycache__
+    return statistics.median(time_to_first_output(cmd, cwd, env) for _ in range(repeat))
+
+def slowest_imports(cwd, env, count):
+    """
+    (cumulative_us, module) of the slowest imports of `atm test`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys; from atcoder_tools_mini.main import main; sys.exit(main())", "test", "main.py"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is shown by indentation: keep top-level imports and their direct children
+        if len(name) - len(name.lstrip()) > 3:
+            continue
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure atm startup time")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if `atm test` needs more than this on top of interpreter startup to print its first line")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.abspath(CLI_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    python = sys.executable
+    # What the `atm` console script runs (`python -m` would add runpy's own imports)
+    atm = [python, "-c", "import sys; from atcoder_tools_mini.main import main; sys.exit(main())"]
+
+    with tempfile.TemporaryDirectory(prefix="atm_bench_") as root:
+        env["XDG_CACHE_HOME"] = os.path.join(root, "cache")
+        task, empty = make_task(root)
+
+        scenarios = [
+            ("python (baseline)", [python, "-c", "print()"], task),
+            ("atm --help", atm + ["--help"], task),
+            ("atm test (no cases)", atm + ["test", "main.py"], empty),
+            ("atm test (1 Python case)", atm + ["test", "main.py"], task),
+        ]
+        results = {}
+        for name, cmd, cwd in scenarios:
+            results[name] = measure(cmd, cwd, env, args.repeat)
+
+        print(f"Time to first output (median of {args.repeat}):")
+        for name, _, _ in scenarios:
+            print(f"  {name:<28} {results[name]:7.1f} ms")
+
+        print("\nSlowest imports of `atm test` (cumulative):")
+        for cumulative, name in slowest_imports(task, env, 12):
+            print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+    if args.budget_ms is not None:
+        spent = results["atm test (no cases)"] - results["python (baseline)"]
+        if spent > args.budget_ms:
+            print(f"\nOver budget: atm test needed {spent:.1f} ms beyond interpreter startup (budget {args.budget_ms:.0f} ms)")
+            sys.exit(1)
+        print(f"\nWithin budget: {spent:.1f} ms beyond interpreter startup <= {args.budget_ms:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the test runner, the gen pipeline and the native
+host relay. Groups:
+
+    startup   time to first output of `atm --help` and `atm test`
+    compile   C++ compile latency, cold and from the compile cache (needs g++)
+    runner    per-case overhead of run_case over a bare spawn, and the
+              throughput of streaming a large output into the judge
+    relay     round trips through native_host.py for 1/8/32 MB tasks, plain
+              and deflated
+    gen       build_workspace, `gen --update` on an unchanged workspace, and
+              `atm gen` end to end, from the browser and from the sample cache
+
+The browser is replaced by benchmarks/stub_browser.py, which drives the real
+native_host.py; the relay and gen groups are skipped while its port is taken
+(close Chrome first). HOME and XDG_CACHE_HOME point at a temporary directory,
+so neither your config nor your caches are used or touched.
+
+Results are written as JSON (default: benchmarks/results/<date>-<commit>.json).
+With --compare, every metric is checked against an earlier result file, and
+the exit status is 1 if one got worse by more than --threshold percent.
+Metrics ending in _ms are lower-is-better, those ending in _mb_s higher.
+
+Usage (from the `cli` directory):
+    python benchmarks/bench_suite.py [--only startup,runner,...] [--repeat N]
+                                     [--output FILE] [--compare FILE] [--threshold PCT]
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import contextlib
+import statistics
+import subprocess
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, CLI_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import bench_startup
+import stub_browser
+
+GROUPS = ["startup", "compile", "runner", "relay", "gen"]
+
+MB = 1024 * 1024
+
+CPP_SOURCE = """#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    long long n;
+    cin >> n;
+    cout << n * 2 << endl;
+    return 0;
+}
+"""
+
+# Echoes its input, for the streaming comparison
+COPY_PROGRAM = "import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"
+
+def median_ms(fn, repeat):
+    fn()  # warm caches and imports
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+def atm_command():
+    # What the `atm` console script runs
+    return [sys.executable, "-c", "import sys; from atcoder_tools_mini.main import main; sys.exit(main())"]
+
+def bench_startup_group(ctx):
+    root = os.path.join(ctx["root"], "startup")
+    os.makedirs(root)
+    task, empty = bench_startup.make_task(root)
+    atm = atm_command()
+    env, repeat = ctx["env"], ctx["repeat"]
+    return {
+        "startup.python_ms": bench_startup.measure([sys.executable, "-c", "print()"], task, env, repeat),
+        "startup.atm_help_ms": bench_startup.measure(atm + ["--help"], task, env, repeat),
+        "startup.atm_test_no_cases_ms": bench_startup.measure(atm + ["test", "main.py"], empty, env, repeat),
+        "startup.atm_test_one_case_ms": bench_startup.measure(atm + ["test", "main.py"], task, env, repeat),
+    }
+
+def bench_compile_group(ctx):
+    if shutil.which("g++") is None:
+        raise RuntimeError("g++ not found")
+    from atcoder_tools_mini.lang_map import LANGUAGE_TABLE
+    from atcoder_tools_mini.test import prepare_program
+
+    work = os.path.join(ctx["root"], "compile")
+    write_file(os.path.join(work, "main.cpp"), CPP_SOURCE)
+    cpp = LANGUAGE_TABLE["cpp"]
+    quiet = lambda *_: None
+
+    def build(use_cache):
+        src = os.path.join(work, "main.cpp")
+        if prepare_program(cpp["compile"], cpp["run"], src, "a.out", use_cache=use_cache, cwd=work, log=quiet) is None:
+            raise RuntimeError("compilation failed")
+
+    return {
+        "compile.cpp_cold_ms": median_ms(lambda: build(False), min(ctx["repeat"], 5)),
+        "compile.cpp_cache_hit_ms": median_ms(lambda: build(True), ctx["repeat"]),
+    }
+
+def bench_runner_group(ctx):
+    from atcoder_tools_mini.test import run_case
+    from atcoder_tools_mini.judge import Judge
+    from atcoder_tools_mini.runner import run_process
+
+    work = os.path.join(ctx["root"], "runner")
+    write_file(os.path.join(work, "in", "in_1.txt"), "21\n")
+    write_file(os.path.join(work, "out", "out_1.txt"), "42\n")
+    in_file = os.path.join(work, "in", "in_1.txt")
+    out_file = os.path.join(work, "out", "out_1.txt")
+
+    # A compiled program keeps the interpreter's own startup out of the numbers
+    if shutil.which("g++"):
+        write_file(os.path.join(work, "main.cpp"), CPP_SOURCE)
+        subprocess.run(["g++", "-O2", "main.cpp", "-o", "a.out"], cwd=work, check=True)
+        run_cmd = [os.path.join(work, "a.out")]
+        ctx["notes"]["runner.program"] = "C++"
+    else:
+        write_file(os.path.join(work, "main.py"), "print(int(input()) * 2)\n")
+        run_cmd = [sys.executable, os.path.join(work, "main.py")]
+        ctx["notes"]["runner.program"] = "Python"
+
+    judge = Judge()
+    def one_case():
+        case = run_case(run_cmd, in_file, out_file, 5.0, 1024 * 1024, judge, run_process)
+        if case["verdict"] != "AC":
+            raise RuntimeError(f"unexpected verdict {case['verdict']}")
+
+    spawn_ms = median_ms(lambda: subprocess.run(run_cmd, input=b"21\n", stdout=subprocess.PIPE, check=True), ctx["repeat"])
+    case_ms = median_ms(one_case, ctx["repeat"])
+
+    # The same 32 MB as input and expected output: the judge's streaming path
+    big = os.path.join(work, "big.txt")
+    with open(big, "w", encoding="utf-8") as f:
+        f.write(stub_browser.make_sample(32 * MB, random.Random(0)))
+    size_mb = os.path.getsize(big) / MB
+    def big_case():
+        case = run_case([sys.executable, "-c", COPY_PROGRAM], big, big, 60.0, 4 * 1024 * 1024, judge, run_process, max_output=1024 * MB)
+        if case["verdict"] != "AC":
+            raise RuntimeError(f"unexpected verdict {case['verdict']}")
+    stream_ms = median_ms(big_case, min(ctx["repeat"], 5))
+
+    return {
+        "runner.spawn_ms": spawn_ms,
+        "runner.run_case_ms": case_ms,
+        "runner.overhead_ms": case_ms - spawn_ms,
+        "runner.stream_32mb_mb_s": size_mb / (stream_ms / 1000),
+    }
+
+def bench_relay_group(ctx):
+    from atcoder_tools_mini.client import HostConnection
+    from atcoder_tools_mini.gen import unpack_task
+
+    sizes = [1, 8, 32]
+    tasks = [stub_browser.make_task("relay", "S", 64, samples=1)]
+    tasks += [stub_browser.make_task("relay", f"M{size}", size * MB, samples=1) for size in sizes]
+    results = {}
+    with stub_browser.StubBrowser({"relay": tasks}, env=ctx["env"]):
+        conn = HostConnection()
+        try:
+            def fetch(screen_name, encodings):
+                req_id = conn.request({"action": "get_task_samples", "contest_id": "relay",
+                                       "task_screen_name": screen_name, "encodings": encodings})
+                for msg in conn.messages(req_id):
+                    if msg.get("action") == "task_samples":
+                        conn.finish(req_id)
+                        return unpack_task(msg)
+                raise RuntimeError("the native host closed the connection")
+
+            results["relay.roundtrip_small_ms"] = median_ms(lambda: fetch("relay_s", []), ctx["repeat"] * 5)
+            for size in sizes:
+                for name, encodings in (("plain", []), ("deflate", ["deflate"])):
+                    ms = median_ms(lambda: fetch(f"relay_m{size}", encodings), min(ctx["repeat"], 5))
+                    results[f"relay.{name}_{size}mb_mb_s"] = size / (ms / 1000)
+        finally:
+            conn.close()
+    return results
+
+def bench_gen_group(ctx):
+    from atcoder_tools_mini.gen import build_workspace
+
+    contest_id = "benchgen"
+    tasks = stub_browser.make_contest(contest_id, 8, 64 * 1024)
+    root = os.path.join(ctx["root"], "gen")
+    os.makedirs(root)
+    runs = iter(range(10**6))
+
+    def fresh_dir():
+        path = os.path.join(root, f"run{next(runs)}")
+        os.makedirs(path)
+        return path
+
+    def build(cwd):
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_workspace({"contest_id": contest_id, "tasks": tasks}, cwd, None)
+
+    results = {"gen.build_workspace_ms": median_ms(lambda: build(fresh_dir()), ctx["repeat"])}
+    existing = fresh_dir()
+    build(existing)
+    results["gen.update_unchanged_ms"] = median_ms(lambda: build(existing), ctx["repeat"])
+
+    atm = atm_command()
+    def atm_gen(*extra):
+        subprocess.run(atm + ["gen", contest_id] + list(extra), cwd=fresh_dir(), env=ctx["env"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    try:
+        with stub_browser.StubBrowser({contest_id: tasks}, env=ctx["env"]):
+            results["gen.end_to_end_ms"] = median_ms(lambda: atm_gen("--refresh"), ctx["repeat"])
+    except RuntimeError as e:
+        ctx["skipped"]["gen.end_to_end_ms"] = str(e)
+    # Filled by the runs above; no browser needed
+    if "gen.end_to_end_ms" in results:
+        results["gen.from_sample_cache_ms"] = median_ms(atm_gen, ctx["repeat"])
+    return results
+
+BENCHMARKS = {
+    "startup": bench_startup_group,
+    "compile": bench_compile_group,
+    "runner": bench_runner_group,
+    "relay": bench_relay_group,
+    "gen": bench_gen_group,
+}
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CLI_DIR, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_value(key, value):
+    return f"{value:9.1f} MB/s" if key.endswith("_mb_s") else f"{value:9.1f} ms  "
+
+def compare(results, baseline, threshold):
+    """
+    Prints every metric next to its baseline value. Returns the metrics that
+    got worse by more than `threshold` percent.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('meta', {}).get('commit') or 'baseline'}:")
+    for key, value in results.items():
+        old = baseline.get("results", {}).get(key)
+        if old is None or old == 0:
+            print(f"  {key:<36} {format_value(key, value)}   (new)")
+            continue
+        change = (value - old) / old * 100
+        worse = -change if key.endswith("_mb_s") else change
+        mark = ""
+        if worse > threshold:
+            mark = "  \033[91mREGRESSION\033[0m"
+            regressions.append(key)
+        elif worse < -threshold:
+            mark = "  \033[92mfaster\033[0m"
+        print(f"  {key:<36} {format_value(key, old)} -> {format_value(key, value)} {change:+6.1f}%{mark}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the atm benchmark suite")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated groups to run (default: all of {', '.join(GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement; the median is reported (default: 10)")
+    parser.add_argument("--output", default=None, help="Where to write the results (default: benchmarks/results/<date>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent for --compare (default: 10)")
+    args = parser.parse_args()
+
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    root = tempfile.mkdtemp(prefix="atm_suite_")
+    home = os.path.join(root, "home")
+    # The PCH is measured on its own by bench_pch.py; here it would only add
+    # its one-time build to the first compile
+    write_file(os.path.join(home, ".atm_config.json"), json.dumps({"pch": False}))
+    isolated = {"HOME": home, "XDG_CACHE_HOME": os.path.join(root, "cache")}
+    os.environ.update(isolated)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = CLI_DIR + os.pathsep + env.get("PYTHONPATH", "")
+
+    ctx = {"root": root, "env": env, "repeat": args.repeat, "notes": {}, "skipped": {}}
+    results = {}
+    cwd = os.getcwd()
+    try:
+        for group in groups:
+            print(f"[{group}]")
+            sys.stdout.flush()
+            os.chdir(root)
+            try:
+                measured = BENCHMARKS[group](ctx)
+            except RuntimeError as e:
+                ctx["skipped"][group] = str(e)
+                print(f"  skipped: {e}")
+                continue
+            for key, value in measured.items():
+                print(f"  {key:<36} {format_value(key, value)}")
+            results.update(measured)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "notes": ctx["notes"],
+        },
+        "results": {key: round(value, 3) for key, value in results.items()},
+        "skipped": ctx["skipped"],
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"\nResults written to {output}")
+
+    if baseline is not None and compare(report["results"], baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
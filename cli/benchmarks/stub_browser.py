@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+A stand-in for Chrome and the extension: starts the real `native_host.py` the
+way Chrome does (native messaging over stdin/stdout) and answers `gen`,
+`prefetch`, `get_task_samples` and `open_only` requests from a synthetic
+contest, so that the CLI <-> host path can be measured offline.
+
+Large tasks are sent deflated when the request lists "deflate" in
+`encodings`, with the same threshold as the extension.
+
+Usage (from the `cli` directory), to try `atm gen bench` by hand:
+    python benchmarks/stub_browser.py [--tasks N] [--sample-kb KB]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import base64
+import random
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+
+CLI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+NATIVE_HOST = os.path.join(CLI_DIR, "native_host.py")
+HOST = "127.0.0.1"
+PORT = 49153
+
+CHROME_HEADER = struct.Struct("@I")
+
+# Same as DEFLATE_MIN_BYTES in extension/background.js
+DEFLATE_MIN_BYTES = 4096
+
+LABELS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+def make_sample(size, rng):
+    """
+    About `size` bytes of input shaped like a typical sample: a count, then
+    lines of random integers.
+    """
+    lines = []
+    total = 0
+    while total < size:
+        line = " ".join(str(rng.randint(1, 10**9)) for _ in range(10))
+        lines.append(line)
+        total += len(line) + 1
+    return f"{len(lines)}\n" + "\n".join(lines) + "\n"
+
+def make_task(contest_id, label, sample_bytes, samples=3, seed=0):
+    rng = random.Random(f"{contest_id}-{label}-{seed}")
+    return {
+        "label": label,
+        "screen_name": f"{contest_id}_{label.lower()}",
+        "samples": [{"input": make_sample(sample_bytes, rng), "output": f"{rng.randint(1, 10**9)}\n"} for _ in range(samples)],
+        "time_limit_ms": 2000,
+        "memory_limit_mb": 1024,
+        "interactive": False,
+        "error_tolerance": None,
+    }
+
+def make_contest(contest_id, task_count, sample_bytes, samples=3):
+    return [make_task(contest_id, LABELS[i], sample_bytes, samples) for i in range(task_count)]
+
+def pack_task(request, task):
+    """
+    The task fields of a reply, as the extension's packTask builds them.
+    """
+    body = json.dumps(task)
+    if "deflate" not in (request.get("encodings") or []) or len(body) < DEFLATE_MIN_BYTES:
+        return {"task": task}
+    return {"task_deflated": base64.b64encode(zlib.compress(body.encode("utf-8"))).decode("ascii")}
+
+def port_in_use():
+    try:
+        socket.create_connection((HOST, PORT), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+class StubBrowser:
+    """
+    Runs native_host.py and plays the extension's side of it. Contests are
+    {contest_id: [task, ...]}; `get_task_samples` looks tasks up by screen name.
+    """
+    def __init__(self, contests, env=None):
+        self.contests = contests
+        self.tasks = {task["screen_name"]: task for tasks in contests.values() for task in tasks}
+        self.env = env
+        self.host = None
+        self.lock = threading.Lock()
+        # Packed tasks by (screen name, deflated), so that repeated requests
+        # measure the relay rather than the stub's own compression
+        self.packed = {}
+
+    def start(self, timeout=5.0):
+        if port_in_use():
+            raise RuntimeError(f"Port {PORT} is already in use (is Chrome running with the extension?).")
+        self.host = subprocess.Popen([sys.executable, NATIVE_HOST], stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=self.env)
+        threading.Thread(target=self._read_host, daemon=True).start()
+        deadline = time.monotonic() + timeout
+        while not port_in_use():
+            if time.monotonic() > deadline or self.host.poll() is not None:
+                self.stop()
+                raise RuntimeError("native_host.py did not start listening.")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        if self.host is None:
+            return
+        try:
+            self.host.stdin.close()
+            self.host.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.host.kill()
+        self.host = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def send(self, message):
+        body = json.dumps(message).encode("utf-8")
+        with self.lock:
+            self.host.stdin.write(CHROME_HEADER.pack(len(body)))
+            self.host.stdin.write(body)
+            self.host.stdin.flush()
+
+    def _read_host(self):
+        stdout = self.host.stdout
+        while True:
+            header = stdout.read(CHROME_HEADER.size)
+            if len(header) < CHROME_HEADER.size:
+                return
+            (length,) = CHROME_HEADER.unpack(header)
+            request = json.loads(stdout.read(length))
+            threading.Thread(target=self._handle, args=(request,), daemon=True).start()
+
+    def _handle(self, request):
+        reply = lambda message: self.send({"id": request.get("id"), **message})
+        action = request.get("action")
+        try:
+            if action in ("gen", "prefetch"):
+                tasks = self.contests.get(request.get("contest_id"))
+                if tasks is None:
+                    reply({"action": "gen_error", "error": "Failed to fetch tasks page: 404"})
+                    return
+                stream = request.get("stream") or action == "prefetch"
+                for task in tasks:
+                    reply({"action": "gen_log", "message": f"  => {task['label']} ({task['screen_name']}): Success ({len(task['samples'])} samples)"})
+                    if stream:
+                        reply({"action": "gen_task", "contest_id": request["contest_id"], **pack_task(request, task)})
+                reply({
+                    "action": "gen_result",
+                    "contest_id": request["contest_id"],
+                    "task_list": [{"label": t["label"], "screen_name": t["screen_name"]} for t in tasks],
+                    "tasks": [] if stream else tasks,
+                })
+            elif action == "get_task_samples":
+                task = self.tasks.get(request.get("task_screen_name"))
+                if task is None:
+                    reply({"action": "task_samples_error", "error": "HTTP 404"})
+                else:
+                    deflate = "deflate" in (request.get("encodings") or [])
+                    key = (task["screen_name"], deflate)
+                    if key not in self.packed:
+                        self.packed[key] = pack_task(request, task)
+                    reply({"action": "task_samples", **self.packed[key]})
+            elif action == "open_only":
+                reply({"action": "open_result"})
+        except (OSError, ValueError):
+            # The host went away while replying
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic contest through native_host.py")
+    parser.add_argument("--contest", default="bench", help="Contest ID to serve (default: bench)")
+    parser.add_argument("--tasks", type=int, default=7)
+    parser.add_argument("--sample-kb", type=int, default=16)
+    args = parser.parse_args()
+
+    contests = {args.contest: make_contest(args.contest, args.tasks, args.sample_kb * 1024)}
+    with StubBrowser(contests):
+        print(f"Serving {args.contest} ({args.tasks} tasks) on port {PORT}. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
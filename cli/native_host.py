@@ -1,74 +1,260 @@
 #!/usr/bin/env python3
+import re
 import sys
 import json
 import struct
-import threading
-import socket
+import asyncio
 import logging
 import os
 
 LOG_FILE = os.path.expanduser('~/.atcoder_tools_mini_native.log')
 logging.basicConfig(filename=LOG_FILE, level=logging.INFO)
 
-clients = []
+HOST = '127.0.0.1'
+PORT = 49153
 
-def send_message(msg_dict):
-    try:
-        msg = json.dumps(msg_dict).encode('utf-8')
-        sys.stdout.buffer.write(struct.pack('@I', len(msg)))
-        sys.stdout.buffer.write(msg)
-        sys.stdout.buffer.flush()
-    except Exception as e:
-        logging.error("Failed to send message to Chrome: %s", e)
+# Frames between the host and CLI clients: 4-byte big-endian length + UTF-8 JSON.
+# (Chrome's own framing on stdin/stdout uses a native-endian length prefix.)
+CLIENT_HEADER = struct.Struct('!I')
+CHROME_HEADER = struct.Struct('@I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# A client with this much unsent output is not reading its replies and is dropped
+CLIENT_MAX_BUFFER = MAX_FRAME_SIZE
+
+# The CLI and the extension both put the request id first (and the extension the
+# action right after it), so a message can be routed from its first few bytes and
+# forwarded as received, without decoding it.
+ID_PREFIX = re.compile(rb'\{\s*"id"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+|null)')
+ACTION_NEXT = re.compile(rb'\s*,\s*"action"\s*:\s*"([^"\\]*)"')
+# A quote inside a JSON string is escaped, so an unescaped `"action":` is a key
+# (no nested object of the protocol has one)
+ACTION_ANYWHERE = re.compile(rb'"action"\s*:\s*"([^"\\]*)"')
+JUDGE_DONE = re.compile(rb'"state"\s*:\s*"DONE"')
+
+# Replies after which the extension sends nothing more for a request
+FINAL_ACTION = re.compile(r'.*_(result|error)|task_samples|current_context')
+
+# Sent by a client that is done with one of its requests; handled here, never forwarded
+RELEASE_ACTION = 'release'
+
+def peek(body):
+    """
+    Returns the (id, action) of a message.
+    """
+    match = ID_PREFIX.match(body)
+    if match:
+        action = ACTION_NEXT.match(body, match.end()) or ACTION_ANYWHERE.search(body, match.end())
+        return json.loads(match.group(1)), action and action.group(1).decode('utf-8')
+    # Older peers may put the id anywhere: parse the whole message
+    msg = json.loads(body.decode('utf-8'))
+    if not isinstance(msg, dict):
+        return None, None
+    return msg.get('id'), msg.get('action')
+
+def is_final(action, body):
+    """
+    True for the last reply to a request: a *_result / *_error, the reply to a
+    one-shot query, or the judge status update with the verdict.
+    """
+    if not action:
+        return False
+    if action == 'judge_status':
+        # Only small status updates, so searching the whole body is cheap
+        return JUDGE_DONE.search(body) is not None
+    return FINAL_ACTION.fullmatch(action) is not None
+
+class Relay:
+    """
+    Relays messages between CLI clients (TCP) and the extension (stdin/stdout).
+
+    Every request from a client carries an `id`; replies from the extension echo
+    it and are written to the originating client only, until the final reply,
+    the client releases the id, or the client disconnects.
+    Messages without an id (older extensions) are broadcast to every connected
+    client.
 
-def read_messages():
-    while True:
+    Nothing blocks the event loop: writes to Chrome are awaited, which holds
+    back the client that sent the request, and a client that stops reading its
+    replies is dropped instead of buffering them without bound.
+    """
+    def __init__(self, stdout):
+        self.stdout = stdout
+        # Python < 3.10 allows a single drain() waiter per stream
+        self.stdout_lock = asyncio.Lock()
+        self.clients = set()
+        # request id -> StreamWriter of the client that sent it
+        self.routes = {}
+
+    async def send_to_extension(self, body):
         try:
-            raw_length = sys.stdin.buffer.read(4)
-            if len(raw_length) == 0:
-                logging.info("EOF from stdin. Exiting.")
-                sys.exit(0)
-            msg_length = struct.unpack('@I', raw_length)[0]
-            message = sys.stdin.buffer.read(msg_length).decode('utf-8')
-            logging.info("Received from extension: %s", message)
-            
-            # broadcast to CLI clients
-            msg_bytes = message.encode('utf-8') + b'\n'
-            for c in list(clients):
-                try:
-                    c.sendall(msg_bytes)
-                except Exception as e:
-                    logging.error("Failed to send to client: %s", e)
-                    clients.remove(c)
+            async with self.stdout_lock:
+                self.stdout.write(CHROME_HEADER.pack(len(body)))
+                self.stdout.write(body)
+                await self.stdout.drain()
         except Exception as e:
-            logging.error("Error reading from stdin: %s", e)
-            sys.exit(1)
+            logging.error("Failed to send message to Chrome: %s", e)
+
+    def send_to_client(self, writer, body):
+        if writer.is_closing():
+            self.drop_client(writer)
+            return
+        pending = writer.transport.get_write_buffer_size()
+        if pending > CLIENT_MAX_BUFFER:
+            logging.error("Client %s has %d unsent bytes and is not reading. Dropping it.", writer.get_extra_info('peername'), pending)
+            self.drop_client(writer)
+            return
+        writer.write(CLIENT_HEADER.pack(len(body)))
+        writer.write(body)
+
+    def drop_client(self, writer):
+        if writer not in self.clients:
+            return
+        self.clients.discard(writer)
+        for req_id in [r for r, w in self.routes.items() if w is writer]:
+            del self.routes[req_id]
+        writer.close()
+
+    async def dispatch_from_client(self, writer, body):
+        req_id, action = peek(body)
+        if action == RELEASE_ACTION:
+            if self.routes.get(req_id) is writer:
+                del self.routes[req_id]
+            logging.info("Client released id=%s", req_id)
+            return
+        if req_id is not None:
+            self.routes[req_id] = writer
+        logging.info("Received from CLI (id=%s), sending to extension", req_id)
+        # The request is already JSON, forward it verbatim
+        await self.send_to_extension(body)
 
-def socket_server():
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    
+    def dispatch_from_extension(self, body):
+        logging.info("Received from extension: %s", body[:200])
+        req_id, action = peek(body)
+
+        if req_id is None:
+            targets = list(self.clients)
+        elif req_id in self.routes:
+            targets = [self.routes[req_id]]
+            if is_final(action, body):
+                del self.routes[req_id]
+        else:
+            logging.info("No client waiting for id=%s. Dropping.", req_id)
+            targets = []
+
+        for writer in targets:
+            self.send_to_client(writer, body)
+
+    async def handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        logging.info("Client connected from %s", addr)
+        self.clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(CLIENT_HEADER.size)
+                (length,) = CLIENT_HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    logging.error("Frame of %d bytes from %s exceeds the limit. Closing.", length, addr)
+                    break
+                body = await reader.readexactly(length)
+                await self.dispatch_from_client(writer, body)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logging.error("Error handling client %s: %s", addr, e)
+        finally:
+            logging.info("Client %s disconnected", addr)
+            self.drop_client(writer)
+
+    async def read_extension(self, stdin):
+        while True:
+            try:
+                header = await stdin.readexactly(CHROME_HEADER.size)
+            except asyncio.IncompleteReadError:
+                logging.info("EOF from stdin. Exiting.")
+                return
+            (length,) = CHROME_HEADER.unpack(header)
+            body = await stdin.readexactly(length)
+            try:
+                self.dispatch_from_extension(body)
+            except Exception as e:
+                logging.error("Error relaying message from extension: %s", e)
+
+class ThreadedStdin:
+    """
+    Fallback for platforms where stdin can't be attached to the event loop
+    (Windows anonymous pipes): reads block in the default executor instead.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+
+    async def readexactly(self, n):
+        data = await self.loop.run_in_executor(None, sys.stdin.buffer.read, n)
+        if len(data) < n:
+            raise asyncio.IncompleteReadError(data, n)
+        return data
+
+class ThreadedStdout:
+    """
+    Fallback for stdout when it can't be attached to the event loop (Windows,
+    or not a pipe): a single task writes the queued frames in order, blocking
+    in the default executor.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.task = loop.create_task(self._write_queued())
+
+    def write(self, data):
+        self.queue.put_nowait(data)
+
+    async def drain(self):
+        await self.queue.join()
+
+    def _write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def _write_queued(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                await self.loop.run_in_executor(None, self._write, data)
+            except Exception as e:
+                logging.error("Failed to write to stdout: %s", e)
+            finally:
+                self.queue.task_done()
+
+async def open_stdin():
+    loop = asyncio.get_running_loop()
+    if sys.platform == "win32":
+        return ThreadedStdin(loop)
+    reader = asyncio.StreamReader(limit=MAX_FRAME_SIZE)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    return reader
+
+async def open_stdout():
+    loop = asyncio.get_running_loop()
+    if sys.platform == "win32":
+        return ThreadedStdout(loop)
+    try:
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout.buffer)
+    except (ValueError, OSError):
+        return ThreadedStdout(loop)
+    return asyncio.StreamWriter(transport, protocol, None, loop)
+
+async def main():
+    relay = Relay(await open_stdout())
     try:
-        server.bind(('127.0.0.1', 49153))
-        server.listen(5)
-        logging.info("Socket server listening on port 49153")
+        server = await asyncio.start_server(relay.handle_client, HOST, PORT, reuse_address=True)
+        logging.info("Socket server listening on port %d", PORT)
     except Exception as e:
         logging.error("Failed to bind: %s", e)
         sys.exit(1)
-        
-    while True:
-        try:
-            conn, addr = server.accept()
-            logging.info("Client connected from %s", addr)
-            clients.append(conn)
-            
-            data = conn.recv(1024*1024)
-            if data:
-                payload = json.loads(data.decode('utf-8'))
-                logging.info("Received from CLI, sending to extension")
-                send_message(payload)
-        except Exception as e:
-            logging.error("Error handling client: %s", e)
+
+    stdin = await open_stdin()
+    async with server:
+        await relay.read_extension(stdin)
 
 if __name__ == '__main__':
     logging.info("Native host started")
@@ -77,7 +263,5 @@ if __name__ == '__main__':
         import msvcrt
         msvcrt.setmode(sys.stdin.fileno(), os.O_BINARY)
         msvcrt.setmode(sys.stdout.fileno(), os.O_BINARY)
-        
-    t = threading.Thread(target=socket_server, daemon=True)
-    t.start()
-    read_messages()
+
+    asyncio.run(main())
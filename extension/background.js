@@ -1,5 +1,11 @@
 let port = null;
 
+// Every reply echoes the id of the CLI request it answers, so that the native host
+// can route it back to that CLI connection only.
+function reply(request, message) {
+    if (port) port.postMessage({ id: request.id, ...message });
+}
+
 function connectNative() {
     port = chrome.runtime.connectNative('com.atcoder_tools_mini');
 
@@ -17,47 +23,59 @@ function connectNative() {
             console.log('[atcoder-tools-mini] Gen request received:', msg);
             generateContestData(msg).catch(err => {
                 console.error('[atcoder-tools-mini] Error during gen:', err);
-                port.postMessage({ action: 'gen_error', error: err.message });
+                reply(msg, { action: 'gen_error', error: err.message });
+            });
+        } else if (msg.action === 'prefetch') {
+            console.log('[atcoder-tools-mini] Prefetch request received:', msg);
+            prefetchContestData(msg).catch(err => {
+                console.error('[atcoder-tools-mini] Error during prefetch:', err);
+                reply(msg, { action: 'gen_error', error: err.message });
             });
         } else if (msg.action === 'open_only') {
             console.log('[atcoder-tools-mini] Open-only request received:', msg);
             openOnlyContestData(msg).catch(err => {
                 console.error('[atcoder-tools-mini] Error during open_only:', err);
-                port.postMessage({ action: 'gen_error', error: err.message });
+                reply(msg, { action: 'gen_error', error: err.message });
             });
         } else if (msg.action === 'get_current_context') {
             console.log('[atcoder-tools-mini] Context request received.');
             chrome.tabs.query({ active: true, currentWindow: true }, async function (tabs) {
                 if (!tabs || tabs.length === 0) {
-                    port.postMessage({ action: 'current_context_error', error: 'No active tab found.' });
+                    reply(msg, { action: 'current_context_error', error: 'No active tab found.' });
                     return;
                 }
                 const url = tabs[0].url || '';
                 const match = url.match(/atcoder\.jp\/contests\/([^/]+)(?:\/tasks\/([^/]+))?/);
                 if (match) {
                     let samples = null;
-                    if (match[2]) { // If it's a task page, try to fetch samples
+                    if (match[2] && msg.samples !== false) { // If it's a task page, try to fetch samples
                         try {
-                            const res = await fetch(url);
-                            if (res.ok) {
-                                const html = await res.text();
-                                samples = extractSamplesFromHtml(html);
-                            }
+                            samples = (await fetchTaskPage(match[1], match[2])).value.samples;
                         } catch (e) {
                             console.error('[atcoder-tools-mini] Failed to fetch samples for fallback:', e);
                         }
                     }
 
-                    port.postMessage({
+                    reply(msg, {
                         action: 'current_context',
                         contest_id: match[1],
                         task_screen_name: match[2] || null,
                         samples: samples
                     });
                 } else {
-                    port.postMessage({ action: 'current_context_error', error: 'Active tab is not an AtCoder contest/task page.' });
+                    reply(msg, { action: 'current_context_error', error: 'Active tab is not an AtCoder contest/task page.' });
                 }
             });
+        } else if (msg.action === 'get_task_samples') {
+            console.log('[atcoder-tools-mini] Task samples request received:', msg);
+            fetchTaskPage(msg.contest_id, msg.task_screen_name).then(async ({ value }) => {
+                reply(msg, {
+                    action: 'task_samples',
+                    ...await packTask(msg, { screen_name: msg.task_screen_name, ...value })
+                });
+            }).catch(err => {
+                reply(msg, { action: 'task_samples_error', error: err.message });
+            });
         }
     });
 
@@ -120,22 +138,129 @@ function extractSamplesFromHtml(htmlStr) {
     return deduplicatedSamples;
 }
 
-async function generateContestData(data) {
-    const contestId = data.contest_id;
-    if (!contestId) {
-        throw new Error('contest_id is missing for gen command.');
+// Task lists and samples are cached in chrome.storage.local together with the page's ETag.
+// Fresh entries are served without touching the network; stale ones are revalidated
+// with If-None-Match, so an unchanged page costs a 304 instead of a full download.
+const CACHE_TTL_MS = 24 * 60 * 60 * 1000;
+
+// Requests to AtCoder (cache hits excluded) go through one token bucket: short bursts
+// are allowed, the sustained rate stays polite. A 429 pauses every request for the
+// server's Retry-After and halves the rate, which then recovers with each success.
+const FETCH_CONCURRENCY = 3;
+const FETCH_RATE_PER_SEC = 2;
+const FETCH_MIN_RATE_PER_SEC = 0.25;
+const FETCH_BURST = 3;
+const FETCH_MAX_RETRIES = 4;
+const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+
+class TokenBucket {
+    constructor(rate, burst) {
+        this.maxRate = rate;
+        this.rate = rate;
+        this.burst = burst;
+        this.tokens = burst;
+        this.updatedAt = Date.now();
+        this.pausedUntil = 0;
+        this.turn = Promise.resolve();
     }
 
-    console.log(`[atcoder-tools-mini] Fetching tasks for ${contestId}...`);
-    if (port) port.postMessage({ action: 'gen_log', message: `Fetching task list for ${contestId}...` });
+    // Callers get their tokens in the order they asked, so the task queued
+    // first is also fetched first
+    acquire() {
+        this.turn = this.turn.then(() => this.take());
+        return this.turn;
+    }
 
-    const tasksUrl = `https://atcoder.jp/contests/${contestId}/tasks`;
-    const response = await fetch(tasksUrl);
-    if (!response.ok) {
-        throw new Error(`Failed to fetch tasks page: ${response.status}`);
+    async take() {
+        for (;;) {
+            const now = Date.now();
+            if (now < this.pausedUntil) {
+                await sleep(this.pausedUntil - now);
+                continue;
+            }
+            this.tokens = Math.min(this.burst, this.tokens + (now - this.updatedAt) / 1000 * this.rate);
+            this.updatedAt = now;
+            if (this.tokens >= 1) {
+                this.tokens -= 1;
+                return;
+            }
+            await sleep((1 - this.tokens) / this.rate * 1000);
+        }
     }
-    const html = await response.text();
 
+    backOff(delayMs) {
+        this.rate = Math.max(FETCH_MIN_RATE_PER_SEC, this.rate / 2);
+        this.tokens = 0;
+        this.updatedAt = Date.now();
+        this.pausedUntil = Math.max(this.pausedUntil, Date.now() + delayMs);
+    }
+
+    recover() {
+        this.rate = Math.min(this.maxRate, this.rate * 1.25);
+    }
+}
+
+const atcoderBucket = new TokenBucket(FETCH_RATE_PER_SEC, FETCH_BURST);
+
+// Retry-After is either a number of seconds or an HTTP date
+function retryAfterMs(res, attempt) {
+    const header = res.headers.get('Retry-After');
+    if (header) {
+        const seconds = Number(header);
+        const ms = Number.isFinite(seconds) ? seconds * 1000 : Date.parse(header) - Date.now();
+        if (Number.isFinite(ms)) {
+            return Math.min(60000, Math.max(0, ms));
+        }
+    }
+    return 1000 * 2 ** attempt;
+}
+
+async function politeFetch(url, options) {
+    for (let attempt = 0; ; attempt++) {
+        await atcoderBucket.acquire();
+        const res = await fetch(url, options);
+        if ((res.status !== 429 && res.status !== 503) || attempt >= FETCH_MAX_RETRIES) {
+            if (res.ok || res.status === 304) {
+                atcoderBucket.recover();
+            }
+            return res;
+        }
+        const delay = retryAfterMs(res, attempt);
+        console.warn(`[atcoder-tools-mini] HTTP ${res.status} for ${url}, retrying in ${delay} ms`);
+        atcoderBucket.backOff(delay);
+    }
+}
+
+async function fetchCached(key, url, parse, refresh = false) {
+    const stored = await chrome.storage.local.get(key);
+    const entry = stored[key];
+    if (entry && !refresh && Date.now() - entry.fetchedAt < CACHE_TTL_MS) {
+        return { value: entry.value, cached: true };
+    }
+
+    const headers = {};
+    if (entry && entry.etag) {
+        headers['If-None-Match'] = entry.etag;
+    }
+    const res = await politeFetch(url, { headers });
+    if (res.status === 304 && entry) {
+        entry.fetchedAt = Date.now();
+        await chrome.storage.local.set({ [key]: entry });
+        return { value: entry.value, cached: true };
+    }
+    if (!res.ok) {
+        throw new Error(`HTTP ${res.status}`);
+    }
+
+    // parse() throws on pages we don't want to keep (e.g. a tasks page before the contest starts)
+    const value = parse(await res.text());
+    await chrome.storage.local.set({
+        [key]: { value: value, etag: res.headers.get('ETag'), fetchedAt: Date.now() }
+    });
+    return { value: value, cached: false };
+}
+
+function parseTaskList(html) {
     const tbodyMatch = html.match(/<tbody>(.*?)<\/tbody>/is);
     if (!tbodyMatch) {
         throw new Error('Tasks table not found. (Not logged in or no tasks? Check Chrome session.)');
@@ -155,8 +280,102 @@ async function generateContestData(data) {
     if (tasks.length === 0) {
         throw new Error('No tasks found in the table.');
     }
+    return tasks;
+}
 
-    if (port) port.postMessage({ action: 'gen_log', message: `Found ${tasks.length} tasks: ${tasks.map(t => t.label).join(', ')}` });
+async function fetchTaskList(contestId, refresh = false) {
+    const tasksUrl = `https://atcoder.jp/contests/${contestId}/tasks`;
+    try {
+        return await fetchCached(`contest:${contestId}`, tasksUrl, parseTaskList, refresh);
+    } catch (err) {
+        if (err.message.startsWith('HTTP ')) {
+            throw new Error(`Failed to fetch tasks page: ${err.message.slice(5)}`);
+        }
+        throw err;
+    }
+}
+
+function parseTaskPage(html) {
+    const page = {
+        samples: extractSamplesFromHtml(html),
+        time_limit_ms: null,
+        memory_limit_mb: null,
+        interactive: /interactive (task|problem)|インタラクティブ/i.test(html)
+    };
+
+    // e.g. "Time Limit: 2 sec / Memory Limit: 1024 MiB" or "実行時間制限: 2 sec / メモリ制限: 1024 MiB"
+    const timeMatch = html.match(/(?:Time Limit|実行時間制限)\s*:\s*([\d.]+)\s*(sec|ms)/i);
+    if (timeMatch) {
+        const value = parseFloat(timeMatch[1]);
+        page.time_limit_ms = Math.round(timeMatch[2].toLowerCase() === 'ms' ? value : value * 1000);
+    }
+    const memoryMatch = html.match(/(?:Memory Limit|メモリ制限)\s*:\s*([\d.]+)\s*(KiB|KB|MiB|MB|GiB|GB)/i);
+    if (memoryMatch) {
+        const value = parseFloat(memoryMatch[1]);
+        const unit = memoryMatch[2].toUpperCase();
+        if (unit.startsWith('K')) {
+            page.memory_limit_mb = Math.round(value / 1024);
+        } else if (unit.startsWith('G')) {
+            page.memory_limit_mb = Math.round(value * 1024);
+        } else {
+            page.memory_limit_mb = Math.round(value);
+        }
+    }
+    // e.g. "absolute or relative error from the judge's output is at most 10^{-6}" or
+    // "絶対誤差または相対誤差が 10^{-6} 以下"
+    const toleranceMatch = html.match(/(?:(absolute)|(relative)|(絶対)|(相対))[^<>]{0,60}?(?:error|誤差)[\s\S]{0,120}?10\^\{?-(\d+)\}?/i);
+    if (toleranceMatch) {
+        const sentence = toleranceMatch[0];
+        const hasAbsolute = /absolute|絶対/i.test(sentence);
+        const hasRelative = /relative|相対/i.test(sentence);
+        page.error_tolerance = {
+            error_type: hasAbsolute && hasRelative ? 'absolute_or_relative' : (hasRelative ? 'relative' : 'absolute'),
+            diff: parseFloat(`1e-${toleranceMatch[5]}`)
+        };
+    } else {
+        page.error_tolerance = null;
+    }
+    return page;
+}
+
+// Chrome only carries JSON, so a task with large samples is sent as base64 of its
+// zlib-compressed JSON when the CLI lists 'deflate' in `encodings`. Samples are
+// mostly digits and whitespace and shrink several times over.
+const DEFLATE_MIN_BYTES = 4096;
+
+async function packTask(request, task) {
+    const json = JSON.stringify(task);
+    if (!(request.encodings || []).includes('deflate') || typeof CompressionStream === 'undefined' || json.length < DEFLATE_MIN_BYTES) {
+        return { task: task };
+    }
+    // 'deflate' in CompressionStream is the zlib format (RFC 1950)
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('deflate'));
+    const bytes = new Uint8Array(await new Response(stream).arrayBuffer());
+    let binary = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+        binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return { task_deflated: btoa(binary) };
+}
+
+function fetchTaskPage(contestId, screenName, refresh = false) {
+    const taskUrl = `https://atcoder.jp/contests/${contestId}/tasks/${screenName}`;
+    return fetchCached(`taskpage:${screenName}`, taskUrl, parseTaskPage, refresh);
+}
+
+async function generateContestData(data) {
+    const contestId = data.contest_id;
+    if (!contestId) {
+        throw new Error('contest_id is missing for gen command.');
+    }
+
+    console.log(`[atcoder-tools-mini] Fetching tasks for ${contestId}...`);
+    reply(data, { action: 'gen_log', message: `Fetching task list for ${contestId}...` });
+
+    const tasksUrl = `https://atcoder.jp/contests/${contestId}/tasks`;
+    const tasks = (await fetchTaskList(contestId, data.refresh)).value;
+
+    reply(data, { action: 'gen_log', message: `Found ${tasks.length} tasks: ${tasks.map(t => t.label).join(', ')}` });
 
     // Handle --open flag
     if (data.open_target) {
@@ -174,84 +393,146 @@ async function generateContestData(data) {
             console.log(`[atcoder-tools-mini] Opening target URL for ${data.open_target}: ${urlToOpen}`);
             chrome.tabs.create({ url: urlToOpen, active: true });
         } else {
-            if (port) port.postMessage({ action: 'gen_log', message: `Warning: Task '${data.open_target}' not found. Cannot open browser tab.` });
+            reply(data, { action: 'gen_log', message: `Warning: Task '${data.open_target}' not found. Cannot open browser tab.` });
         }
     }
 
-    const results = [];
+    // The task opened in the browser is downloaded first, so that its directory is
+    // ready by the time the user starts reading the statement.
+    const queue = tasks.map((task, index) => ({ task, index }));
+    if (data.open_target) {
+        const first = queue.findIndex(({ task }) => task.label.toUpperCase() === data.open_target.toUpperCase());
+        if (first > 0) {
+            queue.unshift(...queue.splice(first, 1));
+        }
+    }
 
-    for (const task of tasks) {
-        if (port) port.postMessage({ action: 'gen_log', message: `Downloading samples for ${task.label} (${task.screen_name})...` });
+    const workers = Math.min(FETCH_CONCURRENCY, queue.length);
+    reply(data, { action: 'gen_log', message: `Downloading samples (${workers} at a time)...` });
 
-        const taskRes = await fetch(task.url);
-        if (!taskRes.ok) {
-            console.error(`Failed to fetch task ${task.label}`);
-            if (port) port.postMessage({ action: 'gen_log', message: `  => Failed: HTTP ${taskRes.status}` });
-            continue;
+    const results = new Array(tasks.length).fill(null);
+    const worker = async () => {
+        while (queue.length > 0) {
+            const { task, index } = queue.shift();
+            results[index] = await downloadTask(data, contestId, task);
         }
-        const taskHtml = await taskRes.text();
+    };
+    await Promise.all(Array.from({ length: workers }, worker));
 
-        const deduplicatedSamples = extractSamplesFromHtml(taskHtml);
+    reply(data, {
+        action: 'gen_result',
+        contest_id: contestId,
+        task_list: tasks.map(t => ({ label: t.label, screen_name: t.screen_name })),
+        tasks: data.stream ? [] : results.filter(r => r !== null)
+    });
+}
 
-        results.push({
-            label: task.label,
-            screen_name: task.screen_name,
-            samples: deduplicatedSamples
-        });
+async function downloadTask(data, contestId, task) {
+    const name = `${task.label} (${task.screen_name})`;
+    let fetched;
+    try {
+        fetched = await fetchTaskPage(contestId, task.screen_name, data.refresh);
+    } catch (err) {
+        console.error(`Failed to fetch task ${task.label}`);
+        reply(data, { action: 'gen_log', message: `  => ${name}: Failed: ${err.message}` });
+        return null;
+    }
+    const deduplicatedSamples = fetched.value.samples;
+
+    const taskResult = {
+        label: task.label,
+        screen_name: task.screen_name,
+        samples: deduplicatedSamples,
+        time_limit_ms: fetched.value.time_limit_ms,
+        memory_limit_mb: fetched.value.memory_limit_mb,
+        interactive: fetched.value.interactive,
+        error_tolerance: fetched.value.error_tolerance
+    };
 
-        if (port) {
-            if (deduplicatedSamples.length > 0) {
-                port.postMessage({ action: 'gen_log', message: `  => Success (${deduplicatedSamples.length} samples)` });
-            } else {
-                port.postMessage({ action: 'gen_log', message: `  => Warning: No samples found` });
-            }
-        }
+    const source = fetched.cached ? ', cached' : '';
+    if (deduplicatedSamples.length > 0) {
+        reply(data, { action: 'gen_log', message: `  => ${name}: Success (${deduplicatedSamples.length} samples${source})` });
+    } else {
+        reply(data, { action: 'gen_log', message: `  => ${name}: Warning: No samples found` });
+    }
 
-        // Be polite to AtCoder servers to prevent 429 Too Many Requests
-        await new Promise(r => setTimeout(r, 600));
+    // Streaming CLIs build each task directory as soon as it lands,
+    // so there is no need to hold everything until the end.
+    if (data.stream) {
+        reply(data, { action: 'gen_task', contest_id: contestId, ...await packTask(data, taskResult) });
     }
+    return taskResult;
+}
 
-    if (port) {
-        port.postMessage({
-            action: 'gen_result',
-            contest_id: contestId,
-            tasks: results
-        });
+// `atm prefetch` waits for the contest to start and downloads it like `gen` as soon as the
+// tasks page shows up. Attempts are jittered, so that everyone who armed a prefetch does
+// not hit AtCoder in the same instant.
+const PREFETCH_RETRY_BASE_MS = 1000;
+const PREFETCH_RETRY_MAX_MS = 15000;
+const PREFETCH_GIVE_UP_MS = 30 * 60 * 1000;
+
+const jittered = (ms) => ms * (0.5 + Math.random());
+
+// e.g. <time class='fixtime fixtime-full'>2024-04-13 21:00:00+0900</time>
+async function fetchContestStart(contestId) {
+    const res = await politeFetch(`https://atcoder.jp/contests/${contestId}`, { cache: 'no-store' });
+    if (!res.ok) {
+        return null;
     }
+    const match = (await res.text()).match(/<time class=['"]fixtime fixtime-full['"]>(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2})([+-]\d{2})(\d{2})<\/time>/);
+    return match ? Date.parse(`${match[1]}T${match[2]}${match[3]}:${match[4]}`) : null;
 }
 
-async function openOnlyContestData(data) {
+async function prefetchContestData(data) {
     const contestId = data.contest_id;
     if (!contestId) {
-        throw new Error('contest_id is missing for open_only command.');
+        throw new Error('contest_id is missing for prefetch command.');
     }
 
-    if (port) port.postMessage({ action: 'gen_log', message: `Fetching task URLs for ${contestId}...` });
-
-    const tasksUrl = `https://atcoder.jp/contests/${contestId}/tasks`;
-    const response = await fetch(tasksUrl);
-    if (!response.ok) {
-        throw new Error(`Failed to fetch tasks page: ${response.status}`);
+    const start = await fetchContestStart(contestId);
+    if (start && start > Date.now()) {
+        reply(data, { action: 'gen_log', message: `${contestId} starts at ${new Date(start).toLocaleString()}. Waiting...` });
+        // The open native port keeps the service worker alive while it sleeps
+        while (Date.now() < start) {
+            await sleep(Math.min(60000, start - Date.now()));
+        }
+        await sleep(Math.random() * PREFETCH_RETRY_BASE_MS);
     }
-    const html = await response.text();
 
-    const tbodyMatch = html.match(/<tbody>(.*?)<\/tbody>/is);
-    if (!tbodyMatch) {
-        throw new Error('Tasks table not found. (Not logged in or no tasks? Check Chrome session.)');
+    const giveUpAt = Math.max(start || 0, Date.now()) + PREFETCH_GIVE_UP_MS;
+    for (let attempt = 0; ; attempt++) {
+        try {
+            await fetchTaskList(contestId, true);
+            break;
+        } catch (err) {
+            if (Date.now() > giveUpAt) {
+                throw new Error(`The tasks page of ${contestId} did not become available (${err.message}).`);
+            }
+            if (attempt % 10 === 0) {
+                reply(data, { action: 'gen_log', message: `Tasks page not available yet (${err.message}). Retrying...` });
+            }
+            await sleep(jittered(Math.min(PREFETCH_RETRY_MAX_MS, PREFETCH_RETRY_BASE_MS * 1.5 ** attempt)));
+        }
     }
 
-    const rowRegex = /<tr>\s*<td class="text-center(.*?)"><a href="(\/contests\/[^/]+\/tasks\/([^"]+))">([^<]+)<\/a><\/td>/gis;
-    const tasks = [];
-    let match;
-    while ((match = rowRegex.exec(tbodyMatch[1])) !== null) {
-        tasks.push({
-            label: match[4].trim(), // "A", "B", ...
-            url: `https://atcoder.jp${match[2]}`
-        });
+    // The task list is cached now; download the task pages as `gen` would
+    await generateContestData({ ...data, open_target: null, stream: true, refresh: false });
+}
+
+async function openOnlyContestData(data) {
+    const contestId = data.contest_id;
+    if (!contestId) {
+        throw new Error('contest_id is missing for open_only command.');
     }
 
-    if (tasks.length === 0) {
-        throw new Error('No tasks found in the table.');
+    const tasksUrl = `https://atcoder.jp/contests/${contestId}/tasks`;
+    let tasks;
+    if (data.tasks) {
+        // The CLI already knows the task list (from its sample cache)
+        tasks = data.tasks.map(t => ({ label: t.label, url: `${tasksUrl}/${t.screen_name}` }));
+    } else {
+        reply(data, { action: 'gen_log', message: `Fetching task URLs for ${contestId}...` });
+        tasks = (await fetchTaskList(contestId)).value;
     }
 
     // Handle --open flag
@@ -274,9 +555,7 @@ async function openOnlyContestData(data) {
         }
     }
 
-    if (port) {
-        port.postMessage({ action: 'open_result' });
-    }
+    reply(data, { action: 'open_result' });
 }
 
 async function showErrorNotification(title, message, tabId = null) {
@@ -333,6 +612,241 @@ async function showErrorNotification(title, message, tabId = null) {
     }
 }
 
+// Judge polling backs off while the status stays the same and resets on every change
+const JUDGE_POLL_MIN_MS = 500;
+const JUDGE_POLL_MAX_MS = 5000;
+const JUDGE_TIMEOUT_MS = 10 * 60 * 1000;
+
+async function findLatestSubmissionId(tabId, contestId) {
+    // The submissions page is already open in the tab, so read the newest row from its DOM
+    try {
+        const [injection] = await chrome.scripting.executeScript({
+            target: { tabId: tabId },
+            func: () => {
+                const link = document.querySelector('tbody tr a[href*="/submissions/"]');
+                const match = link && link.getAttribute('href').match(/\/submissions\/(\d+)/);
+                return match ? match[1] : null;
+            }
+        });
+        if (injection && injection.result) {
+            return injection.result;
+        }
+    } catch (err) {
+        console.log('[atcoder-tools-mini] Could not read submission id from tab, falling back to fetch:', err);
+    }
+
+    const response = await politeFetch(`https://atcoder.jp/contests/${contestId}/submissions/me`, { cache: 'no-store' });
+    if (!response.ok) {
+        throw new Error(`Failed to fetch submissions page: ${response.status}`);
+    }
+    const html = await response.text();
+    const match = html.match(/href="\/contests\/[^/]+\/submissions\/(\d+)"/);
+    if (!match) {
+        throw new Error('Could not find the submission on the submissions page.');
+    }
+    return match[1];
+}
+
+function parseJudgeStatus(html) {
+    // The status endpoint returns the status cell, followed by time and memory cells once judged
+    const cells = [...html.matchAll(/<td[^>]*>(.*?)<\/td>/gis)].map(m => m[1].replace(/<[^>]+>/g, '').trim());
+    const statusText = cells.length > 0 ? cells[0] : html.replace(/<[^>]+>/g, '').trim();
+
+    // Check if it's currently judging
+    const isJudging = statusText.includes('WJ') || statusText.includes('WR') || statusText.includes('Judging') || statusText === '1/1';
+
+    // Fail fast! If the status contains anything like "WA", "TLE", "RE", "MLE" etc., it's a failure.
+    // Even if it says "5/20 WA", we know it's not going to be AC anymore.
+    let isFailFast = false;
+    let finalStatusText = statusText;
+    if (statusText.includes('/')) {
+        // Extract the letters at the end, e.g., "5/20 WA" -> "WA"
+        const matchFail = statusText.match(/\d+\/\d+\s+([A-Z]+)/);
+        if (matchFail) {
+            finalStatusText = matchFail[1];
+            isFailFast = true;
+        }
+    }
+
+    // The state is "DONE" if it's a fail fast (WA, TLE etc), or if it's completely finished (AC, WA, TLE, etc without WJ/split)
+    const isDone = isFailFast || (!isJudging && !statusText.includes('/'));
+
+    return {
+        state: isDone ? 'DONE' : 'JUDGING',
+        status: isDone ? finalStatusText : statusText,
+        progress: statusText,
+        time: cells.length > 1 ? cells[1] : '',
+        memory: cells.length > 2 ? cells[2] : ''
+    };
+}
+
+async function monitorSubmission(data, tabId) {
+    const contestId = data.contest_id;
+    const sid = await findLatestSubmissionId(tabId, contestId);
+    const href = `https://atcoder.jp/contests/${contestId}/submissions/${sid}`;
+    // Same lightweight endpoint AtCoder's own submissions page polls, for a single submission
+    const statusUrl = `https://atcoder.jp/contests/${contestId}/submissions/me/status/json?sids[]=${sid}`;
+    console.log(`[atcoder-tools-mini] Monitoring submission ${sid}`);
+
+    const startedAt = Date.now();
+    let delay = JUDGE_POLL_MIN_MS;
+    let lastProgress = null;
+
+    while (Date.now() - startedAt < JUDGE_TIMEOUT_MS) {
+        await new Promise(r => setTimeout(r, delay));
+
+        const response = await politeFetch(statusUrl, { cache: 'no-store' });
+        if (response.status === 429) {
+            delay = Math.min(delay * 2, JUDGE_POLL_MAX_MS);
+            continue;
+        }
+        if (!response.ok) {
+            throw new Error(`Failed to fetch judge status: ${response.status}`);
+        }
+        const json = await response.json();
+        const entry = json.Result && json.Result[sid];
+        if (!entry) {
+            delay = Math.min(delay * 2, JUDGE_POLL_MAX_MS);
+            continue;
+        }
+
+        const res = parseJudgeStatus(entry.Html || '');
+        res.score = entry.Score !== undefined ? String(entry.Score) : '';
+        res.href = href;
+        res.submission_id = sid;
+
+        if (res.progress !== lastProgress || res.state === 'DONE') {
+            console.log('[atcoder-tools-mini] Monitor status:', res);
+            reply(data, { action: 'judge_status', data: res });
+            lastProgress = res.progress;
+            delay = JUDGE_POLL_MIN_MS;
+        } else {
+            delay = Math.min(Math.ceil(delay * 1.5), JUDGE_POLL_MAX_MS);
+        }
+
+        if (res.state === 'DONE') {
+            console.log('[atcoder-tools-mini] Judgement complete. Showing notification and closing tab.');
+            chrome.tabs.remove(tabId);
+            showJudgeNotification(data, res);
+            return;
+        }
+    }
+    throw new Error('Gave up waiting for the judge after 10 minutes.');
+}
+
+// --- comfortable-atcoder style notification ---
+async function showJudgeNotification(data, res) {
+    try {
+        // Generate icon
+        let foreColor = 'white';
+        let backColor = '#f0ad4e'; // default (orange-ish)
+        if (res.status === 'AC') {
+            backColor = '#5cb85c'; // green
+        } else if (res.status === 'WA') {
+            backColor = 'hsl(0, 84%, 62%)'; // red
+        }
+
+        const width = 192;
+        const height = 192;
+        const canvas = new OffscreenCanvas(width, height);
+        const ctx = canvas.getContext('2d');
+        ctx.fillStyle = backColor;
+        ctx.fillRect(0, 0, width, height);
+        ctx.font = "80px 'Lato','Helvetica Neue',arial,sans-serif";
+        ctx.fillStyle = foreColor;
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'middle';
+        ctx.fillText(res.status, width / 2, height / 2);
+
+        const blob = await canvas.convertToBlob({ type: 'image/png' });
+        const reader = new FileReader();
+        reader.onloadend = () => {
+            const iconUrl = reader.result;
+            chrome.notifications.create(
+                {
+                    type: 'basic',
+                    iconUrl: iconUrl,
+                    title: `AtCoder: ${data.task_screen_name}`,
+                    message: `Result: ${res.status}\nScore: ${res.score}\nTime: ${res.time}`,
+                    requireInteraction: true
+                },
+                (notificationId) => {
+                    if (res.href) {
+                        const clickHandler = (id) => {
+                            if (id === notificationId) {
+                                chrome.tabs.create({ url: res.href });
+                                chrome.notifications.clear(id);
+                                chrome.notifications.onClicked.removeListener(clickHandler);
+                            }
+                        };
+                        chrome.notifications.onClicked.addListener(clickHandler);
+                    }
+                    // Auto clear after some time just like comfortable-atcoder
+                    setTimeout(() => {
+                        chrome.notifications.clear(notificationId);
+                    }, 1000 * 10);
+                }
+            );
+        };
+        reader.readAsDataURL(blob);
+    } catch (err) {
+        console.error('[atcoder-tools-mini] Notification error:', err);
+    }
+}
+
+const SUBMIT_REDIRECT_TIMEOUT_MS = 30000;
+
+// Watches the submit tab for the redirect to the submissions page. The listener is
+// removed however the wait ends: redirect, timeout or cancel().
+function watchRedirect(tabId) {
+    let listener;
+    let timerId = null;
+    let settle;
+    const redirected = new Promise((resolve) => {
+        settle = (ok) => {
+            chrome.tabs.onUpdated.removeListener(listener);
+            clearTimeout(timerId);
+            resolve(ok);
+        };
+        listener = (tId, info, tabObj) => {
+            if (tId === tabId && info.status === 'complete' && tabObj.url && tabObj.url.includes('/submissions/me')) {
+                settle(true);
+            }
+        };
+        chrome.tabs.onUpdated.addListener(listener);
+    });
+    return {
+        // Resolves to true on redirect, false if it hasn't happened after timeoutMs
+        wait(timeoutMs) {
+            timerId = setTimeout(() => settle(false), timeoutMs);
+            return redirected;
+        },
+        cancel() {
+            settle(false);
+        }
+    };
+}
+
+// The error messages AtCoder shows on the submit page, or null if there are none
+async function readSubmitError(tabId) {
+    try {
+        const [injection] = await chrome.scripting.executeScript({
+            target: { tabId: tabId },
+            func: () => {
+                const nodes = document.querySelectorAll('.alert-danger, .alert-warning, .has-error .help-block');
+                return Array.from(nodes)
+                    .map(node => node.textContent.replace(/\s+/g, ' ').replace(/^\s*×/, '').trim())
+                    .filter(text => text)
+                    .join(' ') || null;
+            }
+        });
+        return injection ? injection.result : null;
+    } catch (err) {
+        console.log('[atcoder-tools-mini] Could not read the error from the submit tab:', err);
+        return null;
+    }
+}
+
 async function submitToAtCoder(data) {
     const contestId = data.contest_id;
     if (!contestId) {
@@ -357,168 +871,7 @@ async function submitToAtCoder(data) {
     });
 
     // Instead of relying on comfortable-atcoder, WE will monitor the submission
-    chrome.tabs.onUpdated.addListener(function closeListener(tId, info, tabObj) {
-        if (tId === tab.id && info.status === 'complete' && tabObj.url && tabObj.url.includes('/submissions/me')) {
-            console.log('[atcoder-tools-mini] Redirected to submissions page. Starting built-in monitor...');
-            chrome.tabs.onUpdated.removeListener(closeListener);
-
-            // Signal the CLI to exit immediately since the submission is complete!
-            if (port) {
-                port.postMessage({ status: 'submitted' });
-            }
-
-            let lastStatusValue = '';
-            let stuckCounter = 0;
-
-            const monitorInterval = setInterval(async () => {
-                try {
-                    // Fetch submissions page
-                    const response = await fetch(`https://atcoder.jp/contests/${contestId}/submissions/me`, { cache: 'no-store' });
-                    if (!response.ok) return;
-                    const html = await response.text();
-
-                    const tbodyMatch = html.match(/<tbody>(.*?)<\/tbody>/is);
-                    if (!tbodyMatch) return;
-
-                    const firstRowMatch = tbodyMatch[1].match(/<tr>(.*?)<\/tr>/is);
-                    if (!firstRowMatch) return;
-
-                    const rowHtml = firstRowMatch[1];
-                    const tdsMatch = [...rowHtml.matchAll(/<td[^>]*>(.*?)<\/td>/gis)];
-                    if (tdsMatch.length < 7) return;
-
-                    const score = tdsMatch[4][1].replace(/<[^>]+>/g, '').trim();
-                    const statusText = tdsMatch[6][1].replace(/<[^>]+>/g, '').trim();
-                    const time = tdsMatch.length > 7 ? tdsMatch[7][1].replace(/<[^>]+>/g, '').trim() : '';
-
-                    const detailHrefMatch = rowHtml.match(/href="(\/contests\/[^/]+\/submissions\/\d+)"/);
-                    const href = detailHrefMatch ? `https://atcoder.jp${detailHrefMatch[1]}` : '';
-
-                    // Check if it's currently judging
-                    const isJudging = statusText.includes('WJ') || statusText.includes('Judging') || statusText === '1/1';
-
-                    // Fail fast! If the status contains anything like "WA", "TLE", "RE", "MLE" etc., it's a failure.
-                    // Even if it says "5/20 WA", we know it's not going to be AC anymore.
-                    let isFailFast = false;
-                    let finalStatusText = statusText;
-
-                    if (statusText.includes('/')) {
-                        // Extract the letters at the end, e.g., "5/20 WA" -> "WA"
-                        const matchFail = statusText.match(/\d+\/\d+\s+([A-Z]+)/);
-                        if (matchFail) {
-                            finalStatusText = matchFail[1];
-                            isFailFast = true;
-                        }
-                    }
-
-                    // The state is "DONE" if it's a fail fast (WA, TLE etc), or if it's completely finished (AC, WA, TLE, etc without WJ/split)
-                    const isDone = isFailFast || (!isJudging && !statusText.includes('/'));
-
-                    if (statusText === lastStatusValue && !isDone) {
-                        stuckCounter++;
-                    } else {
-                        stuckCounter = 0;
-                        lastStatusValue = statusText;
-                    }
-
-                    const res = {
-                        state: isDone ? 'DONE' : 'JUDGING',
-                        status: isDone ? finalStatusText : statusText,
-                        score: score,
-                        time: time,
-                        href: href
-                    };
-
-                    // If stuck with no changes for 5 seconds (5 intervals), force reload the tab to clear cache/stuck states
-                    if (stuckCounter >= 5) {
-                        console.log('[atcoder-tools-mini] WJ state seems stuck. Reloading the submissions page...');
-                        chrome.tabs.reload(tab.id, { bypassCache: true });
-                        stuckCounter = 0; // reset
-                    }
-
-                    if (res) {
-                        console.log('[atcoder-tools-mini] Monitor status:', res);
-
-                        if (port) {
-                            port.postMessage({
-                                action: 'judge_status',
-                                data: res
-                            });
-                        }
-
-                        if (res.state === 'DONE') {
-                            console.log('[atcoder-tools-mini] Judgement complete. Showing notification and closing tab.');
-                            clearInterval(monitorInterval);
-                            chrome.tabs.remove(tab.id);
-
-                            // --- comfortable-atcoder style notification ---
-                            (async () => {
-                                try {
-                                    // Generate icon
-                                    let foreColor = 'white';
-                                    let backColor = '#f0ad4e'; // default (orange-ish)
-                                    if (res.status === 'AC') {
-                                        backColor = '#5cb85c'; // green
-                                    } else if (res.status === 'WA') {
-                                        backColor = 'hsl(0, 84%, 62%)'; // red
-                                    }
-
-                                    const width = 192;
-                                    const height = 192;
-                                    const canvas = new OffscreenCanvas(width, height);
-                                    const ctx = canvas.getContext('2d');
-                                    ctx.fillStyle = backColor;
-                                    ctx.fillRect(0, 0, width, height);
-                                    ctx.font = "80px 'Lato','Helvetica Neue',arial,sans-serif";
-                                    ctx.fillStyle = foreColor;
-                                    ctx.textAlign = 'center';
-                                    ctx.textBaseline = 'middle';
-                                    ctx.fillText(res.status, width / 2, height / 2);
-
-                                    const blob = await canvas.convertToBlob({ type: 'image/png' });
-                                    const reader = new FileReader();
-                                    reader.onloadend = () => {
-                                        const iconUrl = reader.result;
-                                        chrome.notifications.create(
-                                            {
-                                                type: 'basic',
-                                                iconUrl: iconUrl,
-                                                title: `AtCoder: ${data.task_screen_name}`,
-                                                message: `Result: ${res.status}\nScore: ${res.score}\nTime: ${res.time}`,
-                                                requireInteraction: true
-                                            },
-                                            (notificationId) => {
-                                                if (res.href) {
-                                                    const clickHandler = (id) => {
-                                                        if (id === notificationId) {
-                                                            chrome.tabs.create({ url: res.href });
-                                                            chrome.notifications.clear(id);
-                                                            chrome.notifications.onClicked.removeListener(clickHandler);
-                                                        }
-                                                    };
-                                                    chrome.notifications.onClicked.addListener(clickHandler);
-                                                }
-                                                // Auto clear after some time just like comfortable-atcoder
-                                                setTimeout(() => {
-                                                    chrome.notifications.clear(notificationId);
-                                                }, 1000 * 10);
-                                            }
-                                        );
-                                    };
-                                    reader.readAsDataURL(blob);
-                                } catch (err) {
-                                    console.error('[atcoder-tools-mini] Notification error:', err);
-                                }
-                            })();
-                        }
-                    }
-                } catch (err) {
-                    console.log('[atcoder-tools-mini] Tab closed or error during monitoring:', err);
-                    clearInterval(monitorInterval);
-                }
-            }, 1000); // Check every second
-        }
-    });
+    const redirect = watchRedirect(tab.id);
 
     console.log(`[atcoder-tools-mini] Injecting submission script into tab ${tab.id}`);
 
@@ -654,15 +1007,33 @@ async function submitToAtCoder(data) {
         ]);
         console.log('[atcoder-tools-mini] Tab operation completed!');
     } catch (err) {
+        redirect.cancel();
         console.log('[atcoder-tools-mini] Error during tab operation. Leaving tab open for manual action.', err);
         showErrorNotification(`Submission Failed: ${data.task_screen_name || 'Unknown'}`, `${err.message || String(err)}\nClick this notification to open the stuck tab.`, tab.id);
 
         // Notify the CLI to abort waiting
-        if (port) {
-            port.postMessage({ action: 'submit_error', error: err.message || String(err) });
-        }
+        reply(data, { action: 'submit_error', error: err.message || String(err) });
         throw err;
     } finally {
         clearTimeout(timeoutId);
     }
+
+    if (!await redirect.wait(SUBMIT_REDIRECT_TIMEOUT_MS)) {
+        // AtCoder re-renders the form with an alert when it rejects a submission
+        const pageError = await readSubmitError(tab.id);
+        const message = pageError || `AtCoder did not open the submissions page within ${SUBMIT_REDIRECT_TIMEOUT_MS / 1000} seconds.`;
+        console.log('[atcoder-tools-mini] Submission was not accepted. Leaving tab open for manual action.', message);
+        showErrorNotification(`Submission Failed: ${data.task_screen_name || 'Unknown'}`, `${message}\nClick this notification to open the stuck tab.`, tab.id);
+        reply(data, { action: 'submit_error', error: message });
+        throw new Error(message);
+    }
+
+    console.log('[atcoder-tools-mini] Redirected to submissions page. Starting built-in monitor...');
+    // Tell the CLI the submission went through; judge updates follow as judge_status messages
+    reply(data, { action: 'submitted' });
+
+    monitorSubmission(data, tab.id).catch(err => {
+        console.log('[atcoder-tools-mini] Tab closed or error during monitoring:', err);
+        reply(data, { action: 'judge_error', error: err.message || String(err) });
+    });
 }